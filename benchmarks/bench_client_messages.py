@@ -0,0 +1,116 @@
+"""
+Benchmark the handling of inbound client messages on one websocket.
+
+Feeds 5,000 widget updates through the receive loop of a connection and
+reports messages per second, with updates for one widget or spread over 50,
+and with the session's send returning at once or after 1 ms (as when the
+session is relayed to another worker). The serial baseline awaits each
+message's handler before reading the next, like the loop before per-widget
+workers.
+
+Run with: python benchmarks/bench_client_messages.py
+"""
+
+import asyncio
+import json
+import time
+from contextlib import suppress
+from types import SimpleNamespace
+from typing import Any
+
+from starlette.websockets import WebSocketDisconnect
+
+from numerous.apps.app_factory import (
+    _dispatch_client_message,
+    _handle_client_messages,
+    _receive_client_message,
+)
+
+
+NUM_MESSAGES = 5_000
+
+
+class WebSocket:
+    """In-memory stand-in for a client websocket with queued frames."""
+
+    def __init__(self, frames: list[str]) -> None:
+        self.frames = iter(frames)
+
+    async def receive(self) -> dict[str, Any]:
+        text = next(self.frames, None)
+        if text is None:
+            return {"type": "websocket.disconnect", "code": 1000}
+        return {"type": "websocket.receive", "text": text}
+
+
+class Session:
+    """Session whose send takes a fixed time, counting the messages sent."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.sent = 0
+
+    async def send(self, _message: dict[str, Any], **_kwargs: Any) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+
+
+def make_frames(widgets: int) -> list[str]:
+    return [
+        json.dumps(
+            {
+                "type": "widget-update",
+                "widget_id": f"w{i % widgets}",
+                "property": "value",
+                "value": i,
+            }
+        )
+        for i in range(NUM_MESSAGES)
+    ]
+
+
+async def run_serial(websocket: WebSocket, session: Session) -> None:
+    while True:
+        try:
+            message = await _receive_client_message(websocket)
+        except WebSocketDisconnect:
+            return
+        await _dispatch_client_message(websocket, "client", session, message)
+
+
+async def run_workers(websocket: WebSocket, session: Session) -> None:
+    app = SimpleNamespace(
+        state=SimpleNamespace(
+            config=SimpleNamespace(
+                shared_session=None,
+                session_manager=SimpleNamespace(touch=lambda _session_id: None),
+            )
+        )
+    )
+    # Returns once the socket closed and the received messages were handled
+    with suppress(WebSocketDisconnect):
+        await _handle_client_messages(app, websocket, "client", "bench", session)
+
+
+async def bench(name: str, loop: Any, widgets: int, latency: float) -> None:
+    websocket, session = WebSocket(make_frames(widgets)), Session(latency)
+    start = time.perf_counter()
+    await loop(websocket, session)
+    elapsed = time.perf_counter() - start
+    assert session.sent == NUM_MESSAGES
+    print(
+        f"{name:>7}: {widgets:>2} widget(s), {latency * 1e3:.0f} ms send -> "
+        f"{NUM_MESSAGES / elapsed:,.0f} messages/s"
+    )
+
+
+async def main() -> None:
+    for latency in (0.0, 0.001):
+        for widgets in (1, 50):
+            await bench("serial", run_serial, widgets, latency)
+            await bench("workers", run_workers, widgets, latency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
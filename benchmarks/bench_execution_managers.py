@@ -0,0 +1,122 @@
+"""
+Benchmark execution managers: start-up time, memory and parallel throughput.
+
+Starts the same number of sessions with ThreadedExecutionManager (one thread
+per session in the server process), MultiProcessExecutionManager (one process
+per session) and LocalWorkerPool (a few host processes running sessions in
+threads). Each app instance imports the framework, as a real app does, then
+answers CPU-bound jobs. Reports the time until all sessions are ready, the
+resident memory of the processes hosting them (for threads, the growth of
+the server process) and the time to finish one job per session.
+
+Per-interpreter GIL subinterpreters were considered for this, but numpy and
+pydantic-core, which every app imports, cannot be loaded in subinterpreters.
+
+Run with: python benchmarks/bench_execution_managers.py
+"""
+
+import os
+import time
+from pathlib import Path
+from queue import Empty
+
+from numerous.apps.communication import (
+    MultiProcessExecutionManager,
+    ThreadedExecutionManager,
+)
+from numerous.apps.remote import LocalWorkerPool, RemoteExecutionManager
+
+
+NUM_SESSIONS = 16
+NUM_HOSTS = os.cpu_count() or 1
+JOB_SIZE = 2_000_000  # Loop iterations per job
+
+
+def busy_app(session_id, base_dir, module_path, template, app_id, communication):
+    import numerous.apps.server  # noqa: F401 - load the stack an app would
+
+    communication.from_app_instance.send({"type": "ready"})
+    while not communication.stop_event.is_set():
+        try:
+            job = communication.to_app_instance.receive(timeout=0.05)
+        except Empty:
+            continue
+        total = sum(i * i for i in range(job["size"]))
+        communication.from_app_instance.send({"type": "done", "total": total})
+
+
+def rss_mb(pid: int) -> float:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def wait_for(managers, message_type: str) -> None:
+    for manager in managers:
+        while True:
+            message = manager.communication_manager.from_app_instance.receive(
+                timeout=60
+            )
+            if message["type"] == message_type:
+                break
+
+
+def run(name: str, make_manager, pids, baseline: float = 0.0) -> None:
+    start = time.perf_counter()
+    managers = [make_manager(f"session-{i}") for i in range(NUM_SESSIONS)]
+    for manager in managers:
+        manager.start("", "", "", "")
+    wait_for(managers, "ready")
+    startup = time.perf_counter() - start
+    memory = sum(rss_mb(pid) for pid in pids()) - baseline
+
+    start = time.perf_counter()
+    for manager in managers:
+        manager.communication_manager.to_app_instance.send({"size": JOB_SIZE})
+    wait_for(managers, "done")
+    work = time.perf_counter() - start
+
+    for manager in managers:
+        manager.request_stop()
+    print(
+        f"{name:>14}: start {startup:6.2f} s, memory +{memory:7.1f} MB "
+        f"({memory / NUM_SESSIONS:5.1f} MB/session), jobs {work:6.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{NUM_SESSIONS} sessions, {NUM_HOSTS} host processes for the pool")
+
+    run(
+        "threaded",
+        lambda session_id: ThreadedExecutionManager(busy_app, session_id),
+        lambda: [os.getpid()],
+        baseline=rss_mb(os.getpid()),
+    )
+
+    processes = []
+
+    def make_process_manager(session_id):
+        manager = MultiProcessExecutionManager(busy_app, session_id)
+        processes.append(manager)
+        return manager
+
+    run(
+        "multiprocess",
+        make_process_manager,
+        lambda: [m.process.pid for m in processes if hasattr(m, "process")],
+    )
+    for manager in processes:
+        manager.join()
+
+    pool = LocalWorkerPool(NUM_HOSTS, target=busy_app)
+    pool.start()
+    try:
+        run(
+            "pooled hosts",
+            lambda session_id: RemoteExecutionManager(pool, session_id),
+            lambda: [host.pid for host in pool._hosts],
+        )
+    finally:
+        pool.close()
@@ -0,0 +1,141 @@
+"""
+Benchmark message dispatch in SessionManager.
+
+Registers 1,000 callbacks spread over the message types (plus a few
+wildcards), then measures how long it takes to route app messages to their
+callbacks and to resolve many concurrent in-flight requests by request_id.
+
+Run with: python benchmarks/bench_session_dispatch.py
+"""
+
+import asyncio
+import queue
+import time
+from typing import Any
+from unittest.mock import Mock
+
+from numerous.apps.models import MessageType
+from numerous.apps.session_management import SessionId, SessionManager
+
+
+NUM_CALLBACKS = 1_000
+NUM_WILDCARDS = 5
+NUM_MESSAGES = 5_000
+NUM_REQUESTS = 1_000
+
+
+class Channel:
+    """In-memory stand-in for a QueueCommunicationChannel."""
+
+    def __init__(self) -> None:
+        self.queue: queue.SimpleQueue[dict[str, Any]] = queue.SimpleQueue()
+
+    def send(self, message: dict[str, Any]) -> None:
+        self.queue.put(message)
+
+    def receive(self, timeout: float | None = None) -> dict[str, Any]:
+        return self.queue.get(timeout=timeout)
+
+    def empty(self) -> bool:
+        return self.queue.empty()
+
+
+def make_session() -> tuple[SessionManager, Channel, Channel]:
+    to_app, from_app = Channel(), Channel()
+    execution_manager = Mock()
+    execution_manager.communication_manager = Mock(
+        to_app_instance=to_app, from_app_instance=from_app
+    )
+    return SessionManager(SessionId("bench"), execution_manager), to_app, from_app
+
+
+async def bench_dispatch() -> None:
+    session, _, from_app = make_session()
+    types = list(MessageType)
+    delivered = 0
+    done = asyncio.Event()
+
+    async def callback(_: dict[str, Any]) -> None:
+        nonlocal delivered
+        delivered += 1
+
+    async def last_callback(message: dict[str, Any]) -> None:
+        if message.get("last"):
+            done.set()
+
+    for i in range(NUM_CALLBACKS):
+        session.register_callback(callback, message_types=[types[i % len(types)]])
+    for _ in range(NUM_WILDCARDS):
+        session.register_callback(callback)
+    session.register_callback(last_callback)
+
+    update = {
+        "type": MessageType.WIDGET_UPDATE.value,
+        "widget_id": "w",
+        "property": "value",
+    }
+    for i in range(NUM_MESSAGES):
+        from_app.send({**update, "value": i})
+    from_app.send({**update, "value": -1, "last": True})
+
+    start = time.perf_counter()
+    await session.start()
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    await session.stop()
+
+    print(
+        f"dispatch: {NUM_MESSAGES} messages, {NUM_CALLBACKS} callbacks -> "
+        f"{elapsed * 1e6 / NUM_MESSAGES:.1f} us/message, {delivered} deliveries"
+    )
+
+
+async def bench_requests() -> None:
+    session, to_app, from_app = make_session()
+    await session.start()
+
+    async def responder() -> None:
+        # Reply in reverse order to show out-of-order correlation
+        replies = []
+        while len(replies) < NUM_REQUESTS:
+            while to_app.empty():
+                await asyncio.sleep(0)
+            replies.append(to_app.receive())
+        for request in reversed(replies):
+            from_app.send(
+                {
+                    "type": MessageType.ACTION_RESPONSE.value,
+                    "request_id": request["request_id"],
+                }
+            )
+
+    start = time.perf_counter()
+    responder_task = asyncio.create_task(responder())
+    responses = await asyncio.gather(
+        *(
+            session.send(
+                {"type": MessageType.ACTION_REQUEST.value, "request_id": str(i)},
+                wait_for_response=True,
+                timeout_seconds=30,
+                message_types=[MessageType.ACTION_RESPONSE],
+            )
+            for i in range(NUM_REQUESTS)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    await responder_task
+    await session.stop()
+
+    mismatched = sum(
+        response is None or response["request_id"] != str(i)
+        for i, response in enumerate(responses)
+    )
+    print(
+        f"requests: {NUM_REQUESTS} concurrent -> {elapsed * 1e3:.1f} ms total, "
+        f"{mismatched} mismatched responses"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(bench_dispatch())
+    asyncio.run(bench_requests())
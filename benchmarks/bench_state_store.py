@@ -0,0 +1,81 @@
+"""
+Benchmark write amplification of persisting session widget state.
+
+Simulates heavy update traffic (sliders dragged across many sessions) and
+compares writing every update to SQLite as it happens with recording updates
+in a SessionStateWriter that coalesces them between periodic flushes.
+
+Run with: python benchmarks/bench_state_store.py
+"""
+
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from numerous.apps.session_store import (
+    SessionStateWriter,
+    SqliteSessionStateStore,
+    StateUpdate,
+)
+
+
+NUM_SESSIONS = 50
+NUM_PROPERTIES = 10
+NUM_UPDATES = 50_000
+UPDATES_PER_FLUSH = 5_000  # Roughly one flush interval of traffic
+
+
+def make_updates() -> list[tuple[str, str, str, float]]:
+    rng = random.Random(0)
+    return [
+        (
+            f"session-{rng.randrange(NUM_SESSIONS)}",
+            f"widget-{rng.randrange(NUM_PROPERTIES)}",
+            "value",
+            rng.random(),
+        )
+        for _ in range(NUM_UPDATES)
+    ]
+
+
+def bench_write_through(path: Path, updates: list[tuple[str, str, str, float]]) -> None:
+    store = SqliteSessionStateStore(path)
+    start = time.perf_counter()
+    for session_id, widget_id, property_name, value in updates:
+        store.save([StateUpdate(session_id, widget_id, property_name, value, 0.0)])
+    elapsed = time.perf_counter() - start
+    store.close()
+
+    print(
+        f"write-through: {len(updates)} updates -> {len(updates)} rows written, "
+        f"amplification 1.000, {elapsed:.2f} s"
+    )
+
+
+async def bench_coalesced(
+    path: Path, updates: list[tuple[str, str, str, float]]
+) -> None:
+    writer = SessionStateWriter(SqliteSessionStateStore(path), flush_interval=60.0)
+    start = time.perf_counter()
+    for i, update in enumerate(updates, 1):
+        writer.record(*update)
+        if i % UPDATES_PER_FLUSH == 0:
+            await writer.flush()
+    await writer.close()
+    elapsed = time.perf_counter() - start
+
+    metrics = writer.metrics()
+    print(
+        f"coalesced: {metrics['updates_recorded']} updates -> "
+        f"{metrics['rows_written']} rows written in {metrics['flushes']} flushes, "
+        f"amplification {metrics['write_amplification']:.3f}, {elapsed:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    updates = make_updates()
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_write_through(Path(tmp) / "write_through.db", updates)
+        asyncio.run(bench_coalesced(Path(tmp) / "coalesced.db", updates))
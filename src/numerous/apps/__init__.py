@@ -5,18 +5,38 @@ from __future__ import annotations
 import inspect
 from functools import wraps
 from pathlib import Path
-from typing import TYPE_CHECKING, TypeVar
+from typing import TYPE_CHECKING, TypeVar, overload
 
 from anywidget import AnyWidget
 
-from .app_factory import create_numerous_app
+from .app_factory import (
+    CLEANUP_INTERVAL,
+    DEFAULT_SESSION_TIMEOUT,
+    MAX_CONCURRENT_SPAWNS,
+    MAX_SESSIONS,
+    MAX_SPAWN_QUEUE,
+    MAX_SPAWN_WAIT,
+    MAX_SPAWNS_PER_CLIENT,
+    OVERFLOW_SESSION_TIMEOUT,
+    create_numerous_app,
+)
+from .cache import MEMO_MAX_ENTRIES, memoize_method
+from .cache import cached as cached
+from .derived import derived as derived
+from .execution import MAX_CONCURRENT_ACTIONS
 from .multi_app import combine_apps as combine_apps
+from .session_store import STATE_FLUSH_INTERVAL
 
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Sequence
 
+    from .backplane import MessageBackplane, SessionDirectory
+    from .broadcast import BroadcastSession
+    from .compute import ComputeService
+    from .remote import RemoteWorkerPool
     from .server import NumerousApp
+    from .session_store import SessionStateStore
 
 
 T = TypeVar("T")
@@ -34,6 +54,29 @@ def create_app(  # noqa: C901
     path_prefix: str = "",
     base_dir: Path | str | None = None,
     theme_css: str | None = None,
+    ws_worker: bool = False,
+    ws_worker_typed_arrays: bool = False,
+    speculative_sessions: bool = False,
+    resource_hints: bool = True,
+    max_sessions: int = MAX_SESSIONS,
+    session_timeout: float = DEFAULT_SESSION_TIMEOUT,
+    overflow_session_timeout: float = OVERFLOW_SESSION_TIMEOUT,
+    session_cleanup_interval: float = CLEANUP_INTERVAL,
+    hibernate_after: float | None = None,
+    session_store: SessionStateStore | None = None,
+    session_store_flush_interval: float = STATE_FLUSH_INTERVAL,
+    session_directory: SessionDirectory | None = None,
+    backplane: MessageBackplane | None = None,
+    worker_id: str | None = None,
+    max_concurrent_spawns: int = MAX_CONCURRENT_SPAWNS,
+    max_spawn_queue: int = MAX_SPAWN_QUEUE,
+    max_spawns_per_client: int | None = MAX_SPAWNS_PER_CLIENT,
+    max_spawn_wait: float = MAX_SPAWN_WAIT,
+    remote_workers: RemoteWorkerPool | None = None,
+    broadcast_sessions: list[BroadcastSession] | None = None,
+    shared_app_generator: Callable[[], dict[str, AnyWidget]] | None = None,
+    compute: ComputeService | None = None,
+    max_concurrent_actions: int = MAX_CONCURRENT_ACTIONS,
     **kwargs: object,
 ) -> NumerousApp:
     """
@@ -101,16 +144,115 @@ def create_app(  # noqa: C901
         public_routes=public_routes,
         protected_routes=protected_routes,
         theme_css=theme_css,
+        ws_worker=ws_worker,
+        ws_worker_typed_arrays=ws_worker_typed_arrays,
+        speculative_sessions=speculative_sessions,
+        resource_hints=resource_hints,
+        max_sessions=max_sessions,
+        session_timeout=session_timeout,
+        overflow_session_timeout=overflow_session_timeout,
+        session_cleanup_interval=session_cleanup_interval,
+        hibernate_after=hibernate_after,
+        session_store=session_store,
+        session_store_flush_interval=session_store_flush_interval,
+        session_directory=session_directory,
+        backplane=backplane,
+        worker_id=worker_id,
+        max_concurrent_spawns=max_concurrent_spawns,
+        max_spawn_queue=max_spawn_queue,
+        max_spawns_per_client=max_spawns_per_client,
+        max_spawn_wait=max_spawn_wait,
+        remote_workers=remote_workers,
+        broadcast_sessions=broadcast_sessions,
+        shared_app_generator=shared_app_generator,
+        compute=compute,
+        max_concurrent_actions=max_concurrent_actions,
         app_id=explicit_app_id,
     )
 
 
-def action(func: Callable[..., T]) -> Callable[..., T]:
-    """Decorate a method to mark it as an action that can be called via the API."""
+@overload
+def action(func: Callable[..., T]) -> Callable[..., T]: ...
 
-    @wraps(func)
-    def wrapper(*args: tuple[object, ...], **kwargs: dict[str, object]) -> T:
-        return func(*args, **kwargs)
 
-    wrapper._is_action = True  # type: ignore[attr-defined] # noqa: SLF001
-    return wrapper
+@overload
+def action(
+    func: None = None,
+    *,
+    timeout: float | None = None,
+    memoize: bool = False,
+    max_entries: int = MEMO_MAX_ENTRIES,
+    ttl: float | None = None,
+    invalidate_on: Sequence[str] = (),
+) -> Callable[[Callable[..., T]], Callable[..., T]]: ...
+
+
+def action(
+    func: Callable[..., T] | None = None,
+    *,
+    timeout: float | None = None,
+    memoize: bool = False,
+    max_entries: int = MEMO_MAX_ENTRIES,
+    ttl: float | None = None,
+    invalidate_on: Sequence[str] = (),
+) -> Callable[..., T] | Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Decorate a method to mark it as an action that can be called via the API.
+
+    Actions defined with `async def` run as tasks in the app, so other
+    messages are handled while they wait. Actions that are generators stream
+    the chunks they yield to the caller as they are produced.
+
+    Args:
+        func: The method to decorate
+        timeout: Seconds an API call waits for the result, or for the next
+            chunk of a streaming action (`ACTION_TIMEOUT` when None)
+        memoize: Answer calls with the same arguments from the results of
+            earlier calls on the same widget, instead of running the action
+        max_entries: Results a memoized action keeps per widget
+        ttl: Seconds memoized results stay valid, or None for no limit
+        invalidate_on: Traits whose changes drop the memoized results
+
+    """
+
+    def decorate(func: Callable[..., T]) -> Callable[..., T]:
+        if memoize:
+            func = memoize_method(func, max_entries, ttl, invalidate_on)
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(
+                *args: tuple[object, ...], **kwargs: dict[str, object]
+            ) -> object:
+                return await func(*args, **kwargs)
+
+            wrapper: Callable[..., T] = async_wrapper  # type: ignore[assignment]
+        else:
+
+            @wraps(func)
+            def sync_wrapper(
+                *args: tuple[object, ...], **kwargs: dict[str, object]
+            ) -> T:
+                return func(*args, **kwargs)
+
+            wrapper = sync_wrapper
+
+        wrapper._is_action = True  # type: ignore[attr-defined] # noqa: SLF001
+        wrapper._action_timeout = timeout  # type: ignore[attr-defined] # noqa: SLF001
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+
+def restartable(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Mark an async action or observer to be restarted instead of queued.
+
+    When the callback is triggered again, for the same widget and trait or
+    action, while a previous run is still in progress, that run is cancelled
+    at its next `await` and only the newest one completes.
+    """
+    func._restartable = True  # type: ignore[attr-defined] # noqa: SLF001
+    return func
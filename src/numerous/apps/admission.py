@@ -0,0 +1,168 @@
+"""Admission control for starting new app sessions."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, NoReturn
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+logger = logging.getLogger(__name__)
+
+# Number of recent queue waits kept for percentile metrics
+WAIT_SAMPLES = 1000
+
+
+class SpawnRejectedError(Exception):
+    """Raised when a session cannot be started now and the client should retry."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        """Initialize the error with the rejection reason and a retry delay."""
+        super().__init__(f"Session spawn rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class SpawnScheduler:
+    """
+    Limit how many sessions boot at once.
+
+    Spawns beyond `max_concurrent` wait in a FIFO queue of at most `max_queue`
+    entries for up to `max_wait` seconds. Each client (user or IP address) may
+    have at most `max_per_client` spawns queued or booting. Requests beyond
+    these limits are rejected with a suggested retry delay, so a reconnect
+    storm is spread out instead of starting every app instance at once.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_queue: int = 100,
+        max_per_client: int | None = 4,
+        max_wait: float = 30.0,
+        retry_after: float = 2.0,
+    ) -> None:
+        """Initialize the scheduler with its limits."""
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+        self._running = 0
+        self._per_client: Counter[str] = Counter()
+        self._admitted = 0
+        self._rejected: Counter[str] = Counter()
+        self._waits: deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        # Moving average of how long a spawn holds its slot, for Retry-After
+        self._avg_spawn_time = 1.0
+
+    def has_capacity(self) -> bool:
+        """Check whether a spawn would start right away."""
+        return self._waiting == 0 and not self._semaphore.locked()
+
+    def suggested_retry_after(self) -> float:
+        """Estimate how long until the current queue has drained."""
+        backlog = (self._waiting + 1) / self.max_concurrent
+        return max(self.retry_after, backlog * self._avg_spawn_time)
+
+    @asynccontextmanager
+    async def admit(self, client_key: str, wait: bool = True) -> AsyncIterator[None]:
+        """
+        Hold a spawn slot for the duration of the block.
+
+        Args:
+            client_key: User or IP address the client quota applies to
+            wait: Whether to queue for a slot; when False, the spawn is
+                rejected unless it can start right away
+
+        Raises:
+            SpawnRejectedError: If the client is over quota, the queue is full or
+                no slot frees up within `max_wait` seconds
+
+        """
+        if (
+            self.max_per_client is not None
+            and self._per_client[client_key] >= self.max_per_client
+        ):
+            self._reject("client-quota")
+        if not wait and not self.has_capacity():
+            # Not a failure the client sees, so it is neither counted nor logged
+            raise SpawnRejectedError("no-slot", self.suggested_retry_after())
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._reject("queue-full")
+
+        loop = asyncio.get_running_loop()
+        self._per_client[client_key] += 1
+        try:
+            queued_at = loop.time()
+            self._waiting += 1
+            try:
+                async with asyncio.timeout(self.max_wait):
+                    await self._semaphore.acquire()
+            except TimeoutError:
+                self._reject("queue-timeout")
+            finally:
+                self._waiting -= 1
+            self._record_wait(loop.time() - queued_at)
+
+            started_at = loop.time()
+            self._running += 1
+            try:
+                yield
+            finally:
+                self._running -= 1
+                self._semaphore.release()
+                elapsed = loop.time() - started_at
+                self._avg_spawn_time = 0.8 * self._avg_spawn_time + 0.2 * elapsed
+        finally:
+            self._per_client[client_key] -= 1
+            if not self._per_client[client_key]:
+                del self._per_client[client_key]
+
+    def metrics(self) -> dict[str, Any]:
+        """Return queue state, admission counts and queue wait statistics."""
+        waits = sorted(self._waits)
+
+        def percentile(fraction: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(fraction * len(waits)))]
+
+        return {
+            "running": self._running,
+            "queued": self._waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected": dict(self._rejected),
+            "wait_seconds": {
+                "mean": self._total_wait / self._admitted if self._admitted else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": self._max_wait_seen,
+            },
+        }
+
+    def _record_wait(self, wait: float) -> None:
+        self._admitted += 1
+        self._waits.append(wait)
+        self._total_wait += wait
+        self._max_wait_seen = max(self._max_wait_seen, wait)
+
+    def _reject(self, reason: str) -> NoReturn:
+        self._rejected[reason] += 1
+        retry_after = self.suggested_retry_after()
+        logger.warning(
+            f"Rejecting session spawn ({reason}), retry after {retry_after:.1f}s"
+        )
+        raise SpawnRejectedError(reason, retry_after)
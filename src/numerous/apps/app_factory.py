@@ -3,32 +3,62 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
 import json
 import logging
+import math
+import os
+import secrets
 import time
 import uuid
-from contextlib import suppress
+from collections import deque
+from contextlib import AbstractAsyncContextManager, nullcontext, suppress
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, cast
 
 import jinja2
 from fastapi import HTTPException, Request, WebSocket
 
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Sequence
+
     from anywidget import AnyWidget
 
+    from .backplane import MessageBackplane, SessionDirectory
+    from .communication import MultiProcessExecutionManager, ThreadedExecutionManager
+    from .compute import ComputeService
+    from .remote import RemoteExecutionManager, RemoteWorkerPool
     from .session_management import GlobalSessionManager
-from fastapi.responses import Response
+    from .session_store import SessionStateStore
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from jinja2 import FileSystemLoader, meta
 from starlette.responses import HTMLResponse
 from starlette.websockets import WebSocketDisconnect, WebSocketState
 
-from .execution import _describe_widgets
+from .admission import SpawnRejectedError, SpawnScheduler
+from .backplane import BackplaneError
+from .broadcast import (
+    BroadcastSession,
+    check_write_token,
+    is_broadcast_session,
+    write_token,
+)
+from .cache import result_cache
+from .datasets import datasets
+from .execution import (
+    MAX_CONCURRENT_ACTIONS,
+    MAX_CONCURRENT_ACTIONS_ENV,
+    _describe_widgets,
+)
+from .launcher import rendezvous_worker, worker_affinity
 from .models import (
+    ActionCancelMessage,
+    ActionChunkMessage,
     ActionRequestMessage,
     ActionResponseMessage,
     AppDescription,
@@ -47,12 +77,28 @@ from .models import (
     WidgetUpdateRequestMessage,
     encode_model,
 )
+from .resource_hints import (
+    EarlyHintsMiddleware,
+    ResourceHint,
+    collect_widget_assets,
+    format_link_header,
+    is_module_url,
+    widget_asset_hash,
+)
 from .server import (
     NumerousApp,
     _get_template,
     _load_main_js,
+    _load_worker_js,
+)
+from .session_management import (
+    CallbackHandle,
+    SessionId,
+    SessionInfo,
+    SessionManager,
+    WidgetId,
 )
-from .session_management import SessionManager, WidgetId
+from .session_store import STATE_FLUSH_INTERVAL
 
 
 logger = logging.getLogger(__name__)
@@ -64,19 +110,23 @@ OVERFLOW_SESSION_TIMEOUT = 60 * 60  # 1 hour in seconds
 CLEANUP_INTERVAL = 5 * 60  # Check for expired sessions every 5 minutes
 STALE_SESSION_THRESHOLD = 120  # Consider session stale after 2 minutes of inactivity
 NEW_SESSION_GRACE_PERIOD = 5.0  # Grace period for new sessions in seconds
+SPECULATIVE_SESSION_TIMEOUT = 30.0  # Reclaim speculative sessions unclaimed for 30 s
+SHARED_SESSION_ID = "shared"  # Id of the app instance running app-global widgets
 
-# Package directory
-PACKAGE_DIR = Path(__file__).parent
-
+# Session spawn admission constants
+MAX_CONCURRENT_SPAWNS = 4  # Sessions allowed to boot at the same time
+MAX_SPAWN_QUEUE = 100  # Spawns allowed to wait for a slot before shedding load
+MAX_SPAWNS_PER_CLIENT = 4  # Queued or booting spawns per user or IP address
+MAX_SPAWN_WAIT = 30.0  # Seconds a spawn may wait for a slot
 
-@dataclass
-class SessionInfo:
-    """Stores session information including timing data."""
+# Action API constants
+DISCONNECT_POLL_INTERVAL = 0.5  # Seconds between checks for a gone HTTP caller
+CLIENT_CLOSED_REQUEST = 499  # Status of action calls whose caller went away
+ACTION_TIMEOUT = 10.0  # Seconds to wait for an action's result or next chunk
+MAX_PENDING_CLIENT_MESSAGES = 1000  # Received messages waiting per connection
 
-    data: SessionManager
-    last_active: float = field(default_factory=time.time)
-    created_at: float = field(default_factory=time.time)
-    connections: dict[str, WebSocket] = field(default_factory=dict)
+# Package directory
+PACKAGE_DIR = Path(__file__).parent
 
 
 @dataclass
@@ -89,12 +139,16 @@ class NumerousAppServerState:
     module_path: str
     template: str
     internal_templates: Jinja2Templates
-    sessions: dict[str, SessionInfo]
+    # Shared with session_manager, which owns the session lifecycle
+    sessions: dict[SessionId, SessionInfo]
     path_prefix: str = ""
     app_id: str = ""
     widgets: dict[str, AnyWidget] = field(default_factory=dict)
     allow_threaded: bool = False
-    cleanup_task: asyncio.Task[None] | None = None
+    # Worker daemons running app instances on other hosts
+    remote_workers: RemoteWorkerPool | None = None
+    # Process pool running heavy jobs submitted by all sessions
+    compute: ComputeService | None = None
     # Auth configuration
     auth_enabled: bool = False
     login_template: str | None = None
@@ -103,6 +157,40 @@ class NumerousAppServerState:
     # Theme configuration
     theme_css: str | None = None
     shared_theme_available: bool = False
+    # Off-main-thread WebSocket decoding in the browser
+    ws_worker: bool = False
+    ws_worker_typed_arrays: bool = False
+    worker_js: str = ""
+    # Sessions started while serving the home page, awaiting their first client
+    speculative_sessions: bool = False
+    speculative_session_timeout: float = SPECULATIVE_SESSION_TIMEOUT
+    pending_speculative_sessions: dict[str, asyncio.TimerHandle] = field(
+        default_factory=dict
+    )
+    # Preload hints for home page assets and content-addressed widget modules
+    resource_hints: bool = True
+    widget_assets: dict[str, str] = field(default_factory=dict)
+    # Admission control for starting new sessions
+    spawn_scheduler: SpawnScheduler = field(default_factory=SpawnScheduler)
+    # Relaying clients to sessions hosted by other workers
+    backplane: MessageBackplane | None = None
+    worker_id: str = ""
+    # Clients connected here whose session runs on another worker, by client id
+    relayed_clients: dict[str, WebSocket] = field(default_factory=dict)
+    # Clients of local sessions connected through other workers, by client id
+    relays: dict[str, _Relay] = field(default_factory=dict)
+    # Named sessions shared by all clients that join them
+    broadcast_sessions: dict[str, BroadcastSession] = field(default_factory=dict)
+    broadcast_secret: bytes = field(default_factory=lambda: secrets.token_bytes(32))
+    broadcast_fanouts: dict[str, _BroadcastFanout] = field(default_factory=dict)
+    # App-global widgets, run once in a shared app instance for all sessions
+    shared_app_generator: Callable[[], dict[str, AnyWidget]] | None = None
+    shared_widgets: dict[str, AnyWidget] = field(default_factory=dict)
+    shared_session: SessionManager | None = None
+    # Configurations of the shared widgets, kept current by their updates
+    shared_widget_configs: dict[str, Any] = field(default_factory=dict)
+    # Every client connected to this server, which all see the shared widgets
+    shared_connections: dict[str, WebSocket] = field(default_factory=dict)
     # Per-app session manager (factory-only)
     session_manager: GlobalSessionManager | None = None
 
@@ -116,12 +204,15 @@ async def _get_app_session(
     template: str,
     app_id: str = "",
     allow_create: bool = True,
+    remote_workers: RemoteWorkerPool | None = None,
+    keep_session_id: bool = False,
 ) -> SessionManager:
-    """Get or create a session using the provided per-app session manager."""
-    import uuid
+    """
+    Get or create a session using the provided per-app session manager.
 
-    from .communication import MultiProcessExecutionManager, ThreadedExecutionManager
-    from .server import _app_process
+    Unknown sessions get a new id unless `keep_session_id` is set, as for
+    broadcast sessions, whose id is derived from their name.
+    """
     from .session_management import SessionId
 
     # Generate a session ID if one doesn't exist
@@ -130,32 +221,85 @@ async def _get_app_session(
     ):
         if not allow_create:
             raise ValueError("Session ID not found.")
-        session_id = str(uuid.uuid4())
 
-        if allow_threaded:
-            execution_manager: MultiProcessExecutionManager | ThreadedExecutionManager
-            execution_manager = ThreadedExecutionManager(
-                target=_app_process,  # type: ignore[arg-type]
-                session_id=session_id,
+        # A session unknown to this server run may have been saved by an earlier one
+        saved_state = None
+        if session_id not in ["", "null", "undefined"]:
+            saved_state = await session_manager.load_saved_state(SessionId(session_id))
+            if session_manager.has_session(SessionId(session_id)):
+                return session_manager.get_session(SessionId(session_id))
+        if saved_state is None and not keep_session_id:
+            session_id = session_manager.new_session_id()
+
+        start = partial(
+            _start_execution_manager,
+            allow_threaded,
+            session_id,
+            base_dir,
+            module_path,
+            template,
+            app_id,
+            remote_workers,
+        )
+
+        # Starting an app instance may block, e.g. on a remote worker
+        execution_manager = await asyncio.to_thread(start)
+        if session_manager.has_session(SessionId(session_id)):
+            # Another request restored the same session meanwhile
+            execution_manager.request_stop()
+            return session_manager.get_session(SessionId(session_id))
+
+        # Create session in this app's session manager; hibernated sessions
+        # respawn their app instance the same way
+        if saved_state is not None:
+            session_manager_inst = await session_manager.restore_session(
+                SessionId(session_id), execution_manager, saved_state, respawn=start
             )
+            logger.info(f"Restored session {session_id} from saved state.")
         else:
-            execution_manager = MultiProcessExecutionManager(
-                target=_app_process,  # type: ignore[arg-type]
-                session_id=session_id,
+            session_manager_inst = session_manager.create_session(
+                SessionId(session_id), execution_manager, respawn=start
             )
-        execution_manager.start(str(base_dir), module_path, template, app_id)
-
-        # Create session in this app's session manager
-        session_manager_inst = session_manager.create_session(
-            SessionId(session_id), execution_manager
-        )
-        logger.info(f"Creating new session {session_id}.")
+            logger.info(f"Creating new session {session_id}.")
     else:
         session_manager_inst = session_manager.get_session(SessionId(session_id))
 
     return session_manager_inst
 
 
+def _start_execution_manager(
+    allow_threaded: bool,
+    session_id: str,
+    base_dir: str,
+    module_path: str,
+    template: str,
+    app_id: str,
+    remote_workers: RemoteWorkerPool | None = None,
+) -> MultiProcessExecutionManager | ThreadedExecutionManager | RemoteExecutionManager:
+    """Start an app instance for a session in a thread, a process or a worker."""
+    from .communication import MultiProcessExecutionManager, ThreadedExecutionManager
+    from .remote import RemoteExecutionManager
+    from .server import _app_process
+
+    execution_manager: (
+        MultiProcessExecutionManager | ThreadedExecutionManager | RemoteExecutionManager
+    )
+    if remote_workers is not None:
+        execution_manager = RemoteExecutionManager(remote_workers, session_id)
+    elif allow_threaded:
+        execution_manager = ThreadedExecutionManager(
+            target=_app_process,  # type: ignore[arg-type]
+            session_id=session_id,
+        )
+    else:
+        execution_manager = MultiProcessExecutionManager(
+            target=_app_process,  # type: ignore[arg-type]
+            session_id=session_id,
+        )
+    execution_manager.start(str(base_dir), module_path, template, app_id)
+    return execution_manager
+
+
 def _wrap_html(key: str) -> str:
     """Wrap widget ID in a container div."""
     return f'<div id="{key}" style="display: flex; width: 100%; height: 100%;"></div>'
@@ -175,6 +319,30 @@ def create_numerous_app(
     public_routes: list[str] | None = None,
     protected_routes: list[str] | None = None,
     theme_css: str | None = None,
+    ws_worker: bool = False,
+    ws_worker_typed_arrays: bool = False,
+    speculative_sessions: bool = False,
+    speculative_session_timeout: float = SPECULATIVE_SESSION_TIMEOUT,
+    resource_hints: bool = True,
+    max_sessions: int = MAX_SESSIONS,
+    session_timeout: float = DEFAULT_SESSION_TIMEOUT,
+    overflow_session_timeout: float = OVERFLOW_SESSION_TIMEOUT,
+    session_cleanup_interval: float = CLEANUP_INTERVAL,
+    hibernate_after: float | None = None,
+    session_store: SessionStateStore | None = None,
+    session_store_flush_interval: float = STATE_FLUSH_INTERVAL,
+    session_directory: SessionDirectory | None = None,
+    backplane: MessageBackplane | None = None,
+    worker_id: str | None = None,
+    max_concurrent_spawns: int = MAX_CONCURRENT_SPAWNS,
+    max_spawn_queue: int = MAX_SPAWN_QUEUE,
+    max_spawns_per_client: int | None = MAX_SPAWNS_PER_CLIENT,
+    max_spawn_wait: float = MAX_SPAWN_WAIT,
+    remote_workers: RemoteWorkerPool | None = None,
+    broadcast_sessions: Sequence[BroadcastSession] | None = None,
+    shared_app_generator: Callable[[], dict[str, AnyWidget]] | None = None,
+    compute: ComputeService | None = None,
+    max_concurrent_actions: int = MAX_CONCURRENT_ACTIONS,
 ) -> NumerousApp:
     """
     Create a new NumerousApp instance with all routes configured.
@@ -196,6 +364,53 @@ def create_numerous_app(
         public_routes: Routes that don't require authentication
         protected_routes: Routes that require authentication
         theme_css: Optional CSS string for theme customization
+        ws_worker: Whether the browser should receive and decode WebSocket
+            messages in a Web Worker instead of on the main thread
+        ws_worker_typed_arrays: Whether the worker should deliver long numeric
+            arrays as Float64Array (transferred zero-copy) instead of plain arrays
+        speculative_sessions: Whether serving the home page starts a session right
+            away, so the app instance boots while the browser loads assets
+        speculative_session_timeout: Seconds before a speculative session that no
+            client has claimed is shut down
+        resource_hints: Whether the home page preloads numerous.js, the base and
+            theme CSS and the widget modules (also sent as 103 Early Hints when
+            the ASGI server supports them)
+        max_sessions: Number of sessions above which the least recently active
+            sessions are shut down
+        session_timeout: Seconds of inactivity before a session is shut down
+        overflow_session_timeout: Shorter inactivity timeout applied while there
+            are more than `max_sessions` sessions
+        session_cleanup_interval: Seconds between checks for expired sessions
+        hibernate_after: Seconds of inactivity after which a session's app
+            instance is stopped, keeping its widget state to restore when the
+            session is used again (never when None)
+        session_store: Persists the widget state of sessions, so clients keep
+            their session and widget values across server restarts
+        session_store_flush_interval: Seconds between writes to `session_store`
+        session_directory: Directory shared by the workers serving this app,
+            recording which worker hosts each session
+        backplane: Carries requests and websocket traffic to the worker hosting
+            a session, so clients can connect to any worker; requires
+            `session_directory`
+        worker_id: Id of this worker on the backplane (process id and app id
+            when None)
+        max_concurrent_spawns: Number of new sessions allowed to boot at once
+        max_spawn_queue: Number of new sessions allowed to wait for a boot slot;
+            further requests get HTTP 503 with a Retry-After header
+        max_spawns_per_client: Number of new sessions one user (or IP address,
+            without authentication) may have waiting or booting, or None
+        max_spawn_wait: Seconds a new session may wait for a boot slot before
+            the request is rejected with HTTP 503
+        remote_workers: Worker daemons to run app instances on instead of this
+            machine; each session starts on the least-loaded worker
+        broadcast_sessions: Named sessions that clients join with
+            `?broadcast=<name>` in the page URL, sharing one app instance
+        shared_app_generator: Creates app-global widgets when the server starts;
+            they run once, outside the sessions, and every client sees them
+        compute: Process pool that runs the jobs sessions submit with
+            `numerous.apps.compute.submit`, shared fairly between sessions
+        max_concurrent_actions: Async actions each session runs at the same
+            time; further calls wait for one of them to finish
 
     Returns:
         Configured NumerousApp instance
@@ -209,6 +424,9 @@ def create_numerous_app(
     if widgets is None:
         widgets = {}
 
+    # App instances read the limit when they start, in this or a child process
+    os.environ[MAX_CONCURRENT_ACTIONS_ENV] = str(max_concurrent_actions)
+
     # Configure templates. Check multiple locations: base_dir, base_dir/templates/,
     # and package templates.
     template_dirs = [
@@ -222,13 +440,27 @@ def create_numerous_app(
     # Create a per-app session manager for multi-app isolation
     from .session_management import GlobalSessionManager
 
-    app_session_manager = GlobalSessionManager()
+    if worker_id is None:
+        worker_id = f"{os.getpid()}-{app_id or 'root'}"
+
+    app_session_manager = GlobalSessionManager(
+        session_timeout=session_timeout,
+        cleanup_interval=session_cleanup_interval,
+        max_sessions=max_sessions,
+        overflow_session_timeout=overflow_session_timeout,
+        hibernate_after=hibernate_after,
+        state_store=session_store,
+        state_flush_interval=session_store_flush_interval,
+        directory=session_directory,
+        worker_id=worker_id,
+        accept_session_id=_session_affinity_filter(),
+    )
 
     # Create app state configuration
     config = NumerousAppServerState(
         dev=dev,
         main_js=_load_main_js(),
-        sessions={},
+        sessions=app_session_manager.sessions,
         base_dir=str(base_dir),
         module_path=module_path,
         template=template,
@@ -237,11 +469,30 @@ def create_numerous_app(
         path_prefix=path_prefix,
         app_id=app_id,
         allow_threaded=allow_threaded,
+        remote_workers=remote_workers,
+        compute=compute,
+        broadcast_sessions={b.name: b for b in broadcast_sessions or ()},
+        shared_app_generator=shared_app_generator,
         auth_enabled=auth_provider is not None,
         login_template=login_template,
         public_routes=public_routes or [],
         protected_routes=protected_routes,
         theme_css=theme_css,
+        ws_worker=ws_worker,
+        ws_worker_typed_arrays=ws_worker_typed_arrays,
+        worker_js=_load_worker_js() if ws_worker else "",
+        speculative_sessions=speculative_sessions,
+        speculative_session_timeout=speculative_session_timeout,
+        resource_hints=resource_hints,
+        widget_assets=collect_widget_assets(widgets),
+        spawn_scheduler=SpawnScheduler(
+            max_concurrent=max_concurrent_spawns,
+            max_queue=max_spawn_queue,
+            max_per_client=max_spawns_per_client,
+            max_wait=max_spawn_wait,
+        ),
+        backplane=backplane,
+        worker_id=worker_id,
     )
 
     app.state.config = config
@@ -265,6 +516,13 @@ def create_numerous_app(
             base_path=path_prefix,
         )
 
+    # Added last so it wraps the auth middleware: hints must be sent before
+    # anything else is written to the response
+    if resource_hints:
+        app.add_middleware(
+            EarlyHintsMiddleware, hints=lambda: _home_resource_hints(app, path_prefix)
+        )
+
     return app
 
 
@@ -300,6 +558,11 @@ def _define_routes(  # noqa: C901
         """Get widget configurations for the session."""
         return await _handle_get_widgets(app, request)
 
+    @app.get("/api/metrics")  # type: ignore[misc]
+    async def get_metrics() -> dict[str, Any]:
+        """Return server-side operational metrics."""
+        return _collect_metrics(app)
+
     @app.get("/numerous.js")  # type: ignore[misc]
     async def serve_main_js() -> Response:
         """Serve the main JavaScript file."""
@@ -307,6 +570,27 @@ def _define_routes(  # noqa: C901
             content=app.state.config.main_js, media_type="application/javascript"
         )
 
+    @app.get("/numerous-worker.js")  # type: ignore[misc]
+    async def serve_worker_js() -> Response:
+        """Serve the WebSocket decoding worker script."""
+        if not app.state.config.ws_worker:
+            raise HTTPException(status_code=404, detail="WebSocket worker disabled")
+        return Response(
+            content=app.state.config.worker_js, media_type="application/javascript"
+        )
+
+    @app.get("/numerous-assets/{asset_hash}.js")  # type: ignore[misc]
+    async def serve_widget_asset(asset_hash: str) -> Response:
+        """Serve an inline widget module by its content hash."""
+        source = app.state.config.widget_assets.get(asset_hash)
+        if source is None:
+            raise HTTPException(status_code=404, detail="Widget asset not found")
+        return Response(
+            content=source,
+            media_type="application/javascript",
+            headers={"Cache-Control": "public, max-age=31536000, immutable"},
+        )
+
     @app.get("/api/describe")  # type: ignore[misc]
     async def describe_app() -> AppDescription:
         """Return a complete description of the app."""
@@ -325,23 +609,28 @@ def _define_routes(  # noqa: C901
         trait_name: str,
         trait_value: SetTraitValue,
         session_id: str,
+        write_token: str | None = None,
     ) -> TraitValue:
         """Set the value of a widget's trait."""
+        _require_writer(app, session_id, write_token)
         return await _handle_set_trait(
             app, widget_id, trait_name, trait_value, session_id
         )
 
     @app.post("/api/widgets/{widget_id}/actions/{action_name}")  # type: ignore[misc]
     async def execute_widget_action(
+        request: Request,
         widget_id: str,
         action_name: str,
         session_id: str,
         args: list[Any] | None = None,
         kwargs: dict[str, Any] | None = None,
+        write_token: str | None = None,
     ) -> Any:  # noqa: ANN401
         """Execute an action on a widget."""
+        _require_writer(app, session_id, write_token)
         return await _handle_widget_action(
-            app, widget_id, action_name, session_id, args, kwargs
+            app, widget_id, action_name, session_id, args, kwargs, request
         )
 
     @app.websocket("/ws/{client_id}/{session_id}")  # type: ignore[misc]
@@ -354,9 +643,18 @@ def _define_routes(  # noqa: C901
     @app.on_event("startup")  # type: ignore[misc]
     async def start_cleanup_task() -> None:
         """Start the session cleanup task when the app starts."""
-        app.state.config.cleanup_task = asyncio.create_task(
-            _cleanup_expired_sessions(app)
-        )
+        await app.state.config.session_manager.start_cleanup_task()
+        await _start_shared_widgets(app)
+        # Before any session process starts, so they inherit its address
+        if app.state.config.compute is not None:
+            await asyncio.to_thread(app.state.config.compute.start)
+        if app.state.config.remote_workers is not None:
+            await asyncio.to_thread(app.state.config.remote_workers.start)
+        if app.state.config.backplane is not None:
+            await app.state.config.backplane.start(
+                app.state.config.worker_id,
+                partial(_handle_backplane_message, app),
+            )
 
     @app.on_event("shutdown")  # type: ignore[misc]
     async def cleanup_all_sessions() -> None:
@@ -364,6 +662,28 @@ def _define_routes(  # noqa: C901
         await _shutdown_cleanup(app)
 
 
+def _collect_metrics(app: NumerousApp) -> dict[str, Any]:
+    """Return the operational metrics of the server and the shared stores."""
+    session_manager = app.state.config.session_manager
+    metrics: dict[str, Any] = {
+        "sessions": len(app.state.config.sessions),
+        "hibernated_sessions": session_manager.hibernated_count(),
+        "spawn": app.state.config.spawn_scheduler.metrics(),
+    }
+    if session_manager.state_writer is not None:
+        metrics["state_store"] = session_manager.state_writer.metrics()
+    if app.state.config.compute is not None:
+        metrics["compute"] = app.state.config.compute.metrics()
+    # Counted by all session processes in the shared cache database
+    cache_metrics = result_cache.metrics()
+    if cache_metrics:
+        metrics["cache"] = cache_metrics
+    dataset_metrics = datasets.metrics()
+    if dataset_metrics:
+        metrics["datasets"] = dataset_metrics
+    return metrics
+
+
 async def _render_home(
     app: NumerousApp,
     templates: Jinja2Templates,
@@ -375,7 +695,7 @@ async def _render_home(
     template_name = _get_template(template, app.state.config.internal_templates)
 
     # Create the template context with widget divs
-    template_widgets = {key: _wrap_html(key) for key in app.widgets}
+    template_widgets = {key: _wrap_html(key) for key in _all_widgets(app)}
 
     try:
         template_source = ""
@@ -410,7 +730,7 @@ async def _render_home(
     # Check for missing widgets
     missing_widgets = [
         widget_id
-        for widget_id in app.widgets
+        for widget_id in _all_widgets(app)
         if f'id="{widget_id}"' not in template_content
     ]
 
@@ -424,8 +744,25 @@ async def _render_home(
     splash_screen = templates.get_template("splash_screen.html.j2").render()
     session_lost_banner = templates.get_template("session_lost_banner.html.j2").render()
 
-    # Inject base path for JavaScript
-    base_path_script = f'<script>window.NUMEROUS_BASE_PATH = "{path_prefix}";</script>'
+    # Inject base path (and worker settings) for JavaScript
+    worker_config = ""
+    if app.state.config.ws_worker:
+        worker_options = {"typedArrays": app.state.config.ws_worker_typed_arrays}
+        worker_config = f"window.NUMEROUS_WS_WORKER = {json.dumps(worker_options)};"
+
+    # Boot the app instance in parallel with the browser loading assets
+    speculative_config = ""
+    if app.state.config.speculative_sessions:
+        speculative_id = await _start_speculative_session(
+            app, _spawn_client_key(request)
+        )
+        if speculative_id is not None:
+            speculative_config = f'window.NUMEROUS_SESSION_ID = "{speculative_id}";'
+
+    base_path_script = (
+        f'<script>window.NUMEROUS_BASE_PATH = "{path_prefix}";'
+        f"{worker_config}{speculative_config}</script>"
+    )
 
     # Inject base CSS - use path_prefix for multi-app deployments
     base_css_link = (
@@ -433,10 +770,14 @@ async def _render_home(
         f'href="{path_prefix}/numerous-static/css/numerous-base.css">'
     )
 
+    # Let the browser fetch scripts and widget modules while parsing the HTML
+    hints = _home_resource_hints(app, path_prefix)
+    hint_links = "".join(hint.to_html() for hint in hints)
+
     # Build modified HTML
     modified_html = template_content.replace(
         "</head>",
-        f"{base_css_link}{base_path_script}</head>",
+        f"{hint_links}{base_css_link}{base_path_script}</head>",
     )
     modified_html = modified_html.replace(
         "</body>",
@@ -444,7 +785,37 @@ async def _render_home(
         f'<script src="{path_prefix}/numerous.js"></script></body>',
     )
 
-    return HTMLResponse(modified_html)
+    headers = {"Link": format_link_header(hints)} if hints else None
+    return HTMLResponse(modified_html, headers=headers)
+
+
+def _home_resource_hints(app: NumerousApp, path_prefix: str) -> list[ResourceHint]:
+    """List the assets the home page is known to need, for preloading."""
+    config = app.state.config
+    if not config.resource_hints:
+        return []
+
+    hints = [
+        ResourceHint(f"{path_prefix}/numerous.js", as_="script"),
+        ResourceHint(
+            f"{path_prefix}/numerous-static/css/numerous-base.css", as_="style"
+        ),
+    ]
+    # Set by create_multi_app when a shared theme is served at the root
+    if getattr(app.state, "shared_theme_available", config.shared_theme_available):
+        hints.append(ResourceHint("/shared-static/css/theme.css", as_="style"))
+
+    hints.extend(
+        ResourceHint(
+            f"{path_prefix}/numerous-assets/{asset_hash}.js", rel="modulepreload"
+        )
+        for asset_hash in config.widget_assets
+    )
+    for widget in _all_widgets(app).values():
+        source = getattr(widget, "_esm", "")
+        if isinstance(source, str) and is_module_url(source):
+            hints.append(ResourceHint(source, rel="modulepreload"))
+    return hints
 
 
 def _handle_template_error(
@@ -459,31 +830,203 @@ def _handle_template_error(
     )
 
 
+async def _start_speculative_session(app: NumerousApp, client_key: str) -> str | None:
+    """Start a session before any client asks for one and schedule its reclaim."""
+    spawn_scheduler: SpawnScheduler = app.state.config.spawn_scheduler
+    try:
+        # Never let speculation wait for, or compete with clients for, a slot
+        async with spawn_scheduler.admit(client_key, wait=False):
+            session = await _get_app_session(
+                app.state.config.session_manager,
+                app.state.config.allow_threaded,
+                "",
+                app.state.config.base_dir,
+                app.state.config.module_path,
+                app.state.config.template,
+                app.state.config.app_id,
+                remote_workers=app.state.config.remote_workers,
+            )
+    except SpawnRejectedError:
+        return None
+    except Exception:
+        logger.exception("Failed to start speculative session")
+        return None
+
+    session_id = str(session.session_id)
+    loop = asyncio.get_running_loop()
+    app.state.config.pending_speculative_sessions[session_id] = loop.call_later(
+        app.state.config.speculative_session_timeout,
+        lambda: asyncio.create_task(_reclaim_speculative_session(app, session_id)),
+    )
+    logger.debug(f"Started speculative session {session_id}")
+    return session_id
+
+
+def _claim_speculative_session(
+    app: NumerousApp, session_id: str | None, speculative_id: str | None
+) -> str | None:
+    """
+    Resolve which session a client should use when offered a speculative one.
+
+    A client that already has a live session keeps it and the speculative session
+    is released right away; otherwise the speculative session is claimed.
+    """
+    pending = app.state.config.pending_speculative_sessions
+    if not speculative_id or speculative_id not in pending:
+        return session_id
+
+    if (
+        session_id
+        and session_id != speculative_id
+        and app.state.config.session_manager.has_session(SessionId(session_id))
+    ):
+        pending.pop(speculative_id).cancel()
+        asyncio.create_task(_reclaim_speculative_session(app, speculative_id))  # noqa: RUF006
+        return session_id
+
+    pending.pop(speculative_id).cancel()
+    logger.debug(f"Claimed speculative session {speculative_id}")
+    return speculative_id
+
+
+async def _reclaim_speculative_session(app: NumerousApp, session_id: str) -> None:
+    """Shut down a speculative session that no client has claimed."""
+    app.state.config.pending_speculative_sessions.pop(session_id, None)
+    session_manager = app.state.config.session_manager
+    if not session_manager.has_session(SessionId(session_id)):
+        return
+
+    logger.info(f"Reclaiming unclaimed speculative session {session_id}")
+    await session_manager.remove_session(SessionId(session_id))
+
+
 async def _handle_get_widgets(app: NumerousApp, request: Request) -> dict[str, Any]:
     """Handle the get widgets API endpoint."""
-    session_id = request.query_params.get("session_id")
-    try:
-        session = await _get_app_session(
-            app.state.config.session_manager,
-            app.state.config.allow_threaded,
-            session_id,
-            app.state.config.base_dir,
-            app.state.config.module_path,
-            app.state.config.template,
-            app.state.config.app_id,
+    broadcast_name = request.query_params.get("broadcast")
+    if broadcast_name is not None:
+        return await _join_broadcast_session(app, request, broadcast_name)
+
+    session_id = _claim_speculative_session(
+        app,
+        request.query_params.get("session_id"),
+        request.query_params.get("speculative_session_id"),
+    )
+    client_key = _spawn_client_key(request)
+
+    # Sessions hosted by another worker answer through the backplane
+    owner = await _remote_owner(app, session_id)
+    if owner is not None and session_id is not None:
+        try:
+            return await _relay_get_widgets(app, owner, session_id, client_key)
+        except BackplaneError:
+            logger.warning(f"Worker {owner} is unreachable, serving {session_id} here")
+
+    return await _get_widgets_response(app, session_id, client_key)
+
+
+async def _join_broadcast_session(
+    app: NumerousApp, request: Request, name: str
+) -> dict[str, Any]:
+    """Join a broadcast session, starting it for its first client."""
+    broadcast = app.state.config.broadcast_sessions.get(name)
+    if broadcast is None:
+        raise HTTPException(status_code=404, detail="Broadcast session not found.")
+
+    session_id = broadcast.session_id
+    client_key = _spawn_client_key(request)
+    writable = broadcast.allows_write(
+        request.query_params.get("key"), getattr(request.state, "user", None)
+    )
+    # One worker hosts the session; the others relay its viewers to it
+    owner = await _claim_broadcast_session(app, session_id)
+    response: dict[str, Any] | None = None
+    if owner is not None:
+        try:
+            response = await _relay_get_widgets(
+                app, owner, session_id, client_key, writable=writable
+            )
+        except BackplaneError:
+            logger.warning(f"Worker {owner} is unreachable, hosting {session_id} here")
+            await app.state.config.session_manager.directory.register(
+                session_id, app.state.config.worker_id
+            )
+    if response is None:
+        response = await _get_widgets_response(
+            app, session_id, client_key, keep_session_id=True
+        )
+        if writable:
+            response["write_token"] = write_token(
+                app.state.config.broadcast_secret, session_id
+            )
+    response["broadcast"] = {"name": name, "writable": writable}
+    return response
+
+
+async def _claim_broadcast_session(app: NumerousApp, session_id: str) -> str | None:
+    """Return the worker hosting a broadcast session, claiming it if it has none."""
+    config = app.state.config
+    if (
+        config.backplane is None
+        or config.session_manager.directory is None
+        or config.session_manager.has_session(SessionId(session_id))
+    ):
+        return None
+    owner: str = await config.session_manager.directory.claim(
+        session_id, config.worker_id
+    )
+    return owner if owner != config.worker_id else None
+
+
+def _require_writer(app: NumerousApp, session_id: str, token: str | None) -> None:
+    """Reject changes to a broadcast session by clients without write access."""
+    if is_broadcast_session(session_id) and not check_write_token(
+        app.state.config.broadcast_secret, session_id, token
+    ):
+        raise HTTPException(
+            status_code=403, detail="Broadcast session is read-only for this client."
         )
-        logger.debug(f"Session ID: {session_id}")
 
-        # Fetch app definition with retries
-        app_definition = await _fetch_app_definition_with_retry(session)
 
-        # Process widget configs
-        for config in app_definition["widget_configs"].values():
-            if "defaults" in config:
-                config["defaults"] = json.loads(config["defaults"])
+async def _get_widgets_response(
+    app: NumerousApp,
+    session_id: str | None,
+    client_key: str,
+    keep_session_id: bool = False,
+) -> dict[str, Any]:
+    """Return the widget configuration of a session, starting it if needed."""
+    try:
+        # New sessions hold a spawn slot until their app has booted
+        async with _spawn_admission(app, client_key, session_id):
+            session = await _get_app_session(
+                app.state.config.session_manager,
+                app.state.config.allow_threaded,
+                session_id,
+                app.state.config.base_dir,
+                app.state.config.module_path,
+                app.state.config.template,
+                app.state.config.app_id,
+                remote_workers=app.state.config.remote_workers,
+                keep_session_id=keep_session_id,
+            )
+            logger.debug(f"Session ID: {session_id}")
+
+            # Fetch app definition with retries
+            app_definition = await _fetch_app_definition_with_retry(session)
 
-        init_config = InitConfigMessage(**app_definition)
+        init_config = _process_widget_configs(app, app_definition)
+        widget_configs = init_config.widget_configs
+        if app.state.config.shared_session is not None:
+            widget_configs = {
+                **widget_configs,
+                **app.state.config.shared_widget_configs,
+            }
 
+    except SpawnRejectedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy starting other sessions, please retry.",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        ) from None
     except TimeoutError:
         logger.exception(f"Timeout getting app definition for session {session_id}")
         raise HTTPException(
@@ -499,11 +1042,73 @@ async def _handle_get_widgets(app: NumerousApp, request: Request) -> dict[str, A
     else:
         return {
             "session_id": session.session_id,
-            "widgets": init_config.widget_configs,
+            "widgets": widget_configs,
             "logLevel": "DEBUG" if app.state.config.dev else "ERROR",
         }
 
 
+def _process_widget_configs(
+    app: NumerousApp, app_definition: dict[str, Any]
+) -> InitConfigMessage:
+    """Decode the widget defaults of an app definition for the client."""
+    for config in app_definition["widget_configs"].values():
+        if "defaults" in config:
+            config["defaults"] = json.loads(config["defaults"])
+        _use_widget_asset_url(app, config)
+    return InitConfigMessage(**app_definition)
+
+
+def _spawn_admission(
+    app: NumerousApp, client_key: str, session_id: str | None
+) -> AbstractAsyncContextManager[None]:
+    """Return the admission context for a request that may start a session."""
+    # Existing sessions skip admission unless their app instance must be respawned
+    session_manager = app.state.config.session_manager
+    if (
+        session_id
+        and session_manager.has_session(SessionId(session_id))
+        and not session_manager.get_session(SessionId(session_id)).hibernated
+    ):
+        return nullcontext()
+    spawn_scheduler: SpawnScheduler = app.state.config.spawn_scheduler
+    return spawn_scheduler.admit(client_key)
+
+
+def _spawn_client_key(request: Request) -> str:
+    """Return the key spawn quotas apply to: the user, or the IP address."""
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return f"user:{user.id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _session_affinity_filter() -> Callable[[str], bool] | None:
+    """
+    Accept only session ids the launcher's router sends to this worker.
+
+    Returns None when the app is not served by `numerous.apps.launcher`.
+    """
+    affinity = worker_affinity()
+    if affinity is None:
+        return None
+    index, count = affinity
+    return lambda session_id: rendezvous_worker(session_id, count) == index
+
+
+def _use_widget_asset_url(app: NumerousApp, config: dict[str, Any]) -> None:
+    """Point a widget at its preloaded module URL instead of inline source."""
+    if not app.state.config.resource_hints:
+        return
+    source = config.get("moduleUrl")
+    if not isinstance(source, str) or is_module_url(source):
+        return
+    asset_hash = widget_asset_hash(source)
+    if asset_hash in app.state.config.widget_assets:
+        config["moduleUrl"] = (
+            f"{app.state.config.path_prefix}/numerous-assets/{asset_hash}.js"
+        )
+
+
 async def _fetch_app_definition_with_retry(
     session: SessionManager,
 ) -> dict[str, Any]:
@@ -611,7 +1216,7 @@ async def _handle_describe_app(
             source=template_source,
             variables=list(template_variables),
         ),
-        widgets=_describe_widgets(app.widgets),
+        widgets=_describe_widgets(_all_widgets(app)),
     )
 
 
@@ -619,10 +1224,11 @@ async def _handle_get_trait(
     app: NumerousApp, widget_id: str, trait_name: str, session_id: str
 ) -> TraitValue:
     """Handle getting a widget trait value."""
-    if widget_id not in app.widgets:
+    widgets = _all_widgets(app)
+    if widget_id not in widgets:
         raise HTTPException(status_code=404, detail=f"Widget '{widget_id}' not found")
 
-    widget = app.widgets[widget_id]
+    widget = widgets[widget_id]
     if trait_name not in widget.traits():
         raise HTTPException(
             status_code=404,
@@ -659,10 +1265,11 @@ async def _handle_set_trait(
         allow_create=False,
     )
 
-    if widget_id not in app.widgets:
+    widgets = _all_widgets(app)
+    if widget_id not in widgets:
         raise HTTPException(status_code=404, detail=f"Widget '{widget_id}' not found")
 
-    widget = app.widgets[widget_id]
+    widget = widgets[widget_id]
     if trait_name not in widget.traits():
         raise HTTPException(
             status_code=404,
@@ -676,7 +1283,9 @@ async def _handle_set_trait(
         value=trait_value.value,
     )
 
-    await session_manager.send(update_message.model_dump())
+    await _widget_session(app, session_manager, widget_id).send(
+        update_message.model_dump()
+    )
 
     return TraitValue(
         widget_id=widget_id,
@@ -693,8 +1302,14 @@ async def _handle_widget_action(
     session_id: str,
     args: list[Any] | None,
     kwargs: dict[str, Any] | None,
+    request: Request | None = None,
 ) -> Any:  # noqa: ANN401
-    """Handle executing a widget action."""
+    """
+    Handle executing a widget action.
+
+    If the caller disconnects or the response times out, the app is asked to
+    cancel the action, which stops it if it is an async action.
+    """
     try:
         session = await _get_app_session(
             app.state.config.session_manager,
@@ -711,8 +1326,11 @@ async def _handle_widget_action(
             status_code=404, detail="Session not found or expired"
         ) from e
 
-    if widget_id not in app.widgets:
+    widget = _all_widgets(app).get(widget_id)
+    if widget is None:
         raise HTTPException(status_code=404, detail=f"Widget '{widget_id}' not found")
+    session = _widget_session(app, session, widget_id)
+    streams, timeout = _action_options(widget, action_name)
 
     request_id = str(uuid.uuid4())
     action_request = ActionRequestMessage(
@@ -724,12 +1342,18 @@ async def _handle_widget_action(
         request_id=request_id,
         client_id="api_client",
     )
+    if streams:
+        return StreamingResponse(
+            _stream_action(session, action_request, timeout),
+            media_type="application/x-ndjson",
+        )
 
     try:
-        response = await session.send(
+        response = await _send_unless_disconnected(
+            session,
             action_request.model_dump(),
-            wait_for_response=True,
-            timeout_seconds=10,
+            request,
+            timeout_seconds=timeout,
             message_types=[MessageType.ACTION_RESPONSE],
         )
         if response is None:
@@ -738,12 +1362,113 @@ async def _handle_widget_action(
         if action_response.error:
             raise HTTPException(status_code=500, detail=action_response.error)
         return action_response.result  # noqa: TRY300
+    except _CallerDisconnectedError as e:
+        await _cancel_action(session, request_id)
+        raise HTTPException(
+            status_code=CLIENT_CLOSED_REQUEST, detail="Client disconnected"
+        ) from e
     except TimeoutError as e:
+        await _cancel_action(session, request_id)
         raise HTTPException(
             status_code=504, detail="Timeout waiting for action response"
         ) from e
 
 
+def _action_options(widget: AnyWidget, action_name: str) -> tuple[bool, float]:
+    """Return whether an action streams its result, and its timeout."""
+    method = getattr(type(widget), action_name, None)
+    func = inspect.unwrap(method) if callable(method) else None
+    streams = inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+    timeout = getattr(method, "_action_timeout", None)
+    return streams, ACTION_TIMEOUT if timeout is None else timeout
+
+
+async def _stream_action(
+    session: SessionManager, request: ActionRequestMessage, idle_timeout: float
+) -> AsyncIterator[str]:
+    """
+    Yield the messages of a streaming action as lines of JSON.
+
+    Every chunk the action yields becomes an action-chunk line, and the
+    action-response line ends the stream. If no message arrives for
+    `idle_timeout` seconds, or the caller disconnects, the action is cancelled.
+    """
+    replies: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    async def collect(message: dict[str, Any]) -> None:
+        replies.put_nowait(message)
+
+    handle = session.register_callback(
+        collect,
+        message_types=[MessageType.ACTION_CHUNK, MessageType.ACTION_RESPONSE],
+        filter_func=lambda message: message.get("request_id") == request.request_id,
+    )
+    finished = False
+    try:
+        await session.send(request.model_dump())
+        while not finished:
+            try:
+                reply = await asyncio.wait_for(replies.get(), idle_timeout)
+            except TimeoutError:
+                timed_out = ActionResponseMessage(
+                    widget_id=request.widget_id,
+                    action_name=request.action_name,
+                    error="Timeout waiting for action response",
+                    client_id=request.client_id,
+                    request_id=request.request_id,
+                )
+                yield encode_model(timed_out) + "\n"
+                return
+            finished = reply["type"] == MessageType.ACTION_RESPONSE.value
+            model = ActionResponseMessage if finished else ActionChunkMessage
+            yield encode_model(model(**reply)) + "\n"
+    finally:
+        session.deregister_callback(handle)
+        if not finished:
+            await _cancel_action(session, request.request_id)
+
+
+class _CallerDisconnectedError(Exception):
+    """The HTTP client went away before the response was ready."""
+
+
+async def _send_unless_disconnected(
+    session: SessionManager,
+    message: dict[str, Any],
+    request: Request | None,
+    **kwargs: Any,  # noqa: ANN401
+) -> dict[str, Any] | None:
+    """Wait for the response to `message`, unless the caller goes away first."""
+    if request is None:
+        return await session.send(message, wait_for_response=True, **kwargs)
+    response = asyncio.ensure_future(
+        session.send(message, wait_for_response=True, **kwargs)
+    )
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({response, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect.cancel()
+    if not response.done():
+        response.cancel()
+        with suppress(asyncio.CancelledError):
+            await response
+        raise _CallerDisconnectedError
+    return response.result()
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # Starlette only offers a non-blocking check, so poll it
+    while not await request.is_disconnected():  # noqa: ASYNC110
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+async def _cancel_action(session: SessionManager, request_id: str) -> None:
+    """Ask the app to stop an action whose result nobody waits for."""
+    with suppress(Exception):
+        await session.send(ActionCancelMessage(request_id=request_id).model_dump())
+
+
 async def _handle_websocket(
     app: NumerousApp, websocket: WebSocket, client_id: str, session_id: str
 ) -> None:
@@ -751,14 +1476,25 @@ async def _handle_websocket(
     try:
         await websocket.accept()
         logger.debug(f"WebSocket connection accepted: {client_id} -> {session_id}")
+        app.state.config.shared_connections[client_id] = websocket
+
+        # Sessions hosted by another worker are relayed through the backplane
+        owner = await _remote_owner(app, session_id)
+        if owner is not None:
+            await _relay_websocket(app, websocket, client_id, session_id, owner)
+            return
 
         session_data = await _get_session_or_error(app, websocket, session_id)
         if session_data is None:
             return
 
+        # Rehydrate on connect so the client talks to a live app instance
+        if session_data.hibernated:
+            await session_data.wake()
+
         # Check for stale sessions
-        if session_id in app.state.config.sessions:
-            session_info = app.state.config.sessions[session_id]
+        session_info = app.state.config.sessions.get(SessionId(session_id))
+        if session_info is not None:
             current_time = time.time()
             inactive_time = current_time - session_info.last_active
             session_age = current_time - session_info.created_at
@@ -778,11 +1514,25 @@ async def _handle_websocket(
                     app.state.config.module_path,
                     app.state.config.template,
                     app.state.config.app_id,
+                    remote_workers=app.state.config.remote_workers,
                 )
 
         _register_connection(app, session_id, client_id, websocket, session_data)
         _update_session_activity(app, session_id)
 
+        # Viewers of a broadcast session share one sender and may be read-only
+        if is_broadcast_session(session_id):
+            _ensure_broadcast_fanout(app, session_id, session_data)
+            read_only = not check_write_token(
+                app.state.config.broadcast_secret,
+                session_id,
+                websocket.query_params.get("write_token"),
+            )
+            await _handle_client_messages(
+                app, websocket, client_id, session_id, session_data, read_only
+            )
+            return
+
         await asyncio.gather(
             _handle_client_messages(
                 app, websocket, client_id, session_id, session_data
@@ -797,6 +1547,8 @@ async def _handle_websocket(
         _cleanup_connection(app, session_id, client_id)
         with suppress(Exception):
             await websocket.close()
+    finally:
+        app.state.config.shared_connections.pop(client_id, None)
 
 
 async def _get_session_or_error(
@@ -832,11 +1584,9 @@ def _register_connection(
     session_data: SessionManager,
 ) -> None:
     """Register a new WebSocket connection."""
-    if session_id not in app.state.config.sessions:
-        app.state.config.sessions[session_id] = SessionInfo(data=session_data)
-
-    session_info = app.state.config.sessions[session_id]
-    session_info.connections[client_id] = websocket
+    session_info = app.state.config.sessions.get(SessionId(session_id))
+    if session_info is not None:
+        session_info.connections[client_id] = websocket
     _update_session_activity(app, session_id)
     session_data.add_active_connection(client_id)
 
@@ -847,21 +1597,144 @@ async def _handle_client_messages(
     client_id: str,
     session_id: str,
     session_data: SessionManager,
+    read_only: bool = False,
 ) -> None:
-    """Handle messages from the client."""
+    """Handle messages from the client, in order per widget."""
+
+    async def dispatch(message: dict[str, Any]) -> None:
+        await _dispatch_client_message(
+            websocket,
+            client_id,
+            _widget_session(app, session_data, message.get("widget_id")),
+            message,
+        )
+
+    workers = _WidgetWorkers(dispatch)
     try:
         while True:
-            message = await websocket.receive()
-            if message["type"] == "websocket.disconnect":
-                raise WebSocketDisconnect(  # noqa: TRY301
-                    code=message.get("code", 0)
-                )
-
-            await _handle_receive_message(websocket, client_id, session_data)
+            message = await _receive_client_message(websocket)
+            if read_only:
+                message = _without_writes(message)
+            await workers.submit(message)
             _update_session_activity(app, session_id)
-    except (asyncio.CancelledError, WebSocketDisconnect):
+    except WebSocketDisconnect:
         logger.debug(f"Receive task cancelled for client {client_id}")
+        # Messages received before the disconnect still reach the app
+        await workers.wait()
         raise
+    except asyncio.CancelledError:
+        logger.debug(f"Receive task cancelled for client {client_id}")
+        raise
+    finally:
+        workers.cancel()
+
+
+class _WidgetWorkers:
+    """
+    Handles client messages in order per widget, and widgets concurrently.
+
+    Messages without a widget, such as a request for all widget states, are
+    handled after every earlier message and before every later one.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[dict[str, Any]], Awaitable[None]],
+        max_pending: int = MAX_PENDING_CLIENT_MESSAGES,
+    ) -> None:
+        self._handle = handle
+        # Waiting for a slot stops reading the socket, pushing back on the client
+        self._slots = asyncio.Semaphore(max_pending)
+        self._queues: dict[str, deque[dict[str, Any]]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        # The latest message without a widget, which later messages wait for
+        self._barrier: asyncio.Task[None] | None = None
+
+    async def submit(self, message: dict[str, Any]) -> None:
+        """Queue a message behind those for the same widget."""
+        await self._slots.acquire()
+        key = message.get("widget_id")
+        if key is None:
+            earlier = set(self._tasks)
+            # Later messages for any widget start new queues behind this one
+            self._queues.clear()
+            self._barrier = self._start(self._run_barrier(message, earlier))
+            return
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(message)
+            return
+        queue = self._queues[key] = deque([message])
+        self._start(self._run(key, queue, self._barrier))
+
+    async def wait(self) -> None:
+        """Wait until the messages submitted so far are handled."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def cancel(self) -> None:
+        """Drop the messages still waiting and stop handling messages."""
+        for task in self._tasks:
+            task.cancel()
+
+    def _start(self, coroutine: Coroutine[Any, Any, None]) -> asyncio.Task[None]:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(
+        self,
+        key: str,
+        queue: deque[dict[str, Any]],
+        after: asyncio.Task[None] | None,
+    ) -> None:
+        # A worker ends when its widget has no more messages waiting
+        try:
+            if after is not None:
+                await asyncio.wait([after])
+            while queue:
+                if not await self._handle_one(queue.popleft()):
+                    # The client is gone; give back the slots of the rest
+                    for _ in queue:
+                        self._slots.release()
+                    queue.clear()
+        finally:
+            if self._queues.get(key) is queue:
+                del self._queues[key]
+
+    async def _run_barrier(
+        self, message: dict[str, Any], earlier: set[asyncio.Task[None]]
+    ) -> None:
+        if earlier:
+            await asyncio.wait(earlier)
+        await self._handle_one(message)
+
+    async def _handle_one(self, message: dict[str, Any]) -> bool:
+        """Handle a message; return False if the client has disconnected."""
+        try:
+            await self._handle(message)
+        except WebSocketDisconnect:
+            return False
+        except Exception:
+            logger.exception("Failed to handle client message")
+        finally:
+            self._slots.release()
+        return True
+
+
+# Client messages that change a session, refused from read-only viewers
+_WRITE_MESSAGE_TYPES = frozenset(
+    {"widget-update", "widget-batch-update", "action-request"}
+)
+
+
+def _without_writes(message: dict[str, Any]) -> dict[str, Any]:
+    """Return the message a read-only viewer may send in place of `message`."""
+    if message.get("type") not in _WRITE_MESSAGE_TYPES:
+        return message
+    # Put the viewer's widget back to the shared state
+    return {"type": "get-widget-state", "widget_id": message.get("widget_id")}
 
 
 async def _handle_server_messages(
@@ -898,97 +1771,68 @@ async def _handle_server_message_safely(
 
 def _cleanup_connection(app: NumerousApp, session_id: str, client_id: str) -> None:
     """Remove a client connection from a session."""
-    if (
-        session_id in app.state.config.sessions
-        and client_id in app.state.config.sessions[session_id].connections
-    ):
-        del app.state.config.sessions[session_id].connections[client_id]
-
-        if session_id in app.state.config.sessions:
-            session_info = app.state.config.sessions[session_id]
-            if hasattr(session_info.data, "remove_active_connection"):
-                session_info.data.remove_active_connection(client_id)
+    session_info = app.state.config.sessions.get(SessionId(session_id))
+    if session_info is not None and client_id in session_info.connections:
+        del session_info.connections[client_id]
+        session_info.data.remove_active_connection(client_id)
 
 
 def _update_session_activity(app: NumerousApp, session_id: str) -> None:
     """Update the last active timestamp for a session."""
-    if session_id in app.state.config.sessions:
-        app.state.config.sessions[session_id].last_active = time.time()
-
-
-async def _cleanup_expired_sessions(app: NumerousApp) -> None:
-    """Periodically check for and cleanup expired sessions."""
-    while True:
-        try:
-            current_time = time.time()
-            session_count = len(app.state.config.sessions)
+    app.state.config.session_manager.touch(SessionId(session_id))
 
-            timeout = (
-                OVERFLOW_SESSION_TIMEOUT
-                if session_count > MAX_SESSIONS
-                else DEFAULT_SESSION_TIMEOUT
-            )
-
-            expired_sessions = []
-            for session_id, session_info in app.state.config.sessions.items():
-                if current_time - session_info.last_active > timeout:
-                    expired_sessions.append(session_id)
-
-            if session_count > MAX_SESSIONS:
-                sorted_sessions = sorted(
-                    app.state.config.sessions.items(), key=lambda x: x[1].last_active
-                )
-                excess_count = session_count - MAX_SESSIONS
-                expired_sessions.extend(
-                    session_id
-                    for session_id, _ in sorted_sessions[:excess_count]
-                    if session_id not in expired_sessions
-                )
 
-            for session_id in expired_sessions:
-                await _cleanup_session(app, session_id)
+async def _cleanup_session(app: NumerousApp, session_id: str) -> None:
+    """Clean up a specific session and its resources."""
+    await app.state.config.session_manager.remove_session(SessionId(session_id))
 
-        except (RuntimeError, asyncio.CancelledError):
-            logger.exception("Error in session cleanup")
 
-        await asyncio.sleep(CLEANUP_INTERVAL)
+async def _shutdown_cleanup(app: NumerousApp) -> None:
+    """Clean up all sessions when the app shuts down."""
+    for session_id in list(app.state.config.pending_speculative_sessions):
+        app.state.config.pending_speculative_sessions.pop(session_id).cancel()
 
+    if app.state.config.backplane is not None:
+        await app.state.config.backplane.close()
 
-async def _cleanup_session(app: NumerousApp, session_id: str) -> None:
-    """Clean up a specific session and its resources."""
-    if session_id in app.state.config.sessions:
-        session_info = app.state.config.sessions[session_id]
+    await app.state.config.session_manager.shutdown()
 
-        for client_id, websocket in list(session_info.connections.items()):
-            with suppress(RuntimeError, ConnectionError):
-                await websocket.close()
-            session_info.connections.pop(client_id, None)
+    shared_session = app.state.config.shared_session
+    if shared_session is not None:
+        app.state.config.shared_session = None
+        app.state.config.shared_widget_configs = {}
+        shared_session.request_stop()
+        await shared_session.stop()
 
-        try:
-            await session_info.data.stop()
-        except (RuntimeError, asyncio.CancelledError, ConnectionError):
-            logger.exception("Error cleaning up session data")
+    if app.state.config.compute is not None:
+        await asyncio.to_thread(app.state.config.compute.close)
 
-        del app.state.config.sessions[session_id]
+    if app.state.config.remote_workers is not None:
+        await asyncio.to_thread(app.state.config.remote_workers.close)
 
+    result_cache.close()
+    datasets.close()
 
-async def _shutdown_cleanup(app: NumerousApp) -> None:
-    """Clean up all sessions when the app shuts down."""
-    if app.state.config.cleanup_task:
-        app.state.config.cleanup_task.cancel()
-        with suppress(asyncio.CancelledError):
-            await app.state.config.cleanup_task
 
-    session_ids = list(app.state.config.sessions.keys())
-    for session_id in session_ids:
-        await _cleanup_session(app, session_id)
+async def _receive_client_message(websocket: WebSocket) -> dict[str, Any]:
+    """Receive the next JSON message from the client websocket."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(code=message.get("code", 0))
+    data = message.get("text")
+    if data is None:
+        data = message.get("bytes", b"").decode("utf-8")
+    decoded: dict[str, Any] = json.loads(data)
+    return decoded
 
 
-async def _handle_receive_message(
-    websocket: WebSocket, client_id: str, session: SessionManager
+async def _dispatch_client_message(
+    websocket: WebSocket,
+    client_id: str,
+    session: SessionManager,
+    message: dict[str, Any],
 ) -> None:
-    """Process incoming messages from the client websocket."""
-    message = await websocket.receive_json()
+    """Process a message from a client websocket."""
     message_type = message.get("type")
 
     non_widget_types = ["get-widget-states", "get-widget-state"]
@@ -996,18 +1840,15 @@ async def _handle_receive_message(
         logger.error(f"Received message without widget_id: {message}")
         return
 
-    if message_type == "get-widget-states":
-        await _handle_get_widget_states(session)
-    elif message_type == "get-widget-state":
-        await _handle_get_widget_state(websocket, session, message.get("widget_id"))
-    elif message_type == "widget-batch-update":
-        await _handle_batch_update(websocket, session, message)
-    elif message_type == "widget-update":
-        await _handle_widget_update(websocket, session, message)
-    elif message_type == "action-request":
-        await _handle_action_request(session, message, client_id)
-    else:
+    handler = (
+        _CLIENT_MESSAGE_HANDLERS.get(message_type)
+        if isinstance(message_type, str)
+        else None
+    )
+    if handler is None:
         logger.warning(f"Unknown message type: {message_type}")
+        return
+    await handler(websocket, client_id, session, message)
 
 
 async def _handle_get_widget_states(session: SessionManager) -> None:
@@ -1124,6 +1965,29 @@ async def _handle_action_request(
     await session.send(msg.model_dump(), wait_for_response=False)
 
 
+# Handlers of client messages, called with the websocket, client id, session
+# and message
+_CLIENT_MESSAGE_HANDLERS: dict[
+    str, Callable[[WebSocket, str, SessionManager, dict[str, Any]], Awaitable[None]]
+] = {
+    "get-widget-states": lambda _websocket, _client_id, session, _message: (
+        _handle_get_widget_states(session)
+    ),
+    "get-widget-state": lambda websocket, _client_id, session, message: (
+        _handle_get_widget_state(websocket, session, message.get("widget_id"))
+    ),
+    "widget-batch-update": lambda websocket, _client_id, session, message: (
+        _handle_batch_update(websocket, session, message)
+    ),
+    "widget-update": lambda websocket, _client_id, session, message: (
+        _handle_widget_update(websocket, session, message)
+    ),
+    "action-request": lambda _websocket, client_id, session, message: (
+        _handle_action_request(session, message, client_id)
+    ),
+}
+
+
 async def _handle_websocket_message(
     websocket: WebSocket, message: dict[str, Any]
 ) -> None:
@@ -1154,6 +2018,8 @@ def _create_message_model(  # noqa: PLR0911
         return WidgetUpdateMessage(**message)
     if msg_type == MessageType.ACTION_RESPONSE.value:
         return ActionResponseMessage(**message)
+    if msg_type == MessageType.ACTION_CHUNK.value:
+        return ActionChunkMessage(**message)
     if msg_type == MessageType.INIT_CONFIG.value:
         return InitConfigMessage(**message)
     if msg_type == MessageType.ERROR.value:
@@ -1186,6 +2052,412 @@ async def _send_websocket_message(
         )
 
 
+class _BroadcastFanout:
+    """
+    Send the messages of a session to many clients.
+
+    Used for the viewers of a broadcast session and for the clients of all
+    sessions seeing the shared widgets. One callback serves every client: each
+    message is validated and encoded once, then the same text is sent to all
+    of the websockets.
+    """
+
+    def __init__(
+        self, session: SessionManager, connections: dict[str, WebSocket]
+    ) -> None:
+        self.session = session
+        self.connections = connections
+        self.handle = session.register_callback(self._send)
+
+    async def _send(self, message: dict[str, Any]) -> None:
+        msg_type = message.get("type")
+        if not isinstance(msg_type, str):
+            return
+        try:
+            model = _create_message_model(msg_type, message)
+        except (ValueError, TypeError):
+            logger.exception("Error processing broadcast message")
+            return
+        if model is None:
+            return
+        text = encode_model(model)
+        await asyncio.gather(
+            *(
+                self._send_to(client_id, websocket, text)
+                for client_id, websocket in list(self.connections.items())
+            )
+        )
+
+    @staticmethod
+    async def _send_to(client_id: str, websocket: WebSocket, text: str) -> None:
+        if websocket.client_state != WebSocketState.CONNECTED:
+            return
+        try:
+            await websocket.send_text(text)
+        except (WebSocketDisconnect, ConnectionError, RuntimeError) as e:
+            logger.debug(f"Cannot send to client {client_id}: {e!s}")
+
+
+def _ensure_broadcast_fanout(
+    app: NumerousApp, session_id: str, session: SessionManager
+) -> None:
+    """Start the shared sender of a broadcast session if it has none."""
+    fanouts = app.state.config.broadcast_fanouts
+    fanout = fanouts.get(session_id)
+    if fanout is not None and fanout.session is session:
+        return
+    session_info = app.state.config.sessions.get(SessionId(session_id))
+    if session_info is not None:
+        fanouts[session_id] = _BroadcastFanout(session, session_info.connections)
+
+
+def _all_widgets(app: NumerousApp) -> dict[str, AnyWidget]:
+    """Return the session widgets and the shared widgets of the app."""
+    return {**app.widgets, **app.state.config.shared_widgets}
+
+
+def _is_shared_widget(app: NumerousApp, widget_id: str | None) -> bool:
+    """Check whether a widget is one of the app-global shared widgets."""
+    return widget_id is not None and widget_id in app.state.config.shared_widgets
+
+
+def _widget_session(
+    app: NumerousApp, session: SessionManager, widget_id: str | None
+) -> SessionManager:
+    """Return the session running a widget: the shared one for shared widgets."""
+    shared_session: SessionManager | None = app.state.config.shared_session
+    if shared_session is not None and _is_shared_widget(app, widget_id):
+        return shared_session
+    return session
+
+
+async def _start_shared_widgets(app: NumerousApp) -> None:
+    """Create the shared widgets and run them in one app instance."""
+    from .communication import ThreadedExecutionManager
+    from .server import _shared_app_process
+
+    config = app.state.config
+    if config.shared_app_generator is None or config.shared_session is not None:
+        return
+
+    widgets = config.shared_app_generator()
+    clashes = set(widgets) & set(app.widgets)
+    if clashes:
+        raise ValueError(
+            f"Shared widgets clash with session widgets: {', '.join(sorted(clashes))}"
+        )
+    config.shared_widgets = widgets
+    config.widget_assets.update(collect_widget_assets(widgets))
+
+    execution_manager = ThreadedExecutionManager(
+        target=partial(_shared_app_process, widgets),
+        session_id=SHARED_SESSION_ID,
+    )
+    execution_manager.start(
+        config.base_dir, config.module_path, config.template, config.app_id
+    )
+    session = SessionManager(SessionId(SHARED_SESSION_ID), execution_manager)
+    await session.start()
+    _BroadcastFanout(session, config.shared_connections)
+    snapshot = _WidgetConfigSnapshot(session)
+    await snapshot.load(app)
+    config.shared_widget_configs = snapshot.configs
+    config.shared_session = session
+
+
+class _WidgetConfigSnapshot:
+    """
+    Widget configurations of a session, kept current by its widget updates.
+
+    Page loads include the shared widgets from the snapshot instead of asking
+    the shared app instance for its state each time.
+    """
+
+    def __init__(self, session: SessionManager) -> None:
+        self.session = session
+        self.configs: dict[str, Any] = {}
+        self._loaded = False
+        # Updates that arrive while the state is fetched, applied on top of it
+        self._pending: list[dict[str, Any]] = []
+        self.handle = session.register_callback(
+            self._update, message_types=[MessageType.WIDGET_UPDATE]
+        )
+
+    async def load(self, app: NumerousApp) -> None:
+        """Fill the snapshot from the session's state."""
+        definition = await _retry_fetch_app_definition(self.session)
+        self.configs.update(_process_widget_configs(app, definition).widget_configs)
+        self._loaded = True
+        for message in self._pending:
+            self._apply(message)
+        self._pending.clear()
+
+    async def _update(self, message: dict[str, Any]) -> None:
+        if self._loaded:
+            self._apply(message)
+        else:
+            self._pending.append(message)
+
+    def _apply(self, message: dict[str, Any]) -> None:
+        config = self.configs.get(message.get("widget_id", ""))
+        if config is None:
+            return
+        defaults = config.get("defaults")
+        if isinstance(defaults, dict) and message.get("property") in defaults:
+            defaults[message["property"]] = message.get("value")
+
+
+class _RelayWebSocket:
+    """Stands in for the websocket of a client connected to another worker."""
+
+    client_state = WebSocketState.CONNECTED
+
+    def __init__(
+        self, backplane: MessageBackplane, worker_id: str, client_id: str
+    ) -> None:
+        self.backplane = backplane
+        self.worker_id = worker_id
+        self.client_id = client_id
+
+    async def send_text(self, data: str) -> None:
+        """Forward a message to the worker the client is connected to."""
+        try:
+            await self.backplane.send(
+                self.worker_id,
+                {"op": "deliver", "client_id": self.client_id, "data": data},
+            )
+        except BackplaneError as e:
+            raise WebSocketDisconnect from e
+
+
+@dataclass
+class _Relay:
+    """A client of a local session connected through another worker."""
+
+    session_id: str
+    session: SessionManager
+    websocket: WebSocket
+    handle: CallbackHandle
+    read_only: bool = False
+
+
+async def _remote_owner(app: NumerousApp, session_id: str | None) -> str | None:
+    """Return the worker hosting a session when it is not this one."""
+    config = app.state.config
+    if (
+        config.backplane is None
+        or config.session_manager.directory is None
+        or not session_id
+        or session_id in ["null", "undefined"]
+        or config.session_manager.has_session(SessionId(session_id))
+    ):
+        return None
+    owner = await config.session_manager.directory.lookup(session_id)
+    return owner if owner != config.worker_id else None
+
+
+async def _relay_get_widgets(
+    app: NumerousApp,
+    owner: str,
+    session_id: str,
+    client_key: str,
+    writable: bool | None = None,
+) -> dict[str, Any]:
+    """
+    Fetch the widget configuration of a session from the worker hosting it.
+
+    For broadcast sessions, `writable` tells the host whether to issue the
+    client a write token, which only the host checks.
+    """
+    response = await app.state.config.backplane.request(
+        owner,
+        {
+            "op": "get-widgets",
+            "session_id": session_id,
+            "client_key": client_key,
+            "writable": writable,
+        },
+    )
+    if response is None:
+        raise HTTPException(status_code=502, detail="Session worker failed.")
+    if "error" in response:
+        raise HTTPException(**response["error"])
+    result: dict[str, Any] = response["result"]
+    return result
+
+
+async def _relay_websocket(
+    app: NumerousApp,
+    websocket: WebSocket,
+    client_id: str,
+    session_id: str,
+    owner: str,
+) -> None:
+    """Relay a client websocket to the session on the worker hosting it."""
+    config = app.state.config
+    config.relayed_clients[client_id] = websocket
+    try:
+        # The host issued the write token, so it decides whether the client
+        # may write; both workers then refuse writes from a read-only viewer
+        response = await config.backplane.request(
+            owner,
+            {
+                "op": "attach",
+                "session_id": session_id,
+                "client_id": client_id,
+                "worker_id": config.worker_id,
+                "write_token": websocket.query_params.get("write_token"),
+            },
+        )
+        if not response or not response.get("attached"):
+            await websocket.send_text(encode_model(SessionErrorMessage()))
+            return
+        read_only = bool(response.get("read_only"))
+
+        while True:
+            message = await _receive_client_message(websocket)
+            if read_only:
+                message = _without_writes(message)
+            # Shared widgets run on every worker, so this one answers for them
+            if config.shared_session is not None and _is_shared_widget(
+                app, message.get("widget_id")
+            ):
+                await _dispatch_client_message(
+                    websocket, client_id, config.shared_session, message
+                )
+                continue
+            await config.backplane.send(
+                owner,
+                {"op": "client-message", "client_id": client_id, "message": message},
+            )
+    except (WebSocketDisconnect, BackplaneError) as e:
+        logger.debug(f"Relay for {client_id} -> {owner} ended: {e!s}")
+    finally:
+        config.relayed_clients.pop(client_id, None)
+        with suppress(BackplaneError):
+            await config.backplane.send(owner, {"op": "detach", "client_id": client_id})
+
+
+async def _handle_backplane_message(
+    app: NumerousApp, message: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Handle a message from another worker serving the same app."""
+    handler = _BACKPLANE_HANDLERS.get(message.get("op", ""))
+    if handler is None:
+        logger.warning(f"Unknown backplane message: {message.get('op')}")
+        return None
+    return await handler(app, message)
+
+
+async def _backplane_get_widgets(
+    app: NumerousApp, message: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Answer a widget configuration request for a local session."""
+    session_id = message["session_id"]
+    # Set for broadcast joins, which keep their session id
+    writable = message.get("writable")
+    try:
+        result = await _get_widgets_response(
+            app, session_id, message["client_key"], keep_session_id=writable is not None
+        )
+    except HTTPException as e:
+        return {
+            "error": {
+                "status_code": e.status_code,
+                "detail": e.detail,
+                "headers": e.headers,
+            }
+        }
+    if writable:
+        result["write_token"] = write_token(
+            app.state.config.broadcast_secret, session_id
+        )
+    return {"result": result}
+
+
+async def _backplane_attach(
+    app: NumerousApp, message: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Connect a client of another worker to a local session."""
+    config = app.state.config
+    session_id = message["session_id"]
+    client_id = message["client_id"]
+    if not config.session_manager.has_session(SessionId(session_id)):
+        return {"attached": False}
+
+    session = config.session_manager.get_session(SessionId(session_id))
+    if session.hibernated:
+        await session.wake()
+    relay_websocket = cast(
+        "WebSocket",
+        _RelayWebSocket(config.backplane, message["worker_id"], client_id),
+    )
+    handle = session.register_callback(
+        callback=lambda msg: _handle_server_message_safely(
+            relay_websocket, msg, client_id
+        )
+    )
+    read_only = is_broadcast_session(session_id) and not check_write_token(
+        config.broadcast_secret, session_id, message.get("write_token")
+    )
+    config.relays[client_id] = _Relay(
+        session_id, session, relay_websocket, handle, read_only
+    )
+    session.add_active_connection(client_id)
+    _update_session_activity(app, session_id)
+    return {"attached": True, "read_only": read_only}
+
+
+async def _backplane_client_message(
+    app: NumerousApp, message: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Process a message from a relayed client."""
+    relay = app.state.config.relays.get(message["client_id"])
+    if relay is not None:
+        client_message = message["message"]
+        if relay.read_only:
+            client_message = _without_writes(client_message)
+        await _dispatch_client_message(
+            relay.websocket, message["client_id"], relay.session, client_message
+        )
+        _update_session_activity(app, relay.session_id)
+    return None
+
+
+async def _backplane_detach(
+    app: NumerousApp, message: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Disconnect a relayed client from its session."""
+    relay = app.state.config.relays.pop(message["client_id"], None)
+    if relay is not None:
+        relay.session.deregister_callback(relay.handle)
+        relay.session.remove_active_connection(message["client_id"])
+    return None
+
+
+async def _backplane_deliver(
+    app: NumerousApp, message: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Send a message from a session on another worker to a local client."""
+    websocket = app.state.config.relayed_clients.get(message["client_id"])
+    if websocket is not None:
+        with suppress(WebSocketDisconnect, RuntimeError, ConnectionError):
+            await websocket.send_text(message["data"])
+    return None
+
+
+_BACKPLANE_HANDLERS: dict[
+    str,
+    Callable[[NumerousApp, dict[str, Any]], Awaitable[dict[str, Any] | None]],
+] = {
+    "get-widgets": _backplane_get_widgets,
+    "attach": _backplane_attach,
+    "client-message": _backplane_client_message,
+    "detach": _backplane_detach,
+    "deliver": _backplane_deliver,
+}
+
+
 def _setup_auth(
     app: NumerousApp,
     auth_provider: Any,  # noqa: ANN401
@@ -67,6 +67,8 @@ class AuthMiddleware(BaseHTTPMiddleware):
         # Default static routes that should be public
         default_static_routes = [
             "/numerous.js",
+            "/numerous-worker.js",
+            "/numerous-assets",
             "/static",
             "/numerous-static",
             "/favicon.ico",
@@ -0,0 +1,442 @@
+"""Session directory and message backplane for running an app on several workers."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import sqlite3
+import struct
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Sequence
+
+    BackplaneHandler = Callable[[dict[str, Any]], Awaitable[dict[str, Any] | None]]
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for another worker to answer a request
+BACKPLANE_REQUEST_TIMEOUT = 30.0
+
+# Frames between workers are JSON prefixed with their length
+_FRAME_HEADER = struct.Struct(">I")
+
+
+class BackplaneError(Exception):
+    """Raised when a message cannot be delivered to another worker."""
+
+
+class SessionDirectory(ABC):
+    """Shared map from session ids to the worker hosting their app instance."""
+
+    @abstractmethod
+    async def register(self, session_id: str, worker_id: str) -> None:
+        """Record that `worker_id` hosts the session."""
+
+    @abstractmethod
+    async def claim(self, session_id: str, worker_id: str) -> str:
+        """Record `worker_id` as host unless the session has one; return the host."""
+
+    @abstractmethod
+    async def unregister(
+        self, session_ids: Sequence[str], worker_id: str | None = None
+    ) -> None:
+        """Forget the given sessions, only those hosted by `worker_id` if given."""
+
+    @abstractmethod
+    async def lookup(self, session_id: str) -> str | None:
+        """Return the worker hosting the session, or None if it is unknown."""
+
+
+class LocalSessionDirectory(SessionDirectory):
+    """Directory for workers running in the same process."""
+
+    def __init__(self) -> None:
+        """Initialize an empty directory."""
+        self._owners: dict[str, str] = {}
+
+    async def register(self, session_id: str, worker_id: str) -> None:
+        """Record that `worker_id` hosts the session."""
+        self._owners[session_id] = worker_id
+
+    async def claim(self, session_id: str, worker_id: str) -> str:
+        """Record `worker_id` as host unless the session has one; return the host."""
+        return self._owners.setdefault(session_id, worker_id)
+
+    async def unregister(
+        self, session_ids: Sequence[str], worker_id: str | None = None
+    ) -> None:
+        """Forget the given sessions, only those hosted by `worker_id` if given."""
+        for session_id in session_ids:
+            if worker_id is None or self._owners.get(session_id) == worker_id:
+                self._owners.pop(session_id, None)
+
+    async def lookup(self, session_id: str) -> str | None:
+        """Return the worker hosting the session, or None if it is unknown."""
+        return self._owners.get(session_id)
+
+
+class SqliteSessionDirectory(SessionDirectory):
+    """Directory in a SQLite file shared by the worker processes of one host."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Open (and create if needed) the directory database at `path`."""
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, timeout=10.0
+        )
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_owner "
+                "(session_id TEXT PRIMARY KEY, worker_id TEXT NOT NULL)"
+            )
+
+    async def register(self, session_id: str, worker_id: str) -> None:
+        """Record that `worker_id` hosts the session."""
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO session_owner VALUES (?, ?)",
+            [(session_id, worker_id)],
+        )
+
+    async def claim(self, session_id: str, worker_id: str) -> str:
+        """Record `worker_id` as host unless the session has one; return the host."""
+        return await asyncio.to_thread(self._claim, session_id, worker_id)
+
+    async def unregister(
+        self, session_ids: Sequence[str], worker_id: str | None = None
+    ) -> None:
+        """Forget the given sessions, only those hosted by `worker_id` if given."""
+        if worker_id is None:
+            await asyncio.to_thread(
+                self._execute,
+                "DELETE FROM session_owner WHERE session_id = ?",
+                [(session_id,) for session_id in session_ids],
+            )
+            return
+        await asyncio.to_thread(
+            self._execute,
+            "DELETE FROM session_owner WHERE session_id = ? AND worker_id = ?",
+            [(session_id, worker_id) for session_id in session_ids],
+        )
+
+    async def lookup(self, session_id: str) -> str | None:
+        """Return the worker hosting the session, or None if it is unknown."""
+        return await asyncio.to_thread(self._lookup, session_id)
+
+    def _execute(self, statement: str, rows: list[tuple[str, ...]]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(statement, rows)
+
+    def _claim(self, session_id: str, worker_id: str) -> str:
+        with self._lock, self._connection:
+            # Keeps the first claim, so two workers cannot both host the session
+            self._connection.execute(
+                "INSERT OR IGNORE INTO session_owner VALUES (?, ?)",
+                (session_id, worker_id),
+            )
+            row = self._connection.execute(
+                "SELECT worker_id FROM session_owner WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        owner: str = row[0]
+        return owner
+
+    def _lookup(self, session_id: str) -> str | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT worker_id FROM session_owner WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+
+class MessageBackplane(ABC):
+    """
+    Delivers messages between the workers serving an app.
+
+    Each worker starts the backplane with its id and a handler. Messages sent
+    to a worker are passed to its handler; for requests, the handler's return
+    value is sent back as the response.
+    """
+
+    @abstractmethod
+    async def start(self, worker_id: str, handler: BackplaneHandler) -> None:
+        """Start receiving messages addressed to `worker_id`."""
+
+    @abstractmethod
+    async def send(self, worker_id: str, message: dict[str, Any]) -> None:
+        """Deliver a message to a worker without waiting for it to be handled."""
+
+    @abstractmethod
+    async def request(
+        self,
+        worker_id: str,
+        message: dict[str, Any],
+        timeout_seconds: float = BACKPLANE_REQUEST_TIMEOUT,
+    ) -> dict[str, Any] | None:
+        """
+        Deliver a message to a worker and return its handler's response.
+
+        Raises:
+            BackplaneError: If the worker cannot be reached
+            asyncio.TimeoutError: If no response arrives within `timeout_seconds`
+
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Stop receiving messages and release connections."""
+
+
+class LocalBackplane(MessageBackplane):
+    """
+    Backplane between workers in one process, such as apps in tests.
+
+    Handlers run on the event loop of the worker that registered them, so
+    workers may live on different loops and threads.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a backplane with no workers."""
+        self._handlers: dict[
+            str, tuple[asyncio.AbstractEventLoop, BackplaneHandler]
+        ] = {}
+
+    async def start(self, worker_id: str, handler: BackplaneHandler) -> None:
+        """Start receiving messages addressed to `worker_id`."""
+        self._handlers[worker_id] = (asyncio.get_running_loop(), handler)
+
+    async def send(self, worker_id: str, message: dict[str, Any]) -> None:
+        """Deliver a message to a worker without waiting for it to be handled."""
+        loop, handler = self._target(worker_id)
+        asyncio.run_coroutine_threadsafe(self._handle_quietly(handler, message), loop)
+
+    async def request(
+        self,
+        worker_id: str,
+        message: dict[str, Any],
+        timeout_seconds: float = BACKPLANE_REQUEST_TIMEOUT,
+    ) -> dict[str, Any] | None:
+        """Deliver a message to a worker and return its handler's response."""
+        loop, handler = self._target(worker_id)
+        future = asyncio.run_coroutine_threadsafe(handler(message), loop)
+        async with asyncio.timeout(timeout_seconds):
+            return await asyncio.wrap_future(future)
+
+    async def close(self) -> None:
+        """Stop receiving messages for the workers started on this loop."""
+        loop = asyncio.get_running_loop()
+        for worker_id, (worker_loop, _) in list(self._handlers.items()):
+            if worker_loop is loop:
+                del self._handlers[worker_id]
+
+    def _target(
+        self, worker_id: str
+    ) -> tuple[asyncio.AbstractEventLoop, BackplaneHandler]:
+        target = self._handlers.get(worker_id)
+        if target is None:
+            raise BackplaneError(f"Worker {worker_id} is not connected")
+        return target
+
+    @staticmethod
+    async def _handle_quietly(
+        handler: BackplaneHandler, message: dict[str, Any]
+    ) -> None:
+        try:
+            await handler(message)
+        except Exception:
+            logger.exception("Error handling backplane message")
+
+
+class UnixSocketBackplane(MessageBackplane):
+    """
+    Backplane over Unix domain sockets for the worker processes of one host.
+
+    Every worker listens on `<socket_dir>/<worker_id>.sock`. Messages are
+    length-prefixed JSON frames over one persistent connection per pair of
+    workers; responses carry the id of the request they answer. One-way
+    messages are handled in the order they were sent.
+    """
+
+    def __init__(self, socket_dir: str | Path) -> None:
+        """Initialize the backplane to use sockets in `socket_dir`."""
+        self.socket_dir = Path(socket_dir)
+        self._server: asyncio.Server | None = None
+        self._socket_path: Path | None = None
+        self._handler: BackplaneHandler | None = None
+        self._connections: dict[str, asyncio.StreamWriter] = {}
+        self._connect_lock = asyncio.Lock()
+        self._reader_tasks: set[asyncio.Task[None]] = set()
+        self._handler_tasks: set[asyncio.Task[None]] = set()
+        # Pending requests by id, with the worker they were sent to
+        self._responses: dict[
+            int, tuple[str, asyncio.Future[dict[str, Any] | None]]
+        ] = {}
+        self._request_ids = itertools.count()
+
+    async def start(self, worker_id: str, handler: BackplaneHandler) -> None:
+        """Start receiving messages addressed to `worker_id`."""
+        self.socket_dir.mkdir(parents=True, exist_ok=True)
+        self._socket_path = self.socket_dir / f"{worker_id}.sock"
+        self._socket_path.unlink(missing_ok=True)
+        self._handler = handler
+        self._server = await asyncio.start_unix_server(
+            self._serve_connection, path=str(self._socket_path)
+        )
+
+    async def send(self, worker_id: str, message: dict[str, Any]) -> None:
+        """Deliver a message to a worker without waiting for it to be handled."""
+        await self._write(worker_id, {"body": message})
+
+    async def request(
+        self,
+        worker_id: str,
+        message: dict[str, Any],
+        timeout_seconds: float = BACKPLANE_REQUEST_TIMEOUT,
+    ) -> dict[str, Any] | None:
+        """Deliver a message to a worker and return its handler's response."""
+        request_id = next(self._request_ids)
+        future: asyncio.Future[dict[str, Any] | None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._responses[request_id] = (worker_id, future)
+        try:
+            await self._write(worker_id, {"id": request_id, "body": message})
+            async with asyncio.timeout(timeout_seconds):
+                return await future
+        finally:
+            self._responses.pop(request_id, None)
+
+    async def close(self) -> None:
+        """Stop listening and close connections to other workers."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in self._connections.values():
+            writer.close()
+        self._connections.clear()
+        for task in (*self._reader_tasks, *self._handler_tasks):
+            task.cancel()
+        await asyncio.gather(
+            *self._reader_tasks, *self._handler_tasks, return_exceptions=True
+        )
+        if self._socket_path is not None:
+            self._socket_path.unlink(missing_ok=True)
+
+    async def _write(self, worker_id: str, frame: dict[str, Any]) -> None:
+        writer = await self._connection(worker_id)
+        try:
+            await _write_frame(writer, frame)
+        except (ConnectionError, OSError) as e:
+            self._connections.pop(worker_id, None)
+            raise BackplaneError(f"Lost connection to worker {worker_id}") from e
+
+    async def _connection(self, worker_id: str) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            writer = self._connections.get(worker_id)
+            if writer is not None and not writer.is_closing():
+                return writer
+            path = self.socket_dir / f"{worker_id}.sock"
+            try:
+                reader, writer = await asyncio.open_unix_connection(str(path))
+            except OSError as e:
+                raise BackplaneError(f"Worker {worker_id} is not reachable") from e
+            self._connections[worker_id] = writer
+            self._track(
+                self._reader_tasks, self._read_responses(worker_id, reader, writer)
+            )
+            return writer
+
+    async def _read_responses(
+        self,
+        worker_id: str,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Resolve pending requests from the frames of an outgoing connection."""
+        try:
+            while (frame := await _read_frame(reader)) is not None:
+                pending = self._responses.get(frame.get("reply_to", -1))
+                if pending is not None and not pending[1].done():
+                    pending[1].set_result(frame.get("body"))
+        except (ConnectionError, OSError, ValueError):
+            logger.exception(f"Failed to read from worker {worker_id}")
+        finally:
+            # The next message to the worker opens a new connection
+            if self._connections.get(worker_id) is writer:
+                del self._connections[worker_id]
+            writer.close()
+            for target, future in self._responses.values():
+                if target == worker_id and not future.done():
+                    future.set_exception(
+                        BackplaneError(f"Lost connection to worker {worker_id}")
+                    )
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Pass frames from another worker to the handler, replying to requests."""
+        try:
+            while (frame := await _read_frame(reader)) is not None:
+                if "id" in frame:
+                    self._track(self._handler_tasks, self._handle(frame, writer))
+                else:
+                    await self._handle(frame, writer)
+        except (ConnectionError, OSError, ValueError):
+            logger.exception("Failed to read from another worker")
+        finally:
+            writer.close()
+
+    async def _handle(
+        self, frame: dict[str, Any], writer: asyncio.StreamWriter
+    ) -> None:
+        if self._handler is None:
+            return
+        try:
+            response = await self._handler(frame["body"])
+        except Exception:
+            logger.exception("Error handling backplane message")
+            response = None
+        if "id" in frame:
+            with contextlib.suppress(ConnectionError, OSError):
+                await _write_frame(writer, {"reply_to": frame["id"], "body": response})
+
+    @staticmethod
+    def _track(tasks: set[asyncio.Task[None]], coroutine: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+async def _write_frame(writer: asyncio.StreamWriter, frame: dict[str, Any]) -> None:
+    data = json.dumps(frame).encode()
+    writer.write(_FRAME_HEADER.pack(len(data)) + data)
+    await writer.drain()
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> dict[str, Any] | None:
+    """Return the next frame, or None when the other worker closed the connection."""
+    try:
+        header = await reader.readexactly(_FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Connection closed inside a frame") from e
+        return None
+    (size,) = _FRAME_HEADER.unpack(header)
+    try:
+        data = await reader.readexactly(size)
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError("Connection closed inside a frame") from e
+    frame: dict[str, Any] = json.loads(data)
+    return frame
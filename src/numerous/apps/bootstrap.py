@@ -301,19 +301,23 @@ def run_app(
     port: int = 8000,
     host: str = "127.0.0.1",
     env: dict[str, str] | None = None,
+    workers: int = 1,
 ) -> None:
-    """Run the app."""
+    """Run the app, behind the session-affinity launcher if `workers` > 1."""
     run_env = os.environ.copy()
     if env:
         run_env.update(env)
 
     # Use sys.executable to ensure we run uvicorn from the same Python
     # environment that's running this script (important for venvs)
+    server = ["uvicorn"]
+    if workers > 1:
+        server = ["numerous.apps.launcher", "--workers", str(workers)]
     subprocess.run(  # noqa: S603
         [
             sys.executable,
             "-m",
-            "uvicorn",
+            *server,
             "app:app",
             "--port",
             str(port),
@@ -343,6 +347,12 @@ def main() -> None:
     parser.add_argument(
         "--host", type=str, default="127.0.0.1", help="Host to run the server on"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of server processes, routed to by session",
+    )
     parser.add_argument(
         "--with-auth",
         action="store_true",
@@ -405,7 +415,7 @@ def main() -> None:
             env = {
                 "NUMEROUS_JWT_SECRET": "dev-secret-key-change-in-production",
             }
-        run_app(project_path, args.port, args.host, env)
+        run_app(project_path, args.port, args.host, env, workers=args.workers)
 
 
 if __name__ == "__main__":
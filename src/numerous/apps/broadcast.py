@@ -0,0 +1,69 @@
+"""Broadcast sessions: named sessions shared by every client that joins them."""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+from dataclasses import dataclass
+from typing import Any
+
+
+# Prefix of the session ids of broadcast sessions
+BROADCAST_SESSION_PREFIX = "broadcast-"
+
+
+@dataclass(frozen=True)
+class BroadcastSession:
+    """
+    A named session that clients join with `?broadcast=<name>` in the page URL.
+
+    All clients of a broadcast session share one app instance. Viewers only
+    watch; writers may also change widgets and call actions. A client is a
+    writer if it presents `write_key` (as `&key=...` in the page URL) or is
+    signed in with one of `write_roles`. Without either, the session is
+    read-only for every client and only the app itself changes it.
+    """
+
+    name: str
+    write_key: str | None = None
+    write_roles: tuple[str, ...] = ()
+
+    @property
+    def session_id(self) -> str:
+        """Return the id of the shared session."""
+        return broadcast_session_id(self.name)
+
+    def allows_write(self, key: str | None, user: Any = None) -> bool:  # noqa: ANN401
+        """Check whether a client with `key` and `user` may write."""
+        if (
+            self.write_key is not None
+            and key is not None
+            and hmac.compare_digest(key, self.write_key)
+        ):
+            return True
+        has_any_role = getattr(user, "has_any_role", None)
+        return bool(
+            self.write_roles and has_any_role and has_any_role(list(self.write_roles))
+        )
+
+
+def broadcast_session_id(name: str) -> str:
+    """Return the session id of the broadcast session called `name`."""
+    return f"{BROADCAST_SESSION_PREFIX}{name}"
+
+
+def is_broadcast_session(session_id: str) -> bool:
+    """Check whether a session id belongs to a broadcast session."""
+    return session_id.startswith(BROADCAST_SESSION_PREFIX)
+
+
+def write_token(secret: bytes, session_id: str) -> str:
+    """Return the token that grants write access to a broadcast session."""
+    return hmac.new(secret, session_id.encode(), hashlib.sha256).hexdigest()
+
+
+def check_write_token(secret: bytes, session_id: str, token: str | None) -> bool:
+    """Check a token presented for writing to a broadcast session."""
+    return token is not None and hmac.compare_digest(
+        token, write_token(secret, session_id)
+    )
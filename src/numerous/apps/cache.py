@@ -0,0 +1,498 @@
+"""
+Results of expensive computations, shared by the sessions of an app.
+
+Different users often run the same computation with the same arguments, each
+in their own session process. Functions decorated with `cached` store their
+results in a SQLite database that every session process opens, so a result
+computed in one session is reused by all others. Memoized actions keep their
+results in memory instead, for each widget and so for each session.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar, overload
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from .datasets import datasets
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+# Total size of cached values above which least recently used ones are evicted
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Name of the default cache database in the directory shared with sessions
+CACHE_FILE_NAME = "results.db"
+# Results a memoized action keeps per widget
+MEMO_MAX_ENTRIES = 128
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class ResultCache:
+    """
+    A cache of pickled results in a SQLite file shared by processes.
+
+    Entries expire `ttl` seconds after they are stored, and the least
+    recently used entries are evicted once the values take more than
+    `max_bytes`. Hit, miss and eviction counts are kept in the database, so
+    they add up over all processes using the cache. When the database cannot
+    be used, lookups miss and results are not stored.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl: float | None = None,
+    ) -> None:
+        """
+        Set up the cache; the database is opened on first use.
+
+        Args:
+            path: Database file, or None for a file in the directory the
+                server shares with its session processes (removed when the
+                server shuts down)
+            max_bytes: Total size of the cached values to keep
+            ttl: Seconds until entries expire, or None to keep them until
+                evicted
+
+        """
+        self._path = Path(path) if path is not None else None
+        self._default_path = path is None
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._connection_pid: int | None = None
+        self._connection_path: Path | None = None
+
+    @property
+    def path(self) -> Path:
+        """Return the database file of the cache."""
+        # The shared directory is recreated if the server removed it
+        if self._path is None or (
+            self._default_path and not self._path.parent.is_dir()
+        ):
+            self._path = datasets.directory / CACHE_FILE_NAME
+        return self._path
+
+    def lookup(self, key: str) -> tuple[bool, Any]:
+        """Return whether `key` is cached, and its value if so."""
+        try:
+            row = self._lookup(key)
+        except sqlite3.Error:
+            logger.warning("Result cache is unavailable", exc_info=True)
+            self.close()
+            return False, None
+        if row is None:
+            return False, None
+        try:
+            return True, pickle.loads(row[0])  # noqa: S301
+        except Exception:
+            logger.exception(f"Discarding unreadable cache entry {key}")
+            return False, None
+
+    def _lookup(self, key: str) -> tuple[bytes, float | None] | None:
+        """Return the value and expiry of `key`, counting the hit or miss."""
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                row = connection.execute(
+                    "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] is not None and row[1] <= now:
+                    connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    _count(connection, "evictions")
+                    row = None
+                if row is None:
+                    _count(connection, "misses")
+                    return None
+                connection.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                _count(connection, "hits")
+        return row  # type: ignore[no-any-return]
+
+    def store(self, key: str, value: Any, ttl: float | None = None) -> None:  # noqa: ANN401
+        """Cache `value` under `key`, evicting old entries to stay in size."""
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:  # noqa: BLE001
+            logger.debug(f"Not caching {key}: value cannot be pickled")
+            return
+        if len(data) > self.max_bytes:
+            logger.debug(f"Not caching {key}: value is larger than the cache")
+            return
+
+        now = time.time()
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = now + ttl if ttl is not None else None
+        try:
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO entries "
+                        "(key, value, size, expires_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, data, len(data), expires_at, now),
+                    )
+                    self._evict(connection, now)
+        except sqlite3.Error:
+            logger.warning(f"Not caching {key}: cache is unavailable", exc_info=True)
+            self.close()
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM entries")
+                connection.execute("DELETE FROM stats")
+
+    def metrics(self) -> dict[str, Any]:
+        """Return hit, miss and eviction counts and the size of the cache."""
+        if self._path is None or not self._path.exists():
+            return {}
+        with self._lock:
+            connection = self._connect()
+            counts = dict(connection.execute("SELECT name, count FROM stats"))
+            entries, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counts.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self) -> None:
+        """Close this process's connection to the database."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this process's connection, opening it on first use."""
+        # Connections must not be shared with processes forked from this one
+        if (
+            self._connection is None
+            or self._connection_pid != os.getpid()
+            or self._connection_path != self.path
+        ):
+            if self._connection is not None and self._connection_pid == os.getpid():
+                self._connection.close()
+            self._connection_path = self.path
+            self._connection = sqlite3.connect(
+                str(self._connection_path), timeout=30.0, check_same_thread=False
+            )
+            self._connection_pid = os.getpid()
+            with self._connection:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute("PRAGMA synchronous=NORMAL")
+                self._connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS entries (
+                        key TEXT PRIMARY KEY,
+                        value BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        expires_at REAL,
+                        accessed_at REAL NOT NULL
+                    )
+                    """
+                )
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS entries_by_access "
+                    "ON entries (accessed_at)"
+                )
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS stats "
+                    "(name TEXT PRIMARY KEY, count INTEGER NOT NULL)"
+                )
+        return self._connection
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones above the cap."""
+        evicted = connection.execute(
+            "DELETE FROM entries WHERE expires_at <= ?", (now,)
+        ).rowcount
+        (size,) = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        if size > self.max_bytes:
+            stale = []
+            for key, entry_size in connection.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at"
+            ):
+                stale.append((key,))
+                size -= entry_size
+                if size <= self.max_bytes:
+                    break
+            connection.executemany("DELETE FROM entries WHERE key = ?", stale)
+            evicted += len(stale)
+        if evicted:
+            _count(connection, "evictions", evicted)
+
+
+def _count(connection: sqlite3.Connection, name: str, amount: int = 1) -> None:
+    connection.execute(
+        "INSERT INTO stats (name, count) VALUES (?, ?) "
+        "ON CONFLICT (name) DO UPDATE SET count = count + excluded.count",
+        (name, amount),
+    )
+
+
+def cache_key(func: Callable[..., Any], args: Any, kwargs: Any) -> str | None:  # noqa: ANN401
+    """Return the cache key of a call, or None if its arguments cannot be pickled."""
+    try:
+        arguments = pickle.dumps(
+            (args, sorted(kwargs.items())), protocol=pickle.HIGHEST_PROTOCOL
+        )
+    except Exception:  # noqa: BLE001
+        return None
+    digest = hashlib.blake2b(arguments, digest_size=20).hexdigest()
+    return f"{func.__module__}.{func.__qualname__}:{digest}"
+
+
+# Cache used by `cached` when none is given
+result_cache = ResultCache()
+
+
+@overload
+def cached(func: Callable[P, R]) -> Callable[P, R]: ...
+
+
+@overload
+def cached(
+    func: None = None, *, ttl: float | None = None, cache: ResultCache | None = None
+) -> Callable[[Callable[P, R]], Callable[P, R]]: ...
+
+
+def cached(
+    func: Callable[P, R] | None = None,
+    *,
+    ttl: float | None = None,
+    cache: ResultCache | None = None,
+) -> Callable[P, R] | Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Reuse the results of a function across all sessions of the app.
+
+    Calls with equal (pickled) arguments return the stored result instead of
+    running the function again, in any session process. Arguments and
+    results must be picklable; other calls run uncached.
+
+    Args:
+        func: The function to cache
+        ttl: Seconds a result stays valid (the cache's `ttl` when None)
+        cache: Cache to store results in (`result_cache` when None)
+
+    """
+
+    def decorate(func: Callable[P, R]) -> Callable[P, R]:
+        store = cache if cache is not None else result_cache
+        # Resolve the shared file now, when the server imports the app module
+        _ = store.path
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            key = cache_key(func, args, kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            found, value = store.lookup(key)
+            if found:
+                return value  # type: ignore[no-any-return]
+            result = func(*args, **kwargs)
+            store.store(key, result, ttl)
+            return result
+
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+
+class MemoCache:
+    """An in-memory cache of the most recently used results of a function."""
+
+    def __init__(
+        self, max_entries: int = MEMO_MAX_ENTRIES, ttl: float | None = None
+    ) -> None:
+        """
+        Set up an empty cache.
+
+        Args:
+            max_entries: Results to keep; the least recently used are dropped
+            ttl: Seconds until results expire, or None to keep them until
+                dropped
+
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached results."""
+        return len(self._entries)
+
+    def lookup(self, key: str) -> tuple[bool, Any]:
+        """Return whether `key` is cached, and its value if so."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def store(self, key: str, value: Any) -> None:  # noqa: ANN401
+        """Cache `value` under `key`, dropping the least recently used ones."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self, *_: object) -> None:
+        """Drop all results; usable as a trait observer."""
+        self._entries.clear()
+
+
+def _normalize(value: Any) -> Any:  # noqa: ANN401
+    """Replace arrays by their contents' digest, so equal arrays key equally."""
+    if isinstance(value, np.ndarray):
+        digest = hashlib.blake2b(
+            np.ascontiguousarray(value).tobytes(), digest_size=20
+        ).digest()
+        return ("ndarray", value.dtype.str, value.shape, digest)
+    if isinstance(value, np.generic):
+        return ("numpy", value.dtype.str, value.item())
+    if isinstance(value, list | tuple):
+        return type(value)(_normalize(item) for item in value)
+    if isinstance(value, dict):
+        return sorted(
+            ((repr(key), _normalize(item)) for key, item in value.items()),
+            key=lambda entry: entry[0],
+        )
+    return value
+
+
+def argument_key(arguments: Mapping[str, Any]) -> str | None:
+    """Return a key for bound call arguments, or None if they cannot be pickled."""
+    try:
+        data = pickle.dumps(
+            _normalize(dict(arguments)), protocol=pickle.HIGHEST_PROTOCOL
+        )
+    except Exception:  # noqa: BLE001
+        return None
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class _WidgetMemos:
+    """The memo caches of a method, one per widget."""
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        max_entries: int,
+        ttl: float | None,
+        invalidate_on: Sequence[str],
+    ) -> None:
+        self.signature = inspect.signature(func)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.invalidate_on = list(invalidate_on)
+        self.memos: WeakKeyDictionary[Any, MemoCache] = WeakKeyDictionary()
+
+    def __call__(self, args: Any, kwargs: Any) -> tuple[MemoCache, str | None]:  # noqa: ANN401
+        """Return the cache of the widget a call is made on, and the call's key."""
+        widget = args[0]
+        memo = self.memos.get(widget)
+        if memo is None:
+            memo = self.memos[widget] = MemoCache(self.max_entries, self.ttl)
+            if self.invalidate_on:
+                widget.observe(memo.clear, names=self.invalidate_on)
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        # Leave out the widget itself
+        arguments.pop(next(iter(self.signature.parameters)))
+        return memo, argument_key(arguments)
+
+
+def memoize_method(
+    func: Callable[..., R],
+    max_entries: int = MEMO_MAX_ENTRIES,
+    ttl: float | None = None,
+    invalidate_on: Sequence[str] = (),
+) -> Callable[..., R]:
+    """
+    Reuse the results of a widget method for equal arguments.
+
+    Every widget, and so every session, has its own `MemoCache`. Arguments are
+    matched after binding them to the signature, so positional and keyword
+    forms of a call are equal, and arrays are compared by their contents.
+    Results are dropped when any trait in `invalidate_on` changes.
+    """
+    if inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func):
+        raise TypeError(f"Cannot memoize the streaming action {func.__name__}")
+    lookup = _WidgetMemos(func, max_entries, ttl, invalidate_on)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            memo, key = lookup(args, kwargs)
+            if key is None:
+                return await func(*args, **kwargs)
+            found, value = memo.lookup(key)
+            if found:
+                return value
+            result = await func(*args, **kwargs)
+            memo.store(key, result)
+            return result
+
+        return async_wrapper  # type: ignore[return-value]
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> R:  # noqa: ANN401
+        memo, key = lookup(args, kwargs)
+        if key is None:
+            return func(*args, **kwargs)
+        found, value = memo.lookup(key)
+        if found:
+            return value  # type: ignore[no-any-return]
+        result = func(*args, **kwargs)
+        memo.store(key, result)
+        return result
+
+    return wrapper
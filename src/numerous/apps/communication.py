@@ -4,8 +4,10 @@ import multiprocessing
 import multiprocessing.synchronize
 import threading
 from abc import ABC, abstractmethod
+from collections import deque
 from collections.abc import Callable
 from contextlib import suppress
+from enum import IntEnum
 from queue import Empty, Queue
 from typing import Any
 
@@ -16,15 +18,68 @@ if hasattr(multiprocessing, "set_start_method"):
         multiprocessing.set_start_method("spawn")
 
 
+# Messages moved from a queue into its lanes per receive, bounding its latency
+LANE_DRAIN_LIMIT = 1000
+
+
+class Lane(IntEnum):
+    """Priority lanes of a channel; messages in lower lanes are received first."""
+
+    CONTROL = 0
+    INTERACTIVE = 1
+    BULK = 2
+
+
+# Requests and replies that page loads and session handling wait for
+_CONTROL_MESSAGES = frozenset(
+    {
+        "get-state",
+        "get-widget-states",
+        "init-config",
+        "error",
+        "session-error",
+    }
+)
+# Actions a user is waiting on; cancellations stay behind what they cancel
+_INTERACTIVE_MESSAGES = frozenset(
+    {"action-request", "action-cancel", "action-response", "action-chunk"}
+)
+
+
+def _message_lane(message: Any, default: Lane) -> Lane:  # noqa: ANN401
+    message_type = message.get("type") if isinstance(message, dict) else None
+    if message_type in _CONTROL_MESSAGES:
+        return Lane.CONTROL
+    if message_type in _INTERACTIVE_MESSAGES:
+        return Lane.INTERACTIVE
+    return default
+
+
+def to_app_lane(message: Any) -> Lane:  # noqa: ANN401
+    """Return the lane of a message to an app instance; updates are interactive."""
+    return _message_lane(message, Lane.INTERACTIVE)
+
+
+def from_app_lane(message: Any) -> Lane:  # noqa: ANN401
+    """Return the lane of a message from an app instance; updates are bulk."""
+    return _message_lane(message, Lane.BULK)
+
+
 class CommunicationChannel(ABC):
     @abstractmethod
-    def send(self, message: dict[str, Any]) -> None:
-        """Send a message to the queue."""
+    def send(self, message: dict[str, Any], lane: Lane | None = None) -> None:
+        """Send a message to the queue, in the given lane or that of its type."""
 
     @abstractmethod
     def receive(self, timeout: float | None = None) -> Any:  # noqa: ANN401
         """Receive a message from the queue."""
 
+    def receive_with_lane(
+        self, timeout: float | None = None
+    ) -> tuple[Lane | None, Any]:
+        """Receive a message with its lane, or None if the channel has no lanes."""
+        return None, self.receive(timeout)
+
     @abstractmethod
     def empty(self) -> bool:
         """Check if the queue is empty."""
@@ -68,28 +123,81 @@ class ExecutionManager(ABC):
 
 
 class QueueCommunicationChannel(CommunicationChannel):
-    def __init__(self, queue: Queue) -> None:  # type: ignore [type-arg]
-        """Initialize the QueueCommunicationChannel."""
+    def __init__(
+        self,
+        queue: Queue,  # type: ignore [type-arg]
+        lane_of: Callable[[Any], Lane] | None = None,
+    ) -> None:
+        """
+        Initialize the QueueCommunicationChannel.
+
+        Args:
+            queue: Queue carrying the messages
+            lane_of: Returns the lane of a message. When given, messages are
+                sent tagged with their lane, and those that have arrived are
+                received by lane, in order within each lane, instead of
+                strictly in the order they were sent.
+
+        """
         self.queue = queue
+        self.lane_of = lane_of
+        self._lanes: list[deque[Any]] = [deque() for _ in Lane]
 
-    def send(self, message: Any) -> None:  # noqa: ANN401
-        """Send a message to the queue."""
-        self.queue.put(message)
+    def send(self, message: Any, lane: Lane | None = None) -> None:  # noqa: ANN401
+        """Send a message to the queue, in the given lane or that of its type."""
+        if self.lane_of is None:
+            self.queue.put(message)
+        else:
+            self.queue.put((self.lane_of(message) if lane is None else lane, message))
 
     def receive(self, timeout: float | None = None) -> Any:  # noqa: ANN401
         """Receive a message from the queue."""
-        return self.queue.get(timeout=timeout)
+        return self.receive_with_lane(timeout)[1]
+
+    def receive_with_lane(
+        self, timeout: float | None = None
+    ) -> tuple[Lane | None, Any]:
+        """Receive a message with its lane, or None if the channel has no lanes."""
+        if self.lane_of is None:
+            return None, self.queue.get(timeout=timeout)
+        self._drain()
+        if not any(self._lanes):
+            # Wait for the next message, then take whatever came with it
+            self._sort(self.queue.get(timeout=timeout))
+            self._drain()
+        return self._next()
 
     def empty(self) -> bool:
         """Check if the queue is empty."""
-        return self.queue.empty()
+        return not any(self._lanes) and self.queue.empty()
 
     def receive_nowait(self) -> Any:  # noqa: ANN401
         """Receive a message from the queue without waiting."""
-        try:
-            return self.queue.get_nowait()
-        except Empty:
-            return None
+        if self.lane_of is None:
+            try:
+                return self.queue.get_nowait()
+            except Empty:
+                return None
+        self._drain()
+        return self._next()[1] if any(self._lanes) else None
+
+    def _sort(self, item: tuple[Lane, Any]) -> None:
+        lane, message = item
+        self._lanes[lane].append(message)
+
+    def _drain(self) -> None:
+        """Move the messages that have arrived into their lanes."""
+        for _ in range(LANE_DRAIN_LIMIT):
+            try:
+                self._sort(self.queue.get_nowait())
+            except Empty:
+                return
+
+    def _next(self) -> tuple[Lane, Any]:
+        for lane, messages in zip(Lane, self._lanes, strict=True):
+            if messages:
+                return lane, messages.popleft()
+        raise Empty
 
 
 class QueueCommunicationManager(CommunicationManager):
@@ -101,8 +209,10 @@ class QueueCommunicationManager(CommunicationManager):
     ) -> None:
         """Initialize the QueueCommunicationManager."""
         super().__init__()
-        self.to_app_instance = QueueCommunicationChannel(queue_to_app)
-        self.from_app_instance = QueueCommunicationChannel(queue_from_app)
+        self.to_app_instance = QueueCommunicationChannel(queue_to_app, to_app_lane)
+        self.from_app_instance = QueueCommunicationChannel(
+            queue_from_app, from_app_lane
+        )
         self.stop_event = stop_event
 
 
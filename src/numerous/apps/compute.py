@@ -0,0 +1,453 @@
+"""
+Run heavy work for all sessions in one process pool.
+
+Observers and actions run inline in their session's app instance, so a heavy
+job blocks the session and every active user can keep a core busy. The server
+runs a `ComputeService` instead: a process pool with one process per core,
+shared by all sessions. App code hands work to it with `submit`, which returns
+a future at once, so the session keeps handling messages while the job runs.
+Queued jobs are started in turn from each session, so one session submitting
+many jobs cannot hold up the others.
+
+Session processes reach the service over `multiprocessing.connection`, at the
+address and with the key the server exports in the environment when the
+service starts.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import importlib
+import importlib.util
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import secrets
+import sys
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+logger = logging.getLogger(__name__)
+
+# Address of the compute service and the key to authenticate with
+COMPUTE_ADDRESS_ENV = "NUMEROUS_COMPUTE_ADDRESS"
+COMPUTE_AUTHKEY_ENV = "NUMEROUS_COMPUTE_AUTHKEY"
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Session of the app instance running in this thread, set by the app runner
+current_session: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_session", default=""
+)
+
+
+@dataclass(frozen=True)
+class _FunctionRef:
+    """A module-level function, found by name or loaded from its file."""
+
+    module: str
+    qualname: str
+    file: str | None
+
+    @classmethod
+    def of(cls, func: Callable[..., Any]) -> _FunctionRef | Callable[..., Any]:
+        """Return a reference to `func`, or `func` if it has no module."""
+        module = getattr(func, "__module__", None)
+        qualname = getattr(func, "__qualname__", "")
+        # App modules are executed without being added to sys.modules
+        file = getattr(func, "__globals__", {}).get("__file__")
+        if module is None or "<locals>" in qualname:
+            return func
+        if module not in sys.modules and file is None:
+            return func
+        return cls(module, qualname, file)
+
+    def resolve(self) -> Callable[..., Any]:
+        """Import the function, loading its module from file if needed."""
+        module = sys.modules.get(self.module)
+        if module is None:
+            try:
+                module = importlib.import_module(self.module)
+            except ImportError:
+                # App modules are loaded from their file under a private name
+                if self.file is None:
+                    raise
+                module = _load_module(self.module, self.file)
+        target: Any = module
+        for name in self.qualname.split("."):
+            target = getattr(target, name)
+        return target  # type: ignore[no-any-return]
+
+
+def _load_module(name: str, file: str) -> Any:  # noqa: ANN401
+    spec = importlib.util.spec_from_file_location(name, file)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load {file}")
+    module = importlib.util.module_from_spec(spec)
+    module.__process__ = True  # type: ignore[attr-defined]
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def _init_worker(path: list[str]) -> None:
+    """Give pool processes the import path of the server."""
+    sys.path[:] = path
+
+
+def _run_job(payload: bytes) -> Any:  # noqa: ANN401
+    """Run a submitted function in a pool process."""
+    func, args, kwargs = pickle.loads(payload)  # noqa: S301
+    if isinstance(func, _FunctionRef):
+        func = func.resolve()
+    return func(*args, **kwargs)
+
+
+@dataclass
+class _Client:
+    """A connection from a session process, and the lock for replying on it."""
+
+    connection: Connection
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    closed: bool = False
+
+    def reply(self, message: dict[str, Any]) -> None:
+        with self.lock:
+            if self.closed:
+                return
+            try:
+                self.connection.send(message)
+            except OSError:
+                self.closed = True
+
+
+@dataclass
+class _Job:
+    client: _Client
+    job_id: int
+    payload: bytes
+
+
+class ComputeService:
+    """
+    A process pool shared by the sessions of the server.
+
+    Jobs wait in one queue per session; whenever a process is free, the next
+    session in turn gets its oldest job started.
+    """
+
+    def __init__(self, processes: int | None = None) -> None:
+        """
+        Initialize the service.
+
+        Args:
+            processes: Number of pool processes, the most jobs running at once
+                (the CPU count when None)
+
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.address: str | None = None
+        self.authkey = secrets.token_bytes(32)
+        self._executor: ProcessPoolExecutor | None = None
+        self._listener: Listener | None = None
+        self._socket_dir: tempfile.TemporaryDirectory[str] | None = None
+        self._lock = threading.Lock()
+        self._queues: dict[tuple[int, str], deque[_Job]] = {}
+        # Sessions with queued jobs, in the order they are served
+        self._turns: deque[tuple[int, str]] = deque()
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        """Start the pool and listen for sessions, exporting the address."""
+        if self._listener is not None:
+            return
+        self._socket_dir = tempfile.TemporaryDirectory(prefix="numerous-")
+        self._listener = Listener(
+            str(Path(self._socket_dir.name) / "compute.sock"), authkey=self.authkey
+        )
+        self.address = str(self._listener.address)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(list(sys.path),),
+        )
+        threading.Thread(target=self._accept_connections, daemon=True).start()
+        # Inherited by session processes started from here on
+        os.environ[COMPUTE_ADDRESS_ENV] = self.address
+        os.environ[COMPUTE_AUTHKEY_ENV] = self.authkey.hex()
+        logger.info(f"Compute service with {self.processes} processes started")
+
+    def close(self) -> None:
+        """Stop accepting jobs, cancel queued ones and shut down the pool."""
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        if os.environ.get(COMPUTE_ADDRESS_ENV) == self.address:
+            del os.environ[COMPUTE_ADDRESS_ENV]
+            del os.environ[COMPUTE_AUTHKEY_ENV]
+        # Wake the accepting thread so it sees that the service is closed
+        with contextlib.suppress(OSError, AuthenticationError):
+            Client(listener.address, authkey=self.authkey).close()
+        listener.close()
+        with self._lock:
+            queued = [job for queue in self._queues.values() for job in queue]
+            self._queues.clear()
+            self._turns.clear()
+        for job in queued:
+            job.client.reply(
+                {"job": job.job_id, "error": RuntimeError("Compute service shut down")}
+            )
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._socket_dir is not None:
+            self._socket_dir.cleanup()
+            self._socket_dir = None
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the number of processes and of queued, running and done jobs."""
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "running": self._running,
+                "sessions_waiting": len(self._turns),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def _accept_connections(self) -> None:
+        listener = self._listener
+        while listener is not None and self._listener is not None:
+            try:
+                connection = listener.accept()
+            except (OSError, AuthenticationError):
+                if self._listener is None:
+                    return
+                logger.exception("Failed to accept compute connection")
+                continue
+            if self._listener is None:
+                connection.close()
+                return
+            threading.Thread(
+                target=self._serve_connection, args=(connection,), daemon=True
+            ).start()
+
+    def _serve_connection(self, connection: Connection) -> None:
+        client = _Client(connection)
+        try:
+            while (message := connection.recv()) is not None:
+                self._enqueue(
+                    _Job(client, message["job"], message["payload"]),
+                    message.get("session", ""),
+                )
+        except (EOFError, OSError):
+            pass
+        finally:
+            with client.lock:
+                client.closed = True
+            self._drop(id(client))
+            connection.close()
+
+    def _enqueue(self, job: _Job, session: str) -> None:
+        key = (id(job.client), session)
+        with self._lock:
+            self._submitted += 1
+            queue = self._queues.setdefault(key, deque())
+            if not queue:
+                self._turns.append(key)
+            queue.append(job)
+        self._dispatch()
+
+    def _drop(self, client_id: int) -> None:
+        """Forget the queued jobs of a session process that disconnected."""
+        with self._lock:
+            for key in [key for key in self._queues if key[0] == client_id]:
+                del self._queues[key]
+            self._turns = deque(key for key in self._turns if key[0] != client_id)
+
+    def _dispatch(self) -> None:
+        """Start queued jobs, one session at a time, while processes are free."""
+        while True:
+            with self._lock:
+                executor = self._executor
+                if executor is None or self._running >= self.processes:
+                    return
+                if not self._turns:
+                    return
+                key = self._turns.popleft()
+                queue = self._queues[key]
+                job = queue.popleft()
+                if queue:
+                    self._turns.append(key)
+                else:
+                    del self._queues[key]
+                self._running += 1
+            try:
+                future = executor.submit(_run_job, job.payload)
+            except RuntimeError:
+                # The pool was shut down meanwhile
+                future = Future()
+                future.cancel()
+                self._finish(job, future)
+                return
+            future.add_done_callback(partial(self._finish, job))
+
+    def _finish(self, job: _Job, future: Future[Any]) -> None:
+        """Return the outcome of a job to its session and start the next one."""
+        error = (
+            RuntimeError("Compute service shut down")
+            if future.cancelled()
+            else future.exception()
+        )
+        with self._lock:
+            self._running -= 1
+            if error is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+        message = (
+            {"job": job.job_id, "error": error}
+            if error is not None
+            else {"job": job.job_id, "result": future.result()}
+        )
+        try:
+            job.client.reply(message)
+        except Exception as e:  # noqa: BLE001
+            # The result or exception cannot be pickled
+            job.client.reply(
+                {
+                    "job": job.job_id,
+                    "error": RuntimeError(f"Cannot return the job's outcome: {e!s}"),
+                }
+            )
+        self._dispatch()
+
+
+class ComputeClient:
+    """A session process's connection to the compute service."""
+
+    def __init__(self, address: str, authkey: bytes) -> None:
+        """Connect to the service at `address`."""
+        self._connection = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+        self._futures: dict[int, Future[Any]] = {}
+        self._job_ids = itertools.count()
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    def submit(
+        self,
+        func: Callable[P, R],
+        session: str,
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> Future[R]:
+        """Queue `func(*args, **kwargs)` as a job of `session`."""
+        payload = pickle.dumps(
+            (_FunctionRef.of(func), args, kwargs), protocol=pickle.HIGHEST_PROTOCOL
+        )
+        future: Future[R] = Future()
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._futures[job_id] = future
+            try:
+                self._connection.send(
+                    {"job": job_id, "session": session, "payload": payload}
+                )
+            except OSError:
+                del self._futures[job_id]
+                raise
+        return future
+
+    def close(self) -> None:
+        """Close the connection; pending jobs fail."""
+        with contextlib.suppress(OSError):
+            self._connection.close()
+
+    def _receive(self) -> None:
+        try:
+            while True:
+                message = self._connection.recv()
+                with self._lock:
+                    future = self._futures.pop(message["job"], None)
+                if future is None:
+                    continue
+                if "error" in message:
+                    future.set_exception(message["error"])
+                else:
+                    future.set_result(message["result"])
+        except (EOFError, OSError, TypeError):
+            # TypeError is raised when `close` runs while receiving
+            pass
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.set_exception(RuntimeError("Lost connection to compute service"))
+
+
+_client: ComputeClient | None = None
+_client_key: tuple[int, str] | None = None
+_client_lock = threading.Lock()
+# Runs jobs when the server has no compute service, off the session's loop
+_fallback = ThreadPoolExecutor(max_workers=1, thread_name_prefix="numerous-compute")
+
+
+def _get_client() -> ComputeClient | None:
+    """Return this process's client, connecting on first use."""
+    global _client, _client_key  # noqa: PLW0603
+    address = os.environ.get(COMPUTE_ADDRESS_ENV)
+    if not address:
+        return None
+    with _client_lock:
+        # Connections must not be shared with forked processes, and the
+        # service listens on a new address each time it starts
+        if _client is None or _client_key != (os.getpid(), address):
+            if _client is not None:
+                _client.close()
+            _client = ComputeClient(
+                address, bytes.fromhex(os.environ[COMPUTE_AUTHKEY_ENV])
+            )
+            _client_key = (os.getpid(), address)
+        return _client
+
+
+def submit(func: Callable[P, R], /, *args: P.args, **kwargs: P.kwargs) -> Future[R]:
+    """
+    Run `func(*args, **kwargs)` on the server's compute service.
+
+    Returns at once with a future for the result; add a done callback to
+    update widgets when the job finishes. `func` must be a module-level
+    function, and its arguments and result must be picklable. Without a
+    compute service, the job runs in a background thread of this process.
+    """
+    client = _get_client()
+    if client is None:
+        return _fallback.submit(func, *args, **kwargs)
+    return client.submit(func, current_session.get(), *args, **kwargs)
@@ -0,0 +1,297 @@
+"""
+Datasets shared by the app instances of all sessions.
+
+Apps load their data when `app.py` is imported, and every session process
+imports it again, so each session would hold its own copy of the same
+dataset. Registered datasets are instead written once to a memory-mapped
+file, in a shared-memory directory where available, and every process maps
+that file read-only: the operating system keeps a single copy in memory.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
+
+import numpy as np
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+# Directory of the materialized datasets, inherited by session processes
+DATASET_DIR_ENV = "NUMEROUS_DATASET_DIR"
+# RAM-backed filesystem used for the datasets when the system has one
+SHARED_MEMORY_DIR = "/dev/shm"  # noqa: S108
+
+DatasetFormat = Literal["npy", "arrow", "raw"]
+
+_SUFFIXES: dict[str, str] = {"npy": ".npy", "arrow": ".arrow", "raw": ".bin"}
+
+
+@dataclass
+class _Dataset:
+    """A registered dataset and its attachment in this process."""
+
+    loader: Callable[[], Any]
+    format: DatasetFormat
+    value: Any = None
+    references: int = 0
+
+
+class DatasetRegistry:
+    """
+    Registry of datasets materialized once and mapped by every process.
+
+    The first process to use the registry creates its directory and owns it;
+    processes started from it, such as session processes, find the directory
+    in the environment and attach to the files already written there. Only
+    the owner removes the directory, on `close()` or at exit.
+    """
+
+    def __init__(self, directory: str | Path | None = None) -> None:
+        self._directory = Path(directory) if directory is not None else None
+        self._owner = False
+        self._datasets: dict[str, _Dataset] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def directory(self) -> Path:
+        """Return the directory of the dataset files, creating it if needed."""
+        with self._lock:
+            if self._directory is None:
+                inherited = os.environ.get(DATASET_DIR_ENV)
+                if inherited:
+                    self._directory = Path(inherited)
+                else:
+                    parent = (
+                        SHARED_MEMORY_DIR if Path(SHARED_MEMORY_DIR).is_dir() else None
+                    )
+                    self._directory = Path(
+                        tempfile.mkdtemp(prefix="numerous-datasets-", dir=parent)
+                    )
+                    self._owner = True
+                    os.environ[DATASET_DIR_ENV] = str(self._directory)
+                    atexit.register(self.close)
+            self._directory.mkdir(parents=True, exist_ok=True)
+            return self._directory
+
+    @property
+    def owner(self) -> bool:
+        """Check whether this process created the dataset directory."""
+        return self._owner
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        format: DatasetFormat = "npy",  # noqa: A002
+    ) -> None:
+        """
+        Register a dataset, loaded by `loader` the first time it is used.
+
+        Call this when the app module is imported, so that the server process
+        sets up the shared directory before starting any session processes.
+
+        Args:
+            name: Name to get the dataset by
+            loader: Returns the data: an array for "npy", a pyarrow Table or
+                pandas DataFrame for "arrow" and bytes for "raw"
+            format: How the dataset is stored and mapped
+
+        """
+        if format not in _SUFFIXES:
+            raise ValueError(f"Unknown dataset format: {format}")
+        if not name or "/" in name or "\\" in name:
+            raise ValueError(f"Invalid dataset name: {name!r}")
+        with self._lock:
+            registered = self._datasets.get(name)
+            if registered is not None and registered.references:
+                # Re-registering while attached keeps the mapped data
+                registered.loader = loader
+                return
+            self._datasets[name] = _Dataset(loader=loader, format=format)
+        _ = self.directory
+
+    def get(self, name: str) -> Any:  # noqa: ANN401
+        """
+        Return a read-only, memory-mapped view of a registered dataset.
+
+        The dataset is materialized on first use by any process, while other
+        processes wait for it. Each call takes a reference that `release()`
+        gives back.
+        """
+        with self._lock:
+            dataset = self._dataset(name)
+            if dataset.value is None:
+                path = self._path(name, dataset)
+                if not path.exists():
+                    with _file_lock(path.with_name(f"{path.name}.lock")):
+                        # Another process may have written it while this one waited
+                        if not path.exists():
+                            self._materialize(path, dataset)
+                dataset.value = _attach(path, dataset.format)
+            dataset.references += 1
+            return dataset.value
+
+    def release(self, name: str) -> None:
+        """Give back a reference, unmapping the dataset when none are left."""
+        with self._lock:
+            dataset = self._dataset(name)
+            if dataset.references == 0:
+                return
+            dataset.references -= 1
+            if dataset.references == 0:
+                _detach(dataset.value)
+                dataset.value = None
+
+    def references(self, name: str) -> int:
+        """Return the number of references to a dataset held in this process."""
+        with self._lock:
+            return self._dataset(name).references
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Return the format, file size and references of each dataset."""
+        with self._lock:
+            metrics = {}
+            for name, dataset in self._datasets.items():
+                path = self._path(name, dataset)
+                metrics[name] = {
+                    "format": dataset.format,
+                    "bytes": path.stat().st_size if path.exists() else 0,
+                    "references": dataset.references,
+                }
+            return metrics
+
+    def close(self) -> None:
+        """Unmap all datasets and, in the owning process, delete their files."""
+        with self._lock:
+            for dataset in self._datasets.values():
+                _detach(dataset.value)
+                dataset.value = None
+                dataset.references = 0
+            if self._owner and self._directory is not None:
+                shutil.rmtree(self._directory, ignore_errors=True)
+                if os.environ.get(DATASET_DIR_ENV) == str(self._directory):
+                    del os.environ[DATASET_DIR_ENV]
+                self._directory = None
+                self._owner = False
+
+    def _dataset(self, name: str) -> _Dataset:
+        dataset = self._datasets.get(name)
+        if dataset is None:
+            raise KeyError(f"Dataset '{name}' is not registered")
+        return dataset
+
+    def _path(self, name: str, dataset: _Dataset) -> Path:
+        return self.directory / f"{name}{_SUFFIXES[dataset.format]}"
+
+    def _materialize(self, path: Path, dataset: _Dataset) -> None:
+        """Write a dataset to its file; the rename makes it appear complete."""
+        logger.info(f"Materializing dataset {path.name}")
+        data = dataset.loader()
+        fd, temp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                _write(file, data, dataset.format)
+            Path(temp_name).replace(path)
+        except BaseException:
+            with suppress(OSError):
+                Path(temp_name).unlink()
+            raise
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on `path` against other processes."""
+    with path.open("a") as file:
+        if sys.platform == "win32":
+            # Without the lock, processes may each write the complete file
+            yield
+            return
+        import fcntl
+
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def _write(file: Any, data: Any, format: DatasetFormat) -> None:  # noqa: A002, ANN401
+    if format == "npy":
+        np.save(file, np.asarray(data), allow_pickle=False)
+    elif format == "arrow":
+        pa = _import_pyarrow()
+        table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data)
+        with pa.ipc.new_file(file, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        file.write(memoryview(data))
+
+
+def _attach(path: Path, format: DatasetFormat) -> Any:  # noqa: A002, ANN401
+    if format == "npy":
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+    if format == "arrow":
+        pa = _import_pyarrow()
+        return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    with path.open("rb") as file:
+        if path.stat().st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _detach(value: Any) -> None:  # noqa: ANN401
+    if isinstance(value, mmap.mmap):
+        # Views of the data still held by the app keep the mapping alive
+        with suppress(BufferError):
+            value.close()
+
+
+def _import_pyarrow() -> Any:  # noqa: ANN401
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError(
+            "Arrow datasets require pyarrow. "
+            "Install with: pip install numerous-apps[arrow]"
+        ) from e
+    return pa
+
+
+# Registry used by the module-level functions
+datasets = DatasetRegistry()
+
+
+def register_dataset(
+    name: str,
+    loader: Callable[[], Any],
+    format: DatasetFormat = "npy",  # noqa: A002
+) -> None:
+    """Register a dataset in the default registry."""
+    datasets.register(name, loader, format)
+
+
+def get_dataset(name: str) -> Any:  # noqa: ANN401
+    """Return a memory-mapped view of a dataset in the default registry."""
+    return datasets.get(name)
+
+
+def release_dataset(name: str) -> None:
+    """Give back a reference to a dataset in the default registry."""
+    datasets.release(name)
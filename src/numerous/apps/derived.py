@@ -0,0 +1,202 @@
+"""
+Values derived from widget traits, recomputed only when needed.
+
+Instead of wiring `observe` chains by hand, declare how a value is computed
+from traits of other widgets, or from other derived values, and optionally
+which trait it is shown in:
+
+    total = derived(lambda: price.value * amount.value,
+                    (price, "value"), (amount, "value"))
+    derived(lambda: f"{total.value:.2f}", total, target=(label, "text"))
+
+Changes to the traits a value depends on only mark it stale. Stale values
+with a target are recomputed once the current batch of changes is handled
+(after the message that caused them, when running in an app), dependencies
+first, so every value is computed at most once per batch. Values without a
+target are only computed when read. A target trait is only set, and so only
+sent to clients, when its value actually changed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import TYPE_CHECKING, Any
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from traitlets import HasTraits
+
+
+logger = logging.getLogger(__name__)
+
+# The derived value setting each target trait, to evaluate it before readers
+_producers: WeakKeyDictionary[HasTraits, dict[str, Derived]] = WeakKeyDictionary()
+
+
+class _Batch(threading.local):
+    """Stale values with targets, per app thread, waiting to be recomputed."""
+
+    def __init__(self) -> None:
+        self.pending: dict[int, Derived] = {}
+        self.scheduled = False
+        self.flushing = False
+
+
+_batch = _Batch()
+
+
+class Derived:
+    """A value computed from widget traits and other derived values."""
+
+    def __init__(
+        self,
+        func: Callable[[], Any],
+        *depends_on: Derived | tuple[HasTraits, str],
+        target: tuple[HasTraits, str] | None = None,
+    ) -> None:
+        """
+        Declare a derived value.
+
+        Args:
+            func: Computes the value; reads its inputs directly, e.g. from
+                widget traits or the `value` of other derived values
+            depends_on: Derived values and (widget, trait) pairs the value is
+                computed from
+            target: Widget trait to show the value in, if any
+
+        """
+        self.func = func
+        self.target = target
+        self._inputs: list[Derived] = []
+        self._traits: list[tuple[HasTraits, str]] = []
+        self._dependents: list[Derived] = []
+        self._value: Any = None
+        self._stale = True
+        self._computing = False
+        for dependency in depends_on:
+            if isinstance(dependency, Derived):
+                self._inputs.append(dependency)
+                dependency._dependents.append(self)  # noqa: SLF001
+            else:
+                widget, trait = dependency
+                self._traits.append((widget, trait))
+                widget.observe(self._on_change, names=[trait])
+        if target is not None:
+            widget, trait = target
+            _producers.setdefault(widget, {})[trait] = self
+            _schedule(self)
+
+    @property
+    def value(self) -> Any:  # noqa: ANN401
+        """Return the value, recomputing it first if it is stale."""
+        self._refresh()
+        return self._value
+
+    def invalidate(self) -> None:
+        """Mark this value and everything derived from it stale."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node._stale and node is not self:  # noqa: SLF001
+                continue
+            node._stale = True  # noqa: SLF001
+            if node.target is not None:
+                _schedule(node)
+            stack.extend(node._dependents)  # noqa: SLF001
+
+    def _on_change(self, _change: Any) -> None:  # noqa: ANN401
+        self.invalidate()
+
+    def _refresh(self) -> None:
+        """Recompute the value if it is stale, after its inputs."""
+        if not self._stale:
+            return
+        if self._computing:
+            raise RuntimeError("Derived values depend on each other in a cycle")
+        self._computing = True
+        try:
+            for node in self._inputs:
+                node._refresh()  # noqa: SLF001
+            # Traits shown by other derived values must be up to date first
+            for widget, trait in self._traits:
+                producer = _producers.get(widget, {}).get(trait)
+                if producer is not None:
+                    producer._refresh()  # noqa: SLF001
+            self._stale = False
+            self._value = self.func()
+        finally:
+            self._computing = False
+        if self.target is not None:
+            widget, trait = self.target
+            if not _equal(getattr(widget, trait), self._value):
+                setattr(widget, trait, self._value)
+
+
+def derived(
+    func: Callable[[], Any],
+    *depends_on: Derived | tuple[HasTraits, str],
+    target: tuple[HasTraits, str] | None = None,
+) -> Derived:
+    """Declare a value derived from widget traits; see `Derived`."""
+    return Derived(func, *depends_on, target=target)
+
+
+def flush() -> None:
+    """Recompute the stale values with targets of this thread's app."""
+    _batch.scheduled = False
+    if _batch.flushing:
+        return
+    _batch.flushing = True
+    done: set[int] = set()
+    try:
+        # Setting a target may make further values stale; they join the batch
+        while _batch.pending:
+            key, node = _batch.pending.popitem()
+            if key in done:
+                # Only values whose targets feed back into their inputs return
+                logger.error("Derived values depend on each other in a cycle")
+                continue
+            done.add(key)
+            try:
+                node._refresh()  # noqa: SLF001
+            except Exception:
+                logger.exception("Failed to compute derived value")
+    finally:
+        _batch.flushing = False
+
+
+def _schedule(node: Derived) -> None:
+    """Recompute `node` at the end of the current batch of changes."""
+    _batch.pending[id(node)] = node
+    if _batch.scheduled or _batch.flushing:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Outside an app's event loop, e.g. while the app is created
+        flush()
+        return
+    _batch.scheduled = True
+    loop.call_soon(flush)
+
+
+def _equal(old: Any, new: Any) -> bool:  # noqa: ANN401
+    """Compare trait values, including arrays, without raising."""
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return (
+            isinstance(old, np.ndarray)
+            and isinstance(new, np.ndarray)
+            and old.dtype == new.dtype
+            and np.array_equal(old, new)
+        )
+    try:
+        return bool(old == new)
+    except Exception:  # noqa: BLE001
+        return False
@@ -1,9 +1,22 @@
 """Module for executing apps."""
 
+import asyncio
 import inspect
 import json
 import logging
-from collections.abc import Callable, Sequence
+import os
+import threading
+from collections import deque
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterator,
+    Sequence,
+)
+from contextlib import suppress
+from functools import partial
 from inspect import getmembers
 from queue import Empty
 from typing import TYPE_CHECKING, Any, TypedDict, cast, get_type_hints
@@ -15,13 +28,17 @@ if TYPE_CHECKING:
     from pydantic import BaseModel
 
 from .communication import CommunicationChannel as CommunicationChannel
+from .communication import Lane, to_app_lane
 from .communication import QueueCommunicationManager as CommunicationManager
 from .models import (
+    ActionCancelMessage,
+    ActionChunkMessage,
     ActionDescription,
     ActionParameter,
     ActionRequestMessage,
     ActionResponseMessage,
     ErrorMessage,
+    GetStateMessage,
     GetWidgetStatesMessage,
     HandlerResponse,
     InitConfigMessage,
@@ -101,6 +118,11 @@ def _transform_widgets(
 
 logger = logging.getLogger(__name__)
 
+# Async actions a session runs at the same time; later ones wait for a slot
+MAX_CONCURRENT_ACTIONS = 4
+# Passes the server's limit to app instances in session processes
+MAX_CONCURRENT_ACTIONS_ENV = "NUMEROUS_MAX_CONCURRENT_ACTIONS"
+
 
 def create_handler(
     communication_manager: CommunicationManager, wid: str, trait: str
@@ -123,21 +145,94 @@ def create_handler(
     return sync_handler
 
 
+def _is_restartable(func: Callable[..., Any]) -> bool:
+    return bool(getattr(func, "_restartable", False))
+
+
+def _forget_run(
+    runs: dict[Any, asyncio.Task[Any]], key: object, task: asyncio.Task[Any]
+) -> None:
+    """Drop a finished run, unless a newer one has replaced it."""
+    if runs.get(key) is task:
+        del runs[key]
+
+
+class _AsyncObserver:
+    """Runs a coroutine observer as a task on the app's event loop."""
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Coroutine[Any, Any, Any]],
+        loop: asyncio.AbstractEventLoop,
+        spawn: Callable[[Coroutine[Any, Any, Any]], asyncio.Task[Any]],
+    ) -> None:
+        self.handler = handler
+        self._loop = loop
+        self._spawn = spawn
+        # Runs of restartable observers, by widget and trait
+        self._runs: dict[tuple[int, str], asyncio.Task[Any]] = {}
+
+    def __call__(self, change: Any) -> None:  # noqa: ANN401
+        self._loop.call_soon_threadsafe(self._start, change)
+
+    def _start(self, change: Any) -> None:  # noqa: ANN401
+        task = self._spawn(self.handler(change))
+        if _is_restartable(self.handler):
+            key = (id(change.owner), change.name)
+            if (previous := self._runs.get(key)) is not None:
+                previous.cancel()
+            self._runs[key] = task
+            task.add_done_callback(partial(_forget_run, self._runs, key))
+
+    # Compare as the wrapped handler, so that `unobserve(handler)` finds it
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, _AsyncObserver):
+            other = other.handler
+        return bool(self.handler == other)
+
+    def __hash__(self) -> int:
+        return hash(self.handler)
+
+
+def _schedule_async_observers(
+    widgets: dict[str, AnyWidget],
+    loop: asyncio.AbstractEventLoop,
+    spawn: Callable[[Coroutine[Any, Any, Any]], asyncio.Task[Any]],
+) -> None:
+    """Make observers defined with `async def` run as tasks on `loop`."""
+    for widget in widgets.values():
+        for notifiers in widget._trait_notifiers.values():  # noqa: SLF001
+            for handlers in notifiers.values():
+                for index, handler in enumerate(handlers):
+                    if inspect.iscoroutinefunction(handler):
+                        handlers[index] = _AsyncObserver(handler, loop, spawn)
+
+
 class MessageHandler:
     def __init__(
         self,
         widgets: dict[str, AnyWidget],
         template: str,
         transformed_widgets: dict[str, WidgetConfig],
+        send: Callable[[dict[str, Any]], None] | None = None,
+        max_concurrent_actions: int = MAX_CONCURRENT_ACTIONS,
     ) -> None:
         self.widgets = widgets
         self.template = template
         self.transformed_widgets = transformed_widgets
+        self.send = send
+        self.max_concurrent_actions = max_concurrent_actions
+        self._action_slots: asyncio.Semaphore | None = None
+        self._tasks: set[asyncio.Task[Any]] = set()
+        # Running async actions, by request and, if restartable, by action
+        self._actions: dict[str, asyncio.Task[Any]] = {}
+        self._restartable_actions: dict[tuple[str, str], asyncio.Task[Any]] = {}
         self.handlers = {
             MessageType.GET_STATE: self._handle_get_state,
             MessageType.GET_WIDGET_STATES: self._handle_get_widget_states,
             MessageType.WIDGET_UPDATE: self._handle_widget_update,
             MessageType.ACTION_REQUEST: self._handle_action_request,
+            MessageType.ACTION_CANCEL: self._handle_action_cancel,
         }
 
     def handle(self, message: dict[str, Any]) -> HandlerResponse | None:
@@ -154,8 +249,115 @@ class MessageHandler:
             logger.exception(f"Unknown message type: {message.get('type')}")
             return None
 
-    def _handle_get_state(self, _: dict[str, Any]) -> HandlerResponse:
-        return _handle_get_state(self.widgets, self.template)
+    def spawn(self, coroutine: Coroutine[Any, Any, Any]) -> asyncio.Task[Any]:
+        """Run `coroutine` as a task on the running loop, logging its errors."""
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task[Any]) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Error in app task", exc_info=task.exception())
+
+    async def _run_async_action(
+        self, request: ActionRequestMessage, result: Awaitable[Any]
+    ) -> None:
+        """Await an async action in a free slot, then send its response."""
+        if self._action_slots is None:
+            self._action_slots = asyncio.Semaphore(self.max_concurrent_actions)
+        try:
+            async with self._action_slots:
+                response = _action_response(request, await result)
+        except Exception as e:
+            logger.exception("Error executing action")
+            response = _action_error(request.model_dump(), str(e))
+        self._reply(response)
+
+    async def _stream_chunks(
+        self,
+        request: ActionRequestMessage,
+        chunks: Iterator[Any] | AsyncIterator[Any],
+    ) -> None:
+        """Send each chunk a streaming action yields as its own message."""
+        try:
+            if isinstance(chunks, AsyncIterator):
+                async for chunk in chunks:
+                    self._send_chunk(request, chunk)
+            else:
+                for chunk in chunks:
+                    self._send_chunk(request, chunk)
+                    # Handle other messages between the chunks of a generator
+                    await asyncio.sleep(0)
+        finally:
+            if inspect.isasyncgen(chunks):
+                await chunks.aclose()
+            elif inspect.isgenerator(chunks):
+                chunks.close()
+
+    def _send_chunk(
+        self,
+        request: ActionRequestMessage,
+        chunk: Any,  # noqa: ANN401
+    ) -> None:
+        if self.send is not None:
+            self.send(
+                ActionChunkMessage(
+                    widget_id=request.widget_id,
+                    action_name=request.action_name,
+                    chunk=chunk,
+                    client_id=request.client_id,
+                    request_id=request.request_id,
+                ).model_dump()
+            )
+
+    def _reply(self, response: ActionResponseMessage) -> None:
+        if self.send is not None:
+            self.send(response.model_dump())
+
+    def _reply_if_cancelled(
+        self,
+        request: ActionRequestMessage,
+        result: Awaitable[Any],
+        task: asyncio.Task[Any],
+    ) -> None:
+        """Answer a cancelled action, also one cancelled before it started."""
+        if task.cancelled():
+            # The action may not have got a slot, or even its task a turn
+            if inspect.iscoroutine(result):
+                result.close()
+            self._reply(_action_error(request.model_dump(), "Action cancelled"))
+
+    def _start_async_action(
+        self,
+        request: ActionRequestMessage,
+        action: Callable[..., Any],
+        result: Awaitable[Any],
+    ) -> None:
+        """Run an async action, replacing the running call if it is restartable."""
+        task = self.spawn(self._run_async_action(request, result))
+        task.add_done_callback(partial(self._reply_if_cancelled, request, result))
+        self._actions[request.request_id] = task
+        task.add_done_callback(partial(_forget_run, self._actions, request.request_id))
+        if _is_restartable(action):
+            key = (request.widget_id, request.action_name)
+            if (previous := self._restartable_actions.get(key)) is not None:
+                previous.cancel()
+            self._restartable_actions[key] = task
+            task.add_done_callback(partial(_forget_run, self._restartable_actions, key))
+
+    def _handle_action_cancel(self, message: dict[str, Any]) -> HandlerResponse:
+        """Cancel a running async action, e.g. when its caller went away."""
+        request = ActionCancelMessage(**message)
+        if (task := self._actions.get(request.request_id)) is not None:
+            task.cancel()
+        return HandlerResponse.none()
+
+    def _handle_get_state(self, message: dict[str, Any]) -> HandlerResponse:
+        return _handle_get_state(
+            self.widgets, self.template, GetStateMessage(**message).request_id
+        )
 
     def _handle_get_widget_states(self, message: dict[str, Any]) -> HandlerResponse:
         return _handle_get_widget_states(
@@ -212,42 +414,84 @@ class MessageHandler:
 
             # Execute the action
             result = action(*tuple(request.args), **request.kwargs)
-
-            # Create response message
-            response = ActionResponseMessage(
-                type=MessageType.ACTION_RESPONSE.value,
-                widget_id=request.widget_id,
-                action_name=request.action_name,
-                result=result,
-                client_id=request.client_id,
-                request_id=request.request_id,
-            )
-
-            return HandlerResponse(messages=[response])
+            if inspect.isgenerator(result) or inspect.isasyncgen(result):
+                if self.send is None:
+                    result = _collect_chunks(result)
+                else:
+                    result = self._stream_chunks(request, result)
+            if inspect.isawaitable(result):
+                if self.send is None:
+                    # Without a message loop to reply from, finish it here
+                    result = _run_to_completion(result)
+                else:
+                    # Keep handling messages while the action runs
+                    self._start_async_action(request, action, result)
+                    return HandlerResponse.none()
+
+            return HandlerResponse(messages=[_action_response(request, result)])
 
         except Exception as e:
             logger.exception("Error executing action")
-            return HandlerResponse(
-                messages=[
-                    ActionResponseMessage(
-                        type=MessageType.ACTION_RESPONSE.value,
-                        widget_id=message.get("widget_id", ""),
-                        action_name=message.get("action_name", ""),
-                        result=None,
-                        error=str(e),
-                        client_id=message.get("client_id"),
-                        request_id=message.get("request_id", "unknown"),
-                    )
-                ]
-            )
+            return HandlerResponse(messages=[_action_error(message, str(e))])
+
+
+def _action_response(
+    request: ActionRequestMessage,
+    result: Any,  # noqa: ANN401
+) -> ActionResponseMessage:
+    return ActionResponseMessage(
+        type=MessageType.ACTION_RESPONSE.value,
+        widget_id=request.widget_id,
+        action_name=request.action_name,
+        result=result,
+        client_id=request.client_id,
+        request_id=request.request_id,
+    )
+
+
+def _action_error(message: dict[str, Any], error: str) -> ActionResponseMessage:
+    return ActionResponseMessage(
+        type=MessageType.ACTION_RESPONSE.value,
+        widget_id=message.get("widget_id", ""),
+        action_name=message.get("action_name", ""),
+        result=None,
+        error=error,
+        client_id=message.get("client_id"),
+        request_id=message.get("request_id", "unknown"),
+    )
+
+
+def _collect_chunks(chunks: Iterator[Any] | AsyncIterator[Any]) -> list[Any]:
+    if isinstance(chunks, AsyncIterator):
+
+        async def collect() -> list[Any]:
+            return [chunk async for chunk in chunks]
+
+        return _run_to_completion(collect())  # type: ignore[no-any-return]
+    return list(chunks)
+
+
+def _run_to_completion(awaitable: Awaitable[Any]) -> Any:  # noqa: ANN401
+    async def wait() -> Any:  # noqa: ANN401
+        return await awaitable
+
+    return asyncio.run(wait())
 
 
 def _execute(
     communication_manager: CommunicationManager,
     widgets: dict[str, AnyWidget],
     template: str,
+    max_concurrent_actions: int | None = None,
 ) -> None:
-    """Handle widget logic in the separate process."""
+    """
+    Handle widget logic in the separate process.
+
+    Messages are handled on an asyncio event loop. Actions and observers
+    defined with `async def` run as tasks on it, so a long-running one does
+    not hold up other messages; at most `max_concurrent_actions` async actions
+    (the server's limit when None) run at the same time.
+    """
     logger.debug("Starting widget transformation")
     transformed_widgets = _transform_widgets(widgets)
     logger.debug(f"Transformed {len(widgets)} widgets")
@@ -273,25 +517,121 @@ def _execute(
     communication_manager.from_app_instance.send(init_config.model_dump())
     logger.debug("Initial config sent successfully")
 
-    message_handler = MessageHandler(widgets, template, transformed_widgets)
+    if max_concurrent_actions is None:
+        max_concurrent_actions = int(
+            os.environ.get(MAX_CONCURRENT_ACTIONS_ENV, MAX_CONCURRENT_ACTIONS)
+        )
+    message_handler = MessageHandler(
+        widgets,
+        template,
+        transformed_widgets,
+        send=communication_manager.from_app_instance.send,
+        max_concurrent_actions=max_concurrent_actions,
+    )
     logger.debug("Message handler initialized, starting message loop")
 
-    # Listen for messages from the main process
-    while not communication_manager.stop_event.is_set():
-        try:
-            message = communication_manager.to_app_instance.receive(timeout=0.1)
-            response = message_handler.handle(message)
+    # App code runs on this loop; pending tasks are cancelled when it stops
+    with asyncio.Runner() as runner:
+        _schedule_async_observers(widgets, runner.get_loop(), message_handler.spawn)
+        runner.run(_message_loop(communication_manager, message_handler))
+
+
+async def _message_loop(
+    communication_manager: CommunicationManager, message_handler: MessageHandler
+) -> None:
+    """Handle messages from the main process until asked to stop."""
+    inbox = _LaneInbox()
+    # Wait for messages in a thread, so tasks run while the queue is idle. A
+    # daemon thread, unlike an executor, keeps working while the interpreter
+    # shuts down and does not hold it up.
+    threading.Thread(
+        target=_receive_messages,
+        args=(communication_manager, asyncio.get_running_loop(), inbox),
+        name="numerous-receive",
+        daemon=True,
+    ).start()
+    while True:
+        message = await inbox.get()
+        if message is _STOP_RECEIVING:
+            return
+        if isinstance(message, Exception):
+            raise message
+        response = message_handler.handle(message)
+
+        # Send all messages from the handler response
+        if response:
+            for msg in response.messages:
+                communication_manager.from_app_instance.send(msg.model_dump())
+
+
+# Put in the inbox by the receiving thread when it stops
+_STOP_RECEIVING = object()
+
 
-            # Send all messages from the handler response
-            if response:
-                for msg in response.messages:
-                    communication_manager.from_app_instance.send(msg.model_dump())
+class _LaneInbox:
+    """
+    Messages waiting for the app's loop, by lane.
 
-        except Empty:
-            continue
+    The receiving thread hands over messages as soon as they arrive, so the
+    lanes are kept here: the loop takes control messages before interactive
+    ones, and those before bulk ones, whenever it is free for the next.
+    """
 
+    def __init__(self) -> None:
+        self._lanes: list[deque[Any]] = [deque() for _ in Lane]
+        self._ready = asyncio.Event()
 
-def _handle_get_state(widgets: dict[str, AnyWidget], template: str) -> HandlerResponse:
+    def put(self, lane: Lane, item: Any) -> None:  # noqa: ANN401
+        """Add a message to its lane; call on the loop."""
+        self._lanes[lane].append(item)
+        self._ready.set()
+
+    async def get(self) -> Any:  # noqa: ANN401
+        """Return the oldest message of the highest priority lane."""
+        # Let messages the thread has handed over meanwhile join their lanes
+        await asyncio.sleep(0)
+        while True:
+            for messages in self._lanes:
+                if messages:
+                    return messages.popleft()
+            self._ready.clear()
+            await self._ready.wait()
+
+
+def _receive_messages(
+    communication_manager: CommunicationManager,
+    loop: asyncio.AbstractEventLoop,
+    inbox: _LaneInbox,
+) -> None:
+    """Pass messages for the app to its loop until a stop is requested."""
+    item: Any = _STOP_RECEIVING
+    try:
+        while not communication_manager.stop_event.is_set():
+            try:
+                lane, message = communication_manager.to_app_instance.receive_with_lane(
+                    0.1
+                )
+            except Empty:
+                continue
+            if lane is None:
+                lane = to_app_lane(message)
+            loop.call_soon_threadsafe(inbox.put, lane, message)
+    except (EOFError, OSError):
+        # The queue was closed, as when the main process exits
+        logger.debug("Stopped receiving messages: queue closed")
+    except RuntimeError:
+        # The app's loop has already closed
+        return
+    except Exception as e:  # noqa: BLE001
+        item = e
+    # Behind every message received before it
+    with suppress(RuntimeError):
+        loop.call_soon_threadsafe(inbox.put, Lane.BULK, item)
+
+
+def _handle_get_state(
+    widgets: dict[str, AnyWidget], template: str, request_id: str | None = None
+) -> HandlerResponse:
     logger.info("[App] Sending initial config to main process")
     return HandlerResponse(
         messages=[
@@ -300,6 +640,7 @@ def _handle_get_state(widgets: dict[str, AnyWidget], template: str) -> HandlerRe
                 widgets=list(widgets.keys()),
                 widget_configs=_transform_widgets(widgets),
                 template=template,
+                request_id=request_id,
             )
         ]
     )
@@ -0,0 +1,94 @@
+// Web Worker that owns the WebSocket connection for numerous.js.
+// Frames are parsed here so large payloads never block input handling or
+// rendering on the main thread. When typed arrays are enabled, long numeric
+// arrays are converted to Float64Array and their buffers are transferred
+// (zero-copy) instead of being structured-cloned.
+
+// Minimum length before a numeric array is worth converting to a typed array
+const TYPED_ARRAY_MIN_LENGTH = 1024;
+
+let ws = null;
+let useTypedArrays = false;
+
+function isNumericArray(value) {
+    if (value.length < TYPED_ARRAY_MIN_LENGTH) return false;
+    for (let i = 0; i < value.length; i++) {
+        if (typeof value[i] !== 'number') return false;
+    }
+    return true;
+}
+
+// Replace long numeric arrays in a decoded message with typed arrays,
+// collecting their buffers in `transfer`
+function toTypedArrays(value, transfer) {
+    if (Array.isArray(value)) {
+        if (isNumericArray(value)) {
+            const typed = Float64Array.from(value);
+            transfer.push(typed.buffer);
+            return typed;
+        }
+        for (let i = 0; i < value.length; i++) {
+            value[i] = toTypedArrays(value[i], transfer);
+        }
+        return value;
+    }
+    if (value !== null && typeof value === 'object') {
+        for (const key of Object.keys(value)) {
+            value[key] = toTypedArrays(value[key], transfer);
+        }
+    }
+    return value;
+}
+
+function connect(url) {
+    ws = new WebSocket(url);
+
+    ws.onopen = () => self.postMessage({ event: 'open' });
+
+    ws.onmessage = (event) => {
+        let message;
+        try {
+            message = JSON.parse(event.data);
+        } catch (error) {
+            self.postMessage({
+                event: 'decode-error',
+                error: String(error),
+                raw: String(event.data).substring(0, 200)
+            });
+            return;
+        }
+
+        const transfer = [];
+        if (useTypedArrays) {
+            message = toTypedArrays(message, transfer);
+        }
+        self.postMessage({ event: 'message', message: message }, transfer);
+    };
+
+    ws.onerror = () => self.postMessage({ event: 'error' });
+
+    ws.onclose = (event) => {
+        self.postMessage({ event: 'close', code: event.code, reason: event.reason });
+        ws = null;
+    };
+}
+
+self.onmessage = (event) => {
+    const data = event.data;
+    switch (data.command) {
+        case 'connect':
+            useTypedArrays = !!data.typedArrays;
+            connect(data.url);
+            break;
+        case 'send':
+            if (ws && ws.readyState === WebSocket.OPEN) {
+                ws.send(data.data);
+            }
+            break;
+        case 'close':
+            if (ws) {
+                ws.close();
+            }
+            break;
+    }
+};
@@ -16,6 +16,14 @@ const BASE_PATH = window.NUMEROUS_BASE_PATH || "";
 // This prevents multi-app deployments from sharing session IDs
 const SESSION_STORAGE_KEY = `numerous_session${BASE_PATH || '_root'}`;
 
+// Optional Web Worker that owns the WebSocket and decodes frames off the main thread.
+// The server enables it with create_app(ws_worker=True) by injecting this config.
+const WS_WORKER_CONFIG = window.NUMEROUS_WS_WORKER || null;
+
+// Session the server started speculatively while this page was being served.
+// It is used unless this tab already has a session of its own.
+const SPECULATIVE_SESSION_ID = window.NUMEROUS_SESSION_ID || null;
+
 // Set debug level based on URL parameters
 function initializeDebugging() {
     // Check for debug parameter in URL
@@ -69,6 +77,7 @@ const MessageType = {
     GET_WIDGET_STATES: 'get-widget-states',
     ACTION_REQUEST: 'action-request',
     ACTION_RESPONSE: 'action-response',
+    ACTION_CHUNK: 'action-chunk',
     ERROR: 'error',
     INIT_CONFIG: 'init-config',
     SESSION_ERROR: 'session-error',
@@ -349,6 +358,8 @@ async function loadWidget(moduleSource) {
     }
 }
 var wsManager;
+// Write token granted when joining a broadcast session as a writer
+let broadcastWriteToken = null;
 
 // Helper function to get auth headers if auth is enabled
 function getAuthHeaders() {
@@ -372,6 +383,30 @@ function getUserContext() {
     };
 }
 
+// Retry limits when the server is too busy to start a new session (HTTP 503)
+const SPAWN_RETRY_MAX_ATTEMPTS = 8;
+const SPAWN_RETRY_DEFAULT_DELAY = 2000;
+const SPAWN_RETRY_MAX_DELAY = 30000;
+
+async function fetchWithSpawnRetry(url, options) {
+    for (let attempt = 1; ; attempt++) {
+        const response = await fetch(url, options);
+        if (response.status !== 503 || attempt >= SPAWN_RETRY_MAX_ATTEMPTS) {
+            return response;
+        }
+
+        // Honour Retry-After, backing off and adding jitter so that clients
+        // reconnecting together do not retry together
+        const retryAfter = parseFloat(response.headers.get('Retry-After'));
+        const baseDelay = Number.isFinite(retryAfter)
+            ? retryAfter * 1000
+            : SPAWN_RETRY_DEFAULT_DELAY * 2 ** (attempt - 1);
+        const delay = Math.min(baseDelay, SPAWN_RETRY_MAX_DELAY) * (1 + Math.random());
+        log(LOG_LEVELS.WARN, `Server busy starting sessions, retrying in ${Math.round(delay)} ms`);
+        await new Promise(resolve => setTimeout(resolve, delay));
+    }
+}
+
 // Function to fetch widget configurations and states from the server
 async function fetchWidgetConfigs() {
     try {
@@ -384,7 +419,23 @@ async function fetchWidgetConfigs() {
             ...getAuthHeaders()
         };
         
-        const response = await fetch(`${BASE_PATH}/api/widgets?session_id=${sessionId}`, {
+        // Offer the speculative session so the server can claim or release it
+        let url = `${BASE_PATH}/api/widgets?session_id=${sessionId}`;
+        if (SPECULATIVE_SESSION_ID) {
+            url += `&speculative_session_id=${SPECULATIVE_SESSION_ID}`;
+        }
+
+        // Pages opened with ?broadcast=<name> join the shared named session
+        const pageParams = new URLSearchParams(window.location.search);
+        const broadcastName = pageParams.get('broadcast');
+        if (broadcastName) {
+            url = `${BASE_PATH}/api/widgets?broadcast=${encodeURIComponent(broadcastName)}`;
+            if (pageParams.get('key')) {
+                url += `&key=${encodeURIComponent(pageParams.get('key'))}`;
+            }
+        }
+        
+        const response = await fetchWithSpawnRetry(url, {
             headers: headers,
             credentials: 'include'
         });
@@ -398,7 +449,13 @@ async function fetchWidgetConfigs() {
         
         const data = await response.json();
 
-        sessionStorage.setItem(SESSION_STORAGE_KEY, data.session_id);
+        if (data.broadcast) {
+            broadcastWriteToken = data.write_token || null;
+            log(LOG_LEVELS.INFO, `Joined broadcast session ${data.broadcast.name}` +
+                (data.broadcast.writable ? '' : ' (read-only)'));
+        } else {
+            sessionStorage.setItem(SESSION_STORAGE_KEY, data.session_id);
+        }
         sessionId = data.session_id;
 
         wsManager = new WebSocketManager(sessionId);
@@ -588,6 +645,80 @@ window.numerousRefresh = {
     }
 };
 
+// Serialize outgoing messages, turning typed arrays decoded by the worker back into plain arrays
+function encodeMessage(message) {
+    return JSON.stringify(message, (key, value) => ArrayBuffer.isView(value) ? Array.from(value) : value);
+}
+
+// WebSocket-compatible facade over the decoding worker, so WebSocketManager
+// can use either transport without knowing which one it got
+class WorkerSocket {
+    constructor(url, options = {}) {
+        this.readyState = WebSocket.CONNECTING;
+        this.onopen = null;
+        this.onmessage = null;
+        this.onclose = null;
+        this.onerror = null;
+
+        this.worker = new Worker(`${BASE_PATH}/numerous-worker.js`);
+        this.worker.onmessage = (event) => this._handleWorkerEvent(event.data);
+        this.worker.onerror = (error) => {
+            log(LOG_LEVELS.ERROR, `[WorkerSocket] Worker error:`, error);
+            this.onerror && this.onerror(error);
+        };
+        this.worker.postMessage({
+            command: 'connect',
+            url: url,
+            typedArrays: !!options.typedArrays
+        });
+    }
+
+    _handleWorkerEvent(data) {
+        switch (data.event) {
+            case 'open':
+                this.readyState = WebSocket.OPEN;
+                this.onopen && this.onopen();
+                break;
+            case 'message':
+                this.onmessage && this.onmessage({ data: data.message, decoded: true });
+                break;
+            case 'decode-error':
+                log(LOG_LEVELS.ERROR, `[WorkerSocket] Failed to decode message:`, data.error, "Raw data:", data.raw);
+                break;
+            case 'error':
+                this.onerror && this.onerror(data);
+                break;
+            case 'close':
+                this.readyState = WebSocket.CLOSED;
+                this.worker.terminate();
+                this.onclose && this.onclose({ code: data.code, reason: data.reason });
+                break;
+        }
+    }
+
+    send(data) {
+        this.worker.postMessage({ command: 'send', data: data });
+    }
+
+    close() {
+        this.readyState = WebSocket.CLOSING;
+        this.worker.postMessage({ command: 'close' });
+    }
+}
+
+// Create the transport for a connection, falling back to a plain WebSocket
+// when workers are disabled or unavailable (e.g. blocked by a CSP)
+function createWebSocket(url) {
+    if (WS_WORKER_CONFIG && typeof Worker !== 'undefined') {
+        try {
+            return new WorkerSocket(url, WS_WORKER_CONFIG);
+        } catch (error) {
+            log(LOG_LEVELS.WARN, `[WebSocketManager] Could not start WebSocket worker, using main thread:`, error);
+        }
+    }
+    return new WebSocket(url);
+}
+
 // Add WebSocket connection management
 class WebSocketManager {
     constructor(sessionId) {
@@ -642,17 +773,25 @@ class WebSocketManager {
         let url = `${protocol}//${window.location.host}${BASE_PATH}/ws/${this.clientId}/${this.sessionId}`;
         
         // Add auth token if available (for authenticated WebSocket connections)
+        const query = new URLSearchParams();
         if (window.numerousAuth && window.numerousAuth.getWebSocketToken()) {
-            const token = window.numerousAuth.getWebSocketToken();
-            url += `?token=${encodeURIComponent(token)}`;
+            query.set('token', window.numerousAuth.getWebSocketToken());
+        }
+        // Writers of a broadcast session present the token granted on joining
+        if (broadcastWriteToken) {
+            query.set('write_token', broadcastWriteToken);
+        }
+        if (query.toString()) {
+            url += `?${query}`;
         }
         
-        // Create WebSocket
-        this.ws = new WebSocket(url);
+        // Create WebSocket (owned by a worker when enabled)
+        this.ws = createWebSocket(url);
         
         this.ws.onmessage = (event) => {
             try {
-                const message = JSON.parse(event.data);
+                // Frames decoded off the main thread by the worker arrive as objects
+                const message = event.decoded ? event.data : JSON.parse(event.data);
                 log(LOG_LEVELS.DEBUG, `[WebSocketManager ${this.clientId}] Received message:`, message);
                 
                 // Process message based on type
@@ -738,6 +877,15 @@ class WebSocketManager {
                             }
                             break;
 
+                        case MessageType.ACTION_CHUNK:
+                        case MessageType.ACTION_RESPONSE:
+                            // Streamed chunks and results of actions, for widgets listening on their model
+                            const actionModel = this.widgetModels.get(message.widget_id);
+                            if (actionModel) {
+                                actionModel.trigger(message.type, message);
+                            }
+                            break;
+
                         case 'init-config':
                             log(LOG_LEVELS.INFO, `[WebSocketManager ${this.clientId}] Received init config`);
                             // When we get a full config, we may need to re-register observers for all widgets
@@ -774,7 +922,7 @@ class WebSocketManager {
             setTimeout(() => {
                 // Request all widget states after connection is fully established
                 if (this.ws && this.ws.readyState === WebSocket.OPEN) {
-                    this.ws.send(JSON.stringify({
+                    this.ws.send(encodeMessage({
                         type: 'get-widget-states',
                         client_id: this.clientId
                     }));
@@ -822,7 +970,7 @@ class WebSocketManager {
         
         while (this.messageQueue.length > 0) {
             const message = this.messageQueue.shift();
-            this.ws.send(JSON.stringify(message));
+            this.ws.send(encodeMessage(message));
         }
     }
 
@@ -837,7 +985,7 @@ class WebSocketManager {
         
         if (this.ws && this.ws.readyState === WebSocket.OPEN) {
             log(LOG_LEVELS.DEBUG, `[WebSocketManager] Sending update:`, message);
-            this.ws.send(JSON.stringify(message));
+            this.ws.send(encodeMessage(message));
         } else {
             log(LOG_LEVELS.DEBUG, `[WebSocketManager] Queuing update message for later:`, message);
             this.messageQueue.push(message);
@@ -864,7 +1012,7 @@ class WebSocketManager {
         
         if (this.ws && this.ws.readyState === WebSocket.OPEN) {
             log(LOG_LEVELS.DEBUG, `[WebSocketManager] Sending batch update:`, message);
-            this.ws.send(JSON.stringify(message));
+            this.ws.send(encodeMessage(message));
         } else {
             log(LOG_LEVELS.DEBUG, `[WebSocketManager] Queuing batch update message for later:`, message);
             this.messageQueue.push(message);
@@ -901,7 +1049,7 @@ class WebSocketManager {
         
         if (this.ws && this.ws.readyState === WebSocket.OPEN) {
             log(LOG_LEVELS.DEBUG, `[WebSocketManager] Sending message:`, message);
-            this.ws.send(JSON.stringify(message));
+            this.ws.send(encodeMessage(message));
         } else {
             log(LOG_LEVELS.DEBUG, `[WebSocketManager] Queuing message for later:`, message);
             this.messageQueue.push(message);
@@ -0,0 +1,327 @@
+"""
+Serve an app from several worker processes behind a session-affinity router.
+
+The launcher starts one uvicorn process per worker, each listening on its own
+Unix socket, and a front router on the public host and port. The router reads
+the request line of every connection, finds the session id in it (the
+`session_id` query parameter or the last segment of `/ws/{client_id}/{session_id}`)
+and forwards the connection to the worker the id hashes to. Workers mint new
+session ids that hash to themselves, so every request of a session reaches the
+process hosting its app instance without any change to the app code.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs, urlsplit
+
+from .broadcast import broadcast_session_id
+from .datasets import DatasetRegistry
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+logger = logging.getLogger(__name__)
+
+# Environment variables telling a worker process its place among the workers
+WORKER_INDEX_ENV = "NUMEROUS_WORKER_INDEX"
+WORKER_COUNT_ENV = "NUMEROUS_WORKER_COUNT"
+
+# Largest request head (request line and headers) the router accepts
+MAX_HEAD_SIZE = 64 * 1024
+
+# Bytes copied per read when relaying between client and worker
+RELAY_CHUNK_SIZE = 64 * 1024
+
+# Seconds between checks that the worker processes are still running
+SUPERVISE_INTERVAL = 1.0
+
+_UNSET_SESSION_IDS = {"", "null", "undefined"}
+
+
+def rendezvous_worker(key: str, worker_count: int) -> int:
+    """
+    Return the index of the worker that `key` is assigned to.
+
+    Uses rendezvous (highest random weight) hashing: every worker gets a score
+    derived from the key and the highest score wins. Changing the number of
+    workers only moves the keys of the workers added or removed.
+    """
+
+    def score(worker: int) -> int:
+        digest = hashlib.blake2b(f"{worker}:{key}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    return max(range(worker_count), key=score)
+
+
+def worker_affinity() -> tuple[int, int] | None:
+    """Return (worker index, worker count) when running under the launcher."""
+    index = os.environ.get(WORKER_INDEX_ENV)
+    count = os.environ.get(WORKER_COUNT_ENV)
+    if index is None or count is None:
+        return None
+    return int(index), int(count)
+
+
+def session_id_from_target(target: str) -> str | None:
+    """Extract the session id from a request target, or None if it has none."""
+    parts = urlsplit(target)
+    query = parse_qs(parts.query)
+    for name in ("session_id", "speculative_session_id"):
+        for value in query.get(name, []):
+            if value not in _UNSET_SESSION_IDS:
+                return value
+    for value in query.get("broadcast", []):
+        return broadcast_session_id(value)
+    segments = parts.path.rstrip("/").split("/")
+    if len(segments) >= 3 and segments[-3] == "ws":  # noqa: PLR2004
+        session_id = segments[-1]
+        if session_id not in _UNSET_SESSION_IDS:
+            return session_id
+    return None
+
+
+class SessionRouter:
+    """
+    Front router forwarding connections to workers by the hash of their session.
+
+    Each plain HTTP request gets `Connection: close`, so the next request of a
+    keep-alive client is routed on its own. WebSocket upgrades stay connected
+    to the worker of their session for their lifetime. Requests without a
+    session id (pages, static files, first widget requests) go round-robin.
+    """
+
+    def __init__(self, worker_sockets: Sequence[str | Path]) -> None:
+        """Initialize the router for workers listening on `worker_sockets`."""
+        self.worker_sockets = [str(path) for path in worker_sockets]
+        self._round_robin = itertools.cycle(range(len(self.worker_sockets)))
+
+    def route(self, target: str) -> int:
+        """Return the index of the worker that should serve `target`."""
+        session_id = session_id_from_target(target)
+        if session_id is None:
+            return next(self._round_robin)
+        return rendezvous_worker(session_id, len(self.worker_sockets))
+
+    async def serve(self, host: str, port: int) -> None:
+        """Accept connections on `host`:`port` until cancelled."""
+        server = await asyncio.start_server(
+            self.handle, host, port, limit=MAX_HEAD_SIZE
+        )
+        logger.info(
+            f"Routing http://{host}:{port} to {len(self.worker_sockets)} workers"
+        )
+        async with server:
+            await server.serve_forever()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Forward one client connection to the worker of its session."""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+
+        request_line, *headers = head[:-4].split(b"\r\n")
+        try:
+            target = request_line.split(b" ")[1].decode("latin-1")
+        except IndexError:
+            await self._respond(writer, b"400 Bad Request")
+            return
+
+        # Workers see the router as their peer; pass on the client's address
+        # in place of any the client claims itself
+        headers = [
+            line for line in headers if not line.lower().startswith(b"x-forwarded-for:")
+        ]
+        peer = writer.get_extra_info("peername")
+        if isinstance(peer, tuple):
+            headers.append(b"X-Forwarded-For: " + str(peer[0]).encode("latin-1"))
+
+        if not any(line.lower().startswith(b"upgrade:") for line in headers):
+            headers = [
+                line for line in headers if not line.lower().startswith(b"connection:")
+            ]
+            headers.append(b"Connection: close")
+
+        socket_path = self.worker_sockets[self.route(target)]
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_unix_connection(
+                socket_path
+            )
+        except OSError:
+            logger.warning(f"Worker at {socket_path} is not reachable")
+            await self._respond(writer, b"502 Bad Gateway")
+            return
+
+        upstream_writer.write(b"\r\n".join([request_line, *headers]) + b"\r\n\r\n")
+        await asyncio.gather(
+            self._pipe(reader, upstream_writer),
+            self._pipe(upstream_reader, writer),
+            return_exceptions=True,
+        )
+
+    @staticmethod
+    async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while chunk := await reader.read(RELAY_CHUNK_SIZE):
+                writer.write(chunk)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: bytes) -> None:
+        writer.write(
+            b"HTTP/1.1 "
+            + status
+            + b"\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+        )
+        with contextlib.suppress(ConnectionError):
+            await writer.drain()
+        writer.close()
+
+
+def start_worker(
+    app: str, index: int, worker_count: int, socket_path: Path
+) -> subprocess.Popen[bytes]:
+    """Start a uvicorn worker process serving `app` on `socket_path`."""
+    socket_path.unlink(missing_ok=True)
+    env = os.environ.copy()
+    env[WORKER_INDEX_ENV] = str(index)
+    env[WORKER_COUNT_ENV] = str(worker_count)
+    return subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            app,
+            "--uds",
+            str(socket_path),
+            # Only the router connects to the socket, and it sets the header
+            "--proxy-headers",
+            "--forwarded-allow-ips",
+            "*",
+        ],
+        env=env,
+    )
+
+
+async def _supervise(
+    app: str, processes: list[subprocess.Popen[bytes]], sockets: list[Path]
+) -> None:
+    """Restart worker processes that exit."""
+    while True:
+        await asyncio.sleep(SUPERVISE_INTERVAL)
+        for index, process in enumerate(processes):
+            if process.poll() is not None:
+                logger.warning(
+                    f"Worker {index} exited with code {process.returncode}, "
+                    "restarting"
+                )
+                processes[index] = start_worker(
+                    app, index, len(processes), sockets[index]
+                )
+
+
+async def _serve(
+    app: str,
+    processes: list[subprocess.Popen[bytes]],
+    sockets: list[Path],
+    host: str,
+    port: int,
+) -> None:
+    router = SessionRouter(sockets)
+    await asyncio.gather(router.serve(host, port), _supervise(app, processes, sockets))
+
+
+def run(
+    app: str = "app:app",
+    workers: int | None = None,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    socket_dir: str | Path | None = None,
+) -> None:
+    """
+    Serve `app` from `workers` processes behind a session-affinity router.
+
+    Args:
+        app: Import string of the ASGI app, as given to uvicorn
+        workers: Number of worker processes (the CPU count when None)
+        host: Host the router listens on
+        port: Port the router listens on
+        socket_dir: Directory for the worker sockets (a temporary directory
+            when None)
+
+    """
+    workers = workers or os.cpu_count() or 1
+    with contextlib.ExitStack() as stack:
+        if socket_dir is None:
+            socket_dir = stack.enter_context(
+                tempfile.TemporaryDirectory(prefix="numerous-")
+            )
+        # Workers share one dataset directory, removed when the launcher exits
+        dataset_registry = DatasetRegistry()
+        _ = dataset_registry.directory
+        stack.callback(dataset_registry.close)
+        sockets = [Path(socket_dir) / f"worker-{i}.sock" for i in range(workers)]
+        processes = [
+            start_worker(app, i, workers, path) for i, path in enumerate(sockets)
+        ]
+        try:
+            asyncio.run(_serve(app, processes, sockets, host, port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve an app from several worker processes"
+    )
+    parser.add_argument(
+        "app", nargs="?", default="app:app", help="ASGI app import string"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help="Host to run the server on"
+    )
+    parser.add_argument(
+        "--port", type=int, default=8000, help="Port to run the server on"
+    )
+    parser.add_argument(
+        "--socket-dir", type=str, default=None, help="Directory for worker sockets"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run(args.app, args.workers, args.host, args.port, args.socket_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,8 @@ class MessageType(str, Enum):
     GET_WIDGET_STATES = "get-widget-states"
     ACTION_REQUEST = "action-request"
     ACTION_RESPONSE = "action-response"
+    ACTION_CANCEL = "action-cancel"
+    ACTION_CHUNK = "action-chunk"
     ERROR = "error"
     INIT_CONFIG = "init-config"
     SESSION_ERROR = "session-error"
@@ -66,6 +68,7 @@ class InitConfigMessage(BaseModel):
     widgets: list[str]
     widget_configs: dict[str, Any]
     template: str
+    request_id: str | None = None
 
 
 class ErrorMessage(BaseModel):
@@ -73,10 +76,12 @@ class ErrorMessage(BaseModel):
     error_type: str
     message: str
     traceback: str
+    request_id: str | None = None
 
 
 class GetStateMessage(BaseModel):
     type: MessageType = MessageType.GET_STATE
+    request_id: str | None = None
 
 
 class GetWidgetStatesMessage(BaseModel):
@@ -210,6 +215,24 @@ class ActionResponseMessage(BaseModel):
     request_id: str
 
 
+class ActionChunkMessage(BaseModel):
+    """Message carrying one chunk yielded by a streaming action."""
+
+    type: str = MessageType.ACTION_CHUNK.value
+    widget_id: str
+    action_name: str
+    chunk: Any | None = None
+    client_id: str | None = None
+    request_id: str
+
+
+class ActionCancelMessage(BaseModel):
+    """Message asking the app to cancel a running action."""
+
+    type: str = MessageType.ACTION_CANCEL.value
+    request_id: str
+
+
 class SessionErrorMessage(BaseModel):
     """Message indicating a session error."""
 
@@ -220,6 +243,7 @@ class SessionErrorMessage(BaseModel):
 WebSocketMessage = (
     WidgetUpdateMessage
     | ActionResponseMessage
+    | ActionChunkMessage
     | InitConfigMessage
     | ErrorMessage
     | WebSocketBatchUpdateMessage
@@ -0,0 +1,603 @@
+"""
+Run app sessions in worker daemons on other hosts.
+
+A worker daemon listens on a TCP address or Unix socket and runs one app
+instance per incoming connection, relaying messages between the connection and
+the instance. The web server starts sessions with a `RemoteExecutionManager`,
+which asks a `RemoteWorkerPool` for the least-loaded worker. Worker hosts need
+the app code at the same paths as the web server. `LocalWorkerPool` runs the
+workers as host processes on the web server's own machine.
+
+Connections use `multiprocessing.connection`, so both ends authenticate with a
+shared key before any message is exchanged. Messages cross the connection
+with their priority lane, so a lane chosen by the sender is kept on the worker.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import logging
+import multiprocessing
+import os
+import secrets
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (
+    Client,
+    Connection,
+    Listener,
+    answer_challenge,
+    deliver_challenge,
+)
+from pathlib import Path
+from queue import Empty, Queue
+from typing import TYPE_CHECKING, Any
+
+from .communication import (
+    CommunicationManager,
+    ExecutionManager,
+    MultiProcessExecutionManager,
+    QueueCommunicationManager,
+    ThreadedExecutionManager,
+)
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    WorkerAddress = tuple[str, int] | str
+    AppTarget = Callable[[str, str, str, str, str, CommunicationManager], None]
+
+
+logger = logging.getLogger(__name__)
+
+# Environment variable holding the key workers and web servers authenticate with
+AUTHKEY_ENV = "NUMEROUS_WORKER_AUTHKEY"
+
+# Seconds to wait for a worker to answer a load query or a start request
+WORKER_REPLY_TIMEOUT = 5.0
+
+# Seconds to wait for a worker to accept a connection and authenticate
+CONNECT_TIMEOUT = 5.0
+
+# Seconds between checks of the stop event while waiting for messages
+POLL_INTERVAL = 0.1
+
+# Seconds a stopped app instance may take to exit before it is terminated
+STOP_TIMEOUT = 5.0
+
+# Seconds a local host process may take to start listening
+HOST_START_TIMEOUT = 30.0
+
+
+class WorkerDaemon:
+    """
+    Serve app instances to web servers over the network.
+
+    Each connection first sends a request: `{"op": "load"}` is answered with
+    the number of running sessions, `{"op": "start", ...}` starts an app
+    instance and turns the connection into its message channel. Sending None
+    or closing the connection stops the instance.
+    """
+
+    def __init__(
+        self,
+        address: WorkerAddress,
+        authkey: bytes,
+        max_sessions: int | None = None,
+        allow_threaded: bool = False,
+        target: AppTarget | None = None,
+    ) -> None:
+        """
+        Initialize the daemon.
+
+        Args:
+            address: (host, port) or Unix socket path to listen on
+            authkey: Key clients must authenticate with
+            max_sessions: Sessions above this count are refused (no limit when
+                None)
+            allow_threaded: Run app instances in threads instead of processes
+            target: Function running an app instance (the standard app runner
+                when None)
+
+        """
+        self.address = address
+        self.authkey = authkey
+        self.max_sessions = max_sessions
+        self.allow_threaded = allow_threaded
+        self.target = target
+        self._listener: Listener | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self._started = 0
+
+    def load(self) -> dict[str, Any]:
+        """Return the number of running sessions and the session limit."""
+        with self._lock:
+            return {
+                "sessions": self._sessions,
+                "max_sessions": self.max_sessions,
+                "started": self._started,
+            }
+
+    def serve_forever(self) -> None:
+        """Accept connections until the daemon is closed."""
+        self._listen()
+        self._accept_connections()
+
+    def start(self) -> None:
+        """Accept connections from a background thread."""
+        self._listen()
+        self._thread = threading.Thread(target=self._accept_connections, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop accepting connections; running sessions end with their clients."""
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        if self._thread is not None:
+            # Wake the accepting thread so it sees that the daemon is closed
+            with contextlib.suppress(OSError, AuthenticationError):
+                Client(self.address, authkey=self.authkey).close()
+            self._thread.join()
+        listener.close()
+
+    def _listen(self) -> None:
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self.address = self._listener.address
+        logger.info(f"Worker listening on {self.address}")
+
+    def _accept_connections(self) -> None:
+        listener = self._listener
+        while listener is not None and self._listener is not None:
+            try:
+                connection = listener.accept()
+            except (OSError, AuthenticationError):
+                if self._listener is None:
+                    return
+                logger.exception("Failed to accept worker connection")
+                continue
+            if self._listener is None:
+                connection.close()
+                return
+            threading.Thread(
+                target=self._serve_connection, args=(connection,), daemon=True
+            ).start()
+
+    def _serve_connection(self, connection: Connection) -> None:
+        try:
+            request = connection.recv()
+            if request.get("op") == "load":
+                connection.send(self.load())
+            elif request.get("op") == "start":
+                self._run_session(connection, request)
+        except (EOFError, OSError):
+            pass
+        except Exception:
+            logger.exception("Error serving worker connection")
+        finally:
+            connection.close()
+
+    def _run_session(self, connection: Connection, request: dict[str, Any]) -> None:
+        with self._lock:
+            if self.max_sessions is not None and self._sessions >= self.max_sessions:
+                connection.send({"ok": False, "error": "full"})
+                return
+            self._sessions += 1
+            self._started += 1
+        try:
+            execution_manager = self._start_app(request)
+            connection.send({"ok": True})
+            self._relay(connection, execution_manager)
+        finally:
+            with self._lock:
+                self._sessions -= 1
+
+    def _start_app(
+        self, request: dict[str, Any]
+    ) -> MultiProcessExecutionManager | ThreadedExecutionManager:
+        from .server import _app_process
+
+        target: AppTarget = self.target or _app_process  # type: ignore[assignment]
+        execution_manager: MultiProcessExecutionManager | ThreadedExecutionManager
+        if self.allow_threaded:
+            execution_manager = ThreadedExecutionManager(target, request["session_id"])
+        else:
+            execution_manager = MultiProcessExecutionManager(
+                target, request["session_id"]
+            )
+        execution_manager.start(
+            request["base_dir"],
+            request["module_path"],
+            request["template"],
+            request["app_id"],
+        )
+        return execution_manager
+
+    @staticmethod
+    def _relay(
+        connection: Connection,
+        execution_manager: MultiProcessExecutionManager | ThreadedExecutionManager,
+    ) -> None:
+        """Relay messages until the client stops the session or disconnects."""
+        communication_manager = execution_manager.communication_manager
+        stopped = threading.Event()
+
+        def forward_from_app() -> None:
+            while not stopped.is_set():
+                try:
+                    item = communication_manager.from_app_instance.receive_with_lane(
+                        timeout=POLL_INTERVAL
+                    )
+                except Empty:
+                    continue
+                try:
+                    connection.send(item)
+                except OSError:
+                    return
+
+        forwarder = threading.Thread(target=forward_from_app, daemon=True)
+        forwarder.start()
+        try:
+            while (item := connection.recv()) is not None:
+                lane, message = item
+                communication_manager.to_app_instance.send(message, lane=lane)
+        except (EOFError, OSError):
+            pass
+        finally:
+            execution_manager.request_stop()
+            stopped.set()
+            forwarder.join()
+            if isinstance(execution_manager, MultiProcessExecutionManager):
+                execution_manager.process.join(STOP_TIMEOUT)
+                if execution_manager.process.is_alive():
+                    execution_manager.stop()
+            else:
+                execution_manager.thread.join(STOP_TIMEOUT)
+
+
+class RemoteWorkerPool:
+    """Worker daemons a web server starts sessions on, least loaded first."""
+
+    def __init__(
+        self,
+        addresses: Sequence[WorkerAddress],
+        authkey: bytes,
+        reply_timeout: float = WORKER_REPLY_TIMEOUT,
+    ) -> None:
+        """Initialize the pool with the addresses of its workers."""
+        self.addresses = list(addresses)
+        self.authkey = authkey
+        self.reply_timeout = reply_timeout
+
+    def start(self) -> None:
+        """Prepare the pool before the first session; workers run on their own."""
+
+    def close(self) -> None:
+        """Release resources held by the pool."""
+
+    def load(self) -> list[tuple[WorkerAddress, dict[str, Any] | None]]:
+        """Return the load of every worker, None for unreachable workers."""
+        if not self.addresses:
+            return []
+        # Ask all workers at once, so slow ones only cost one timeout
+        with ThreadPoolExecutor(max_workers=len(self.addresses)) as executor:
+            loads = list(executor.map(self._query_load, self.addresses))
+        return list(zip(self.addresses, loads, strict=True))
+
+    def connect(self, request: dict[str, Any]) -> Connection:
+        """
+        Start a session on the least-loaded worker that accepts it.
+
+        Returns:
+            The connection to the worker, which carries the session's messages
+
+        Raises:
+            RuntimeError: If no worker is reachable or has room for the session
+
+        """
+        candidates = [
+            (self._utilization(load), index, address)
+            for index, (address, load) in enumerate(self.load())
+            if load is not None
+        ]
+        for _, _, address in sorted(candidates):
+            try:
+                connection = _connect(address, self.authkey)
+            except (OSError, AuthenticationError):
+                continue
+            try:
+                connection.send(request)
+                if connection.poll(self.reply_timeout):
+                    reply = connection.recv()
+                    if reply.get("ok"):
+                        return connection
+                    logger.debug(f"Worker {address} refused session: {reply}")
+            except (EOFError, OSError):
+                pass
+            connection.close()
+        raise RuntimeError("No remote worker is available to start a session")
+
+    def _query_load(self, address: WorkerAddress) -> dict[str, Any] | None:
+        try:
+            with _connect(address, self.authkey) as connection:
+                connection.send({"op": "load"})
+                if connection.poll(self.reply_timeout):
+                    load: dict[str, Any] = connection.recv()
+                    return load
+        except (EOFError, OSError, AuthenticationError):
+            logger.warning(f"Worker {address} is not reachable")
+        return None
+
+    @staticmethod
+    def _utilization(load: dict[str, Any]) -> float:
+        sessions = float(load["sessions"])
+        if load["max_sessions"]:
+            return sessions / float(load["max_sessions"])
+        return sessions
+
+
+def _connect(
+    address: WorkerAddress, authkey: bytes, timeout: float = CONNECT_TIMEOUT
+) -> Connection:
+    """
+    Open an authenticated connection to a worker, like `Client` but bounded.
+
+    Raises:
+        OSError: If the worker does not accept and authenticate in time
+
+    """
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    sock = socket.socket(family)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        # The handshake reads the blocking descriptor, so bound it in the kernel
+        sock.settimeout(None)
+        _set_io_timeout(sock, timeout)
+        connection = Connection(sock.detach())
+    except BaseException:
+        sock.close()
+        raise
+    try:
+        answer_challenge(connection, authkey)
+        deliver_challenge(connection, authkey)
+        with socket.socket(fileno=connection.fileno()) as view:
+            _set_io_timeout(view, 0)
+            view.detach()
+    except BaseException:
+        connection.close()
+        raise
+    return connection
+
+
+def _set_io_timeout(sock: socket.socket, seconds: float) -> None:
+    """Make blocking reads and writes on `sock` fail after `seconds` (0: never)."""
+    whole = int(seconds)
+    timeval = struct.pack("ll", whole, int((seconds - whole) * 1_000_000))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+
+
+def _serve_host(address: str, authkey: bytes, target: AppTarget | None) -> None:
+    """Run a worker daemon in a host process started by `LocalWorkerPool`."""
+    WorkerDaemon(address, authkey, allow_threaded=True, target=target).serve_forever()
+
+
+class LocalWorkerPool(RemoteWorkerPool):
+    """
+    Host processes on this machine that each run many sessions in threads.
+
+    Sessions in one host process share its interpreter and the app's imports,
+    so a session costs a thread instead of a process, while the host processes
+    run in parallel. Host processes are started by `start` (or with the first
+    session) and restarted when they exit.
+    """
+
+    def __init__(
+        self, processes: int | None = None, target: AppTarget | None = None
+    ) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            processes: Number of host processes (the CPU count when None)
+            target: Function running an app instance (the standard app runner
+                when None)
+
+        """
+        super().__init__([], secrets.token_bytes(32))
+        self.processes = processes or os.cpu_count() or 1
+        self.target = target
+        self._hosts: list[multiprocessing.Process] = []
+        self._socket_dir: tempfile.TemporaryDirectory[str] | None = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the host processes, restarting any that have exited."""
+        with self._start_lock:
+            if self._socket_dir is None:
+                self._socket_dir = tempfile.TemporaryDirectory(prefix="numerous-")
+                self.addresses = [
+                    str(Path(self._socket_dir.name) / f"host-{index}.sock")
+                    for index in range(self.processes)
+                ]
+                self._hosts = [self._start_host(str(a)) for a in self.addresses]
+            else:
+                for index, host in enumerate(self._hosts):
+                    if not host.is_alive():
+                        logger.warning(f"Session host {index} exited, restarting")
+                        self._hosts[index] = self._start_host(
+                            str(self.addresses[index])
+                        )
+            self._wait_until_listening()
+
+    def close(self) -> None:
+        """Stop the host processes and the sessions running in them."""
+        with self._start_lock:
+            for host in self._hosts:
+                host.terminate()
+            for host in self._hosts:
+                host.join()
+            self._hosts = []
+            if self._socket_dir is not None:
+                self._socket_dir.cleanup()
+                self._socket_dir = None
+            self.addresses = []
+
+    def connect(self, request: dict[str, Any]) -> Connection:
+        """Start a session on the least-loaded host process."""
+        self.start()
+        return super().connect(request)
+
+    def _start_host(self, address: str) -> multiprocessing.Process:
+        Path(address).unlink(missing_ok=True)
+        host = multiprocessing.Process(
+            target=_serve_host, args=(address, self.authkey, self.target), daemon=True
+        )
+        host.start()
+        return host
+
+    def _wait_until_listening(self) -> None:
+        deadline = time.monotonic() + HOST_START_TIMEOUT
+        for address, host in zip(self.addresses, self._hosts, strict=True):
+            while not Path(str(address)).exists():
+                if not host.is_alive() or time.monotonic() > deadline:
+                    raise RuntimeError(f"Session host at {address} failed to start")
+                time.sleep(0.01)
+
+
+class RemoteExecutionManager(ExecutionManager):
+    """
+    Run a session's app instance on a worker daemon.
+
+    Messages pass through local queues, so the session reads and writes them
+    the same way as for a local app instance; two threads move them over the
+    connection to the worker.
+    """
+
+    def __init__(self, pool: RemoteWorkerPool, session_id: str) -> None:
+        """Initialize the manager to start the session on a worker of `pool`."""
+        self.communication_manager: CommunicationManager = QueueCommunicationManager(
+            stop_event=threading.Event(),
+            queue_to_app=Queue(),
+            queue_from_app=Queue(),
+        )
+        self.pool = pool
+        self.session_id = session_id
+        self._connection: Connection | None = None
+        self._receiver: threading.Thread | None = None
+
+    def is_connected(self) -> bool:
+        """Check if the connection to the worker is open."""
+        return self._receiver is not None and self._receiver.is_alive()
+
+    def start(
+        self,
+        base_dir: str,
+        module_path: str,
+        template: str,
+        app_id: str = "",
+    ) -> None:
+        """Start the app instance on the least-loaded worker."""
+        if self._connection is not None:
+            raise RuntimeError("Remote session already started")
+        self._connection = self.pool.connect(
+            {
+                "op": "start",
+                "session_id": self.session_id,
+                "base_dir": base_dir,
+                "module_path": module_path,
+                "template": template,
+                "app_id": app_id,
+            }
+        )
+        self._receiver = threading.Thread(target=self._receive, daemon=True)
+        self._receiver.start()
+        threading.Thread(target=self._send, daemon=True).start()
+
+    def _send(self) -> None:
+        """Forward messages to the worker until a stop is requested."""
+        if self._connection is None:
+            return
+        communication_manager = self.communication_manager
+        try:
+            while not communication_manager.stop_event.is_set():
+                try:
+                    item = communication_manager.to_app_instance.receive_with_lane(
+                        timeout=POLL_INTERVAL
+                    )
+                except Empty:
+                    continue
+                self._connection.send(item)
+            self._connection.send(None)
+        except OSError:
+            if not communication_manager.stop_event.is_set():
+                logger.warning(
+                    f"Lost connection to worker of session {self.session_id}"
+                )
+        finally:
+            self._connection.close()
+
+    def _receive(self) -> None:
+        """Queue messages from the worker until the connection closes."""
+        if self._connection is None:
+            return
+        with contextlib.suppress(EOFError, OSError):
+            while True:
+                lane, message = self._connection.recv()
+                self.communication_manager.from_app_instance.send(message, lane=lane)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run app sessions for remote web servers"
+    )
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help="Host to listen on"
+    )
+    parser.add_argument("--port", type=int, default=9100, help="Port to listen on")
+    parser.add_argument(
+        "--socket", type=str, default=None, help="Listen on a Unix socket instead"
+    )
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=None,
+        help="Refuse sessions above this count",
+    )
+    parser.add_argument(
+        "--threaded",
+        action="store_true",
+        help="Run app instances in threads instead of processes",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        logging.error(f"Set {AUTHKEY_ENV} to the key shared with the web servers")
+        sys.exit(1)
+
+    address: WorkerAddress = args.socket or (args.host, args.port)
+    daemon = WorkerDaemon(
+        address,
+        authkey.encode(),
+        max_sessions=args.max_sessions,
+        allow_threaded=args.threaded,
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
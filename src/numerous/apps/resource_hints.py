@@ -0,0 +1,111 @@
+"""Resource hints and 103 Early Hints for the assets a page is known to need."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger(__name__)
+
+EARLY_HINT_EXTENSION = "http.response.early_hint"
+
+
+@dataclass(frozen=True)
+class ResourceHint:
+    """A single `preload` or `modulepreload` hint for an asset URL."""
+
+    url: str
+    rel: str = "preload"
+    as_: str | None = None
+
+    def to_link_header(self) -> str:
+        """Format the hint as a value for an HTTP `Link` header."""
+        value = f"<{self.url}>; rel={self.rel}"
+        if self.as_:
+            value += f"; as={self.as_}"
+        return value
+
+    def to_html(self) -> str:
+        """Format the hint as an HTML `<link>` tag."""
+        as_attr = f' as="{self.as_}"' if self.as_ else ""
+        return f'<link rel="{self.rel}" href="{self.url}"{as_attr}>'
+
+
+def format_link_header(hints: Sequence[ResourceHint]) -> str:
+    """Join hints into a single `Link` header value."""
+    return ", ".join(hint.to_link_header() for hint in hints)
+
+
+def is_module_url(source: str) -> bool:
+    """Check whether widget ESM is a URL rather than inline source (as numerous.js)."""
+    return source.startswith(("http", "./", "/"))
+
+
+def widget_asset_hash(source: str) -> str:
+    """Return the content hash used to address an inline widget module."""
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def collect_widget_assets(widgets: dict[str, Any]) -> dict[str, str]:
+    """Map content hashes to the inline ESM source of the given widgets."""
+    assets: dict[str, str] = {}
+    for widget in widgets.values():
+        source = getattr(widget, "_esm", "")
+        if isinstance(source, str) and source and not is_module_url(source):
+            assets[widget_asset_hash(source)] = source
+    return assets
+
+
+class EarlyHintsMiddleware:
+    """
+    Send a 103 Early Hints response before a page is rendered.
+
+    Only used when the ASGI server advertises the `http.response.early_hint`
+    extension; otherwise requests pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        hints: Callable[[], Sequence[ResourceHint]],
+        paths: Sequence[str] = ("/",),
+    ) -> None:
+        self.app = app
+        self.hints = hints
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI request."""
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "GET"
+            and EARLY_HINT_EXTENSION in scope.get("extensions", {})
+            and self._app_path(scope) in self.paths
+        ):
+            links = [hint.to_link_header().encode("latin-1") for hint in self.hints()]
+            if links:
+                message: Message = {"type": EARLY_HINT_EXTENSION, "links": links}
+                try:
+                    await send(message)
+                except Exception:  # noqa: BLE001
+                    logger.debug("ASGI server rejected early hints", exc_info=True)
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _app_path(scope: Scope) -> str:
+        """Return the request path relative to where the app is mounted."""
+        path: str = scope["path"]
+        root_path: str = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path) :]
+        return path or "/"
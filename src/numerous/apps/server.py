@@ -18,6 +18,7 @@ from typing_extensions import TypedDict
 from .communication import MultiProcessExecutionManager, ThreadedExecutionManager
 from .communication import QueueCommunicationChannel as CommunicationChannel
 from .communication import QueueCommunicationManager as CommunicationManager
+from .compute import current_session
 from .execution import _execute
 from .models import (
     ErrorMessage,
@@ -83,6 +84,9 @@ def _app_process(  # noqa: C901,PLR0912,PLR0915
             "communication_manager must be an instance of CommunicationManager"
         )
 
+    # Jobs the app submits to the compute service are queued as this session's
+    current_session.set(session_id)
+
     try:
         logger.debug(f"[Backend] Running app from {module_string}")
 
@@ -159,13 +163,7 @@ def _app_process(  # noqa: C901,PLR0912,PLR0915
                 )
                 raise RuntimeError(msg)  # noqa: TRY301
 
-        # Ensure widgets have required attributes
-        for widget in _app_widgets.values():
-            if not hasattr(widget, "_css"):
-                widget.__dict__["_css"] = ""
-            if not hasattr(widget, "_esm"):
-                widget.__dict__["_esm"] = ""
-
+        _ensure_widget_sources(_app_widgets)
         _check_app_widgets(_app_widgets)
         logger.debug(f"[Backend] Found {len(_app_widgets)} widgets")
 
@@ -200,6 +198,34 @@ def _app_process(  # noqa: C901,PLR0912,PLR0915
         logger.debug("[Backend] Queue cleanup completed")
 
 
+def _shared_app_process(
+    widgets: dict[str, AnyWidget],
+    session_id: str,
+    cwd: str,  # noqa: ARG001
+    module_string: str,  # noqa: ARG001
+    template: str,
+    app_id: str | None = "",  # noqa: ARG001
+    communication_manager: CommunicationManager | None = None,
+) -> None:
+    """Run the app-global widgets that all sessions share."""
+    if communication_manager is None:
+        raise TypeError("communication_manager is required")
+
+    try:
+        _ensure_widget_sources(widgets)
+        _execute(communication_manager, widgets, template)
+    except Exception as e:
+        logger.exception(f"Error running shared widgets for {session_id}")
+        communication_manager.from_app_instance.send(
+            ErrorMessage(
+                type="error",
+                error_type=type(e).__name__,
+                message=str(e),
+                traceback=str(traceback.format_exc()),
+            ).model_dump()
+        )
+
+
 def _load_main_js() -> str:
     """Load the main.js file from the package."""
     main_js_path = Path(__file__).parent / "js" / "numerous.js"
@@ -209,6 +235,15 @@ def _load_main_js() -> str:
     return main_js_path.read_text()
 
 
+def _load_worker_js() -> str:
+    """Load the WebSocket decoding worker script from the package."""
+    worker_js_path = Path(__file__).parent / "js" / "numerous-worker.js"
+    if not worker_js_path.exists():
+        logger.warning(f"numerous-worker.js not found at {worker_js_path}")
+        return ""
+    return worker_js_path.read_text()
+
+
 def _create_handler(
     wid: str, trait: str, send_channel: CommunicationChannel
 ) -> Callable[[Any], None]:
@@ -231,6 +266,15 @@ def _create_handler(
     return sync_handler
 
 
+def _ensure_widget_sources(widgets: dict[str, AnyWidget]) -> None:
+    """Ensure widgets have the required `_css` and `_esm` attributes."""
+    for widget in widgets.values():
+        if not hasattr(widget, "_css"):
+            widget.__dict__["_css"] = ""
+        if not hasattr(widget, "_esm"):
+            widget.__dict__["_esm"] = ""
+
+
 def _check_app_widgets(app_widgets: dict[str, AnyWidget] | None) -> None:
     if app_widgets is None:
         raise ValueError("No NumerousApp instance found in the module")
@@ -3,20 +3,29 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
 import logging
 import time
 import uuid
 from collections import defaultdict
+from contextlib import suppress
 from dataclasses import dataclass, field
+from functools import partial
 from typing import TYPE_CHECKING, Any, NewType, Protocol
 
 
 if TYPE_CHECKING:
-    from collections.abc import Coroutine, Sequence
+    from collections.abc import Callable, Coroutine, Sequence
 
+    from starlette.websockets import WebSocket
+
+    from .backplane import SessionDirectory
     from .communication import ExecutionManager
+    from .session_store import SessionStateStore
 
-from .models import MessageType, WidgetUpdateMessage
+from .communication import Lane
+from .models import MessageType, WidgetUpdateMessage, WidgetUpdateRequestMessage
+from .session_store import STATE_FLUSH_INTERVAL, SessionStateWriter
 
 
 logger = logging.getLogger(__name__)
@@ -28,6 +37,9 @@ WidgetId = NewType("WidgetId", str)
 PropertyName = NewType("PropertyName", str)
 CallbackHandle = NewType("CallbackHandle", str)
 
+# Seconds a respawned app instance may take to report that it is ready
+REHYDRATE_TIMEOUT = 30.0
+
 
 class MessageCallback(Protocol):
     """Protocol for message callback functions."""
@@ -67,6 +79,27 @@ class CallbackRegistration:
     message_types: set[MessageType] | None
     filter_func: MessageFilter | None = None
 
+    def index_keys(self) -> list[str | None]:
+        """Return the message type values this callback is indexed under."""
+        if self.message_types is None:
+            return [None]
+        return [message_type.value for message_type in self.message_types]
+
+
+@dataclass
+class PendingRequest:
+    """A request awaiting its response from the app instance."""
+
+    future: asyncio.Future[dict[str, Any]]
+    message_types: set[str] | None
+    deadline: asyncio.TimerHandle | None = None
+
+    def index_keys(self) -> list[str | None]:
+        """Return the message type values this request is indexed under."""
+        if self.message_types is None:
+            return [None]
+        return list(self.message_types)
+
 
 class SessionManager:
     """Manages communication and state for a single session."""
@@ -75,11 +108,39 @@ class SessionManager:
         self,
         session_id: SessionId,
         execution_manager: ExecutionManager,
+        respawn: Callable[[], ExecutionManager] | None = None,
+        state_writer: SessionStateWriter | None = None,
     ) -> None:
-        """Initialize the session manager."""
+        """
+        Initialize the session manager.
+
+        Args:
+            session_id: Id of the session
+            execution_manager: Running app instance behind the session
+            respawn: Starts a new app instance for the session; sessions without
+                it cannot hibernate
+            state_writer: Persists widget state changes of the session
+
+        """
         self.session_id = session_id
         self._execution_manager = execution_manager
+        self._respawn = respawn
+        self._state_writer = state_writer
+        self._hibernated = False
+        self._wake_lock = asyncio.Lock()
         self._callbacks: dict[CallbackHandle, CallbackRegistration] = {}
+        # Callbacks by message type value; None holds callbacks for every type
+        self._callback_index: defaultdict[
+            str | None, dict[CallbackHandle, CallbackRegistration]
+        ] = defaultdict(dict)
+        # In-flight requests by request_id, and their ids by expected message type
+        # (insertion ordered) for replies that carry no request_id
+        self._pending_requests: dict[str, PendingRequest] = {}
+        self._pending_index: defaultdict[str | None, dict[str, None]] = defaultdict(
+            dict
+        )
+        # Timers that deregister callbacks sent with a timeout
+        self._callback_deadlines: dict[CallbackHandle, asyncio.TimerHandle] = {}
         self._widget_states: defaultdict[WidgetId, WidgetState] = defaultdict(
             lambda: WidgetState(properties={})
         )
@@ -104,7 +165,112 @@ class SessionManager:
     def is_active(self) -> bool:
         """Check if the session is still active."""
         # Consider a session active if it has running processes or active connections
-        return self._running or self.has_active_connections()
+        return self._running or self._hibernated or self.has_active_connections()
+
+    @property
+    def hibernated(self) -> bool:
+        """Whether the app instance is stopped until the session is used again."""
+        return self._hibernated
+
+    def can_hibernate(self) -> bool:
+        """Check whether the session is running, respawnable and not mid-request."""
+        return (
+            self._respawn is not None
+            and self._running
+            and not self._hibernated
+            and not self._pending_requests
+            and not self._wake_lock.locked()
+        )
+
+    async def hibernate(self) -> bool:
+        """
+        Stop the app instance, keeping the widget state and client callbacks.
+
+        The next message sent to the session, or a call to `wake`, starts a new
+        app instance and replays the widget state into it.
+
+        Returns:
+            True if the session was hibernated
+
+        """
+        if not self.can_hibernate():
+            return False
+        self._hibernated = True
+        await self._stop_processing()
+        self._execution_manager.request_stop()
+        logger.info(f"Hibernated session {self.session_id}")
+        return True
+
+    async def wake(self, timeout_seconds: float = REHYDRATE_TIMEOUT) -> None:
+        """
+        Rehydrate a hibernated session into a new app instance.
+
+        Waits for the new instance to report its initial configuration, then
+        replays the saved widget state into it, so that any request sent
+        afterwards sees the restored values.
+
+        Raises:
+            asyncio.TimeoutError: If the app instance does not start in time
+
+        """
+        async with self._wake_lock:
+            if not self._hibernated or self._respawn is None:
+                return
+
+            # Starting an app instance may block, e.g. on a remote worker
+            self._execution_manager = await asyncio.to_thread(self._respawn)
+            await self._boot_with_state(timeout_seconds)
+            self._hibernated = False
+            logger.info(f"Rehydrated session {self.session_id}")
+
+    async def restore(
+        self,
+        widget_states: dict[str, dict[str, Any]],
+        timeout_seconds: float = REHYDRATE_TIMEOUT,
+    ) -> None:
+        """
+        Start the session with widget state saved by an earlier server run.
+
+        Raises:
+            asyncio.TimeoutError: If the app instance does not start in time
+
+        """
+        async with self._wake_lock:
+            for widget_id, properties in widget_states.items():
+                state = self._widget_states[WidgetId(widget_id)]
+                state.properties.update(
+                    {PropertyName(name): value for name, value in properties.items()}
+                )
+            await self._boot_with_state(timeout_seconds)
+            logger.info(f"Restored session {self.session_id}")
+
+    async def _boot_with_state(self, timeout_seconds: float) -> None:
+        """Start processing, wait for the app instance and replay widget state."""
+        ready = self._add_pending_request(
+            str(uuid.uuid4()), [MessageType.INIT_CONFIG], timeout_seconds
+        )
+        await self.start()
+        try:
+            await ready
+        except TimeoutError:
+            await self._stop_processing()
+            self._execution_manager.request_stop()
+            raise
+
+        channel = self._execution_manager.communication_manager.to_app_instance
+        for widget_id, state in self._widget_states.items():
+            for property_name, value in state.properties.items():
+                channel.send(
+                    WidgetUpdateRequestMessage(
+                        type=MessageType.WIDGET_UPDATE,
+                        widget_id=widget_id,
+                        property=property_name,
+                        value=value,
+                    ).model_dump(),
+                    # Restored state is part of the boot, ahead of state requests
+                    lane=Lane.CONTROL,
+                )
+        self.last_activity_time = time.time()
 
     async def start(self) -> None:
         """Start processing messages."""
@@ -115,23 +281,36 @@ class SessionManager:
 
     async def stop(self) -> None:
         """Stop processing messages and clean up resources."""
-        if self._running:
-            # Signal shutdown
-            self._running = False
-            self._shutdown_event.set()
-
-            # Cancel and wait for processing task
-            if self._processing_task is not None:
-                self._processing_task.cancel()
-                try:
-                    await self._processing_task
-                except asyncio.CancelledError:
-                    pass
-                finally:
-                    self._processing_task = None
+        if self._running or self._hibernated:
+            self._hibernated = False
+            await self._stop_processing()
 
             # Clear all callbacks
+            for deadline in self._callback_deadlines.values():
+                deadline.cancel()
+            self._callback_deadlines.clear()
             self._callbacks.clear()
+            self._callback_index.clear()
+
+    async def _stop_processing(self) -> None:
+        """Stop the task that reads messages from the app instance."""
+        # Signal shutdown
+        self._running = False
+        self._shutdown_event.set()
+
+        # Cancel and wait for processing task
+        if self._processing_task is not None:
+            self._processing_task.cancel()
+            try:
+                await self._processing_task
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._processing_task = None
+
+    def request_stop(self) -> None:
+        """Ask the app instance behind this session to shut down."""
+        self._execution_manager.request_stop()
 
     def register_callback(
         self,
@@ -141,17 +320,114 @@ class SessionManager:
     ) -> CallbackHandle:
         """Register a callback for specific message types."""
         handle = CallbackHandle(str(uuid.uuid4()))
-        self._callbacks[handle] = CallbackRegistration(
+        registration = CallbackRegistration(
             callback=callback,
             message_types=set(message_types) if message_types else None,
             filter_func=filter_func,
         )
+        self._callbacks[handle] = registration
+        for key in registration.index_keys():
+            self._callback_index[key][handle] = registration
         return handle
 
     def deregister_callback(self, handle: CallbackHandle) -> None:
         """Deregister a previously registered callback."""
-        if handle in self._callbacks:
-            del self._callbacks[handle]
+        deadline = self._callback_deadlines.pop(handle, None)
+        if deadline is not None:
+            deadline.cancel()
+        registration = self._callbacks.pop(handle, None)
+        if registration is None:
+            return
+        for key in registration.index_keys():
+            callbacks = self._callback_index.get(key)
+            if callbacks is not None:
+                callbacks.pop(handle, None)
+                if not callbacks:
+                    del self._callback_index[key]
+
+    def _matching_callbacks(
+        self, msg_type: str | None, message: dict[str, Any]
+    ) -> list[MessageCallback]:
+        """Return the callbacks registered for a message, in one index lookup."""
+        registrations = [
+            *self._callback_index.get(msg_type, {}).values(),
+            *self._callback_index.get(None, {}).values(),
+        ]
+        return [
+            registration.callback
+            for registration in registrations
+            if registration.filter_func is None or registration.filter_func(message)
+        ]
+
+    def _add_pending_request(
+        self,
+        request_id: str,
+        message_types: Sequence[MessageType] | None,
+        timeout_seconds: float | None = None,
+    ) -> asyncio.Future[dict[str, Any]]:
+        """Track a request so its response can resolve the returned future."""
+        loop = asyncio.get_running_loop()
+        pending = PendingRequest(
+            future=loop.create_future(),
+            message_types={t.value for t in message_types} if message_types else None,
+        )
+        if timeout_seconds is not None:
+            pending.deadline = loop.call_later(
+                timeout_seconds, self._expire_pending_request, request_id
+            )
+        self._pending_requests[request_id] = pending
+        for key in pending.index_keys():
+            self._pending_index[key][request_id] = None
+        return pending.future
+
+    def _remove_pending_request(self, request_id: str) -> PendingRequest | None:
+        """Stop tracking a request."""
+        pending = self._pending_requests.pop(request_id, None)
+        if pending is None:
+            return None
+        if pending.deadline is not None:
+            pending.deadline.cancel()
+        for key in pending.index_keys():
+            request_ids = self._pending_index.get(key)
+            if request_ids is not None:
+                request_ids.pop(request_id, None)
+                if not request_ids:
+                    del self._pending_index[key]
+        return pending
+
+    def _expire_pending_request(self, request_id: str) -> None:
+        """Fail a request whose deadline passed without a response."""
+        pending = self._remove_pending_request(request_id)
+        if pending is not None and not pending.future.done():
+            pending.future.set_exception(TimeoutError())
+
+    def _resolve_pending_request(
+        self, msg_type: str | None, message: dict[str, Any]
+    ) -> None:
+        """
+        Resolve the request a message answers.
+
+        Replies carrying a request_id resolve exactly that request. Replies
+        without one (such as the init-config sent when the app starts) resolve
+        the oldest request waiting for their message type.
+        """
+        request_id = message.get("request_id")
+        if request_id is not None:
+            pending = self._pending_requests.get(request_id)
+            if pending is None or (
+                pending.message_types is not None
+                and msg_type not in pending.message_types
+            ):
+                return
+        else:
+            waiting = self._pending_index.get(msg_type) or self._pending_index.get(None)
+            if not waiting:
+                return
+            request_id = next(iter(waiting))
+
+        pending = self._remove_pending_request(request_id)
+        if pending is not None and not pending.future.done():
+            pending.future.set_result(message)
 
     def get_widget_state(self, widget_id: WidgetId) -> dict[PropertyName, Any]:
         """Get the state of a specific widget."""
@@ -175,6 +451,8 @@ class SessionManager:
         """Update the state of a widget."""
         self._widget_states[widget_id].properties[property_name] = value
         self._widget_states[widget_id].last_updated = time.time()
+        if self._state_writer is not None:
+            self._state_writer.record(self.session_id, widget_id, property_name, value)
 
     async def _process_app_messages(self) -> None:  # noqa: PLR0912, C901
         """Process messages from app instance and distribute to callbacks."""
@@ -210,24 +488,14 @@ class SessionManager:
                                 "Failed to parse WidgetUpdateMessage", exc_info=e
                             )
 
-                    # Distribute to callbacks
-                    tasks = []
-
-                    for registration in self._callbacks.values():
-                        should_call = True
-
-                        if registration.message_types is not None:
-                            message_type_values = {
-                                t.value for t in registration.message_types
-                            }
-                            should_call = msg_type in message_type_values
-
-                        if should_call and registration.filter_func is not None:
-                            should_call = registration.filter_func(message)
-
-                        if should_call:
-                            tasks.append(registration.callback(message))
+                    if self._pending_requests:
+                        self._resolve_pending_request(msg_type, message)
 
+                    # Distribute to callbacks
+                    tasks = [
+                        callback(message)
+                        for callback in self._matching_callbacks(msg_type, message)
+                    ]
                     if tasks:
                         await asyncio.gather(*tasks)
 
@@ -264,13 +532,17 @@ class SessionManager:
         """
         Send message to app instance.
 
+        When waiting for a response, the message is tagged with a request_id
+        (its own, `correlation_id`, or a generated one) which the app echoes back,
+        so any number of requests can be in flight at once.
+
         Args:
             message: Message to send
             callback: Optional async callback function to handle responses
             wait_for_response: Whether to wait for a response
             timeout_seconds: Maximum time to wait for response/callback
             message_types: Message types to filter response
-            correlation_id: Correlation ID to match response
+            correlation_id: Request ID to match the response against
 
         Returns:
             Response message if wait_for_response is True, None otherwise
@@ -280,6 +552,15 @@ class SessionManager:
 
         """
         self.last_activity_time = time.time()
+
+        if self._hibernated:
+            await self.wake()
+
+        if callback is None and wait_for_response:
+            return await self._request(
+                message, timeout_seconds, message_types, correlation_id
+            )
+
         self._execution_manager.communication_manager.to_app_instance.send(message)
 
         if callback is not None:
@@ -290,112 +571,327 @@ class SessionManager:
             )
 
             if timeout_seconds is not None:
+                loop = asyncio.get_running_loop()
+                self._callback_deadlines[handle] = loop.call_later(
+                    timeout_seconds, self.deregister_callback, handle
+                )
 
-                async def cleanup_callback() -> None:
-                    async with asyncio.timeout(timeout_seconds):
-                        try:
-                            await asyncio.sleep(timeout_seconds)
-                        except TimeoutError:
-                            pass
-                        finally:
-                            self.deregister_callback(handle)
-
-                asyncio.create_task(cleanup_callback())  # noqa: RUF006
-            return None
-
-        if not wait_for_response:
-            return None
+        return None
 
-        # Create future for response
-        response_future: asyncio.Future[dict[str, Any]] = asyncio.Future()
-
-        async def handle_response(msg: dict[str, Any]) -> None:
-            if (
-                correlation_id is not None
-                and msg.get("correlation_id") != correlation_id
-            ):
-                return
-            if not response_future.done():
-                response_future.set_result(msg)
-
-        # Register temporary callback
-        handle = self.register_callback(
-            callback=handle_response,  # type: ignore [arg-type]
-            message_types=message_types,
+    async def _request(
+        self,
+        message: dict[str, Any],
+        timeout_seconds: float | None,
+        message_types: Sequence[MessageType] | None,
+        correlation_id: str | None,
+    ) -> dict[str, Any]:
+        """Send a message and wait for the response carrying its request_id."""
+        request_id = str(message.get("request_id") or correlation_id or uuid.uuid4())
+        message = {**message, "request_id": request_id}
+
+        # Register before sending so a fast reply cannot be missed. The deadline
+        # is a timer handle on the loop, cancelled as soon as the reply arrives
+        response_future = self._add_pending_request(
+            request_id, message_types, timeout_seconds
         )
-
         try:
-            if timeout_seconds is not None:
-                async with asyncio.timeout(timeout_seconds):
-                    return await response_future
+            self._execution_manager.communication_manager.to_app_instance.send(message)
             return await response_future
         finally:
-            self.deregister_callback(handle)
+            self._remove_pending_request(request_id)
+
+
+@dataclass
+class SessionInfo:
+    """Registry entry for a session: its manager, activity times and websockets."""
+
+    data: SessionManager
+    last_active: float = field(default_factory=time.time)
+    created_at: float = field(default_factory=time.time)
+    connections: dict[str, WebSocket] = field(default_factory=dict)
+
+    def activity_time(self) -> float:
+        """Return the latest client or app activity seen for the session."""
+        return max(self.last_active, self.data.last_activity_time)
 
 
 class GlobalSessionManager:
-    """Manages multiple sessions with global timeout and cleanup."""
+    """
+    Registry that owns the lifecycle of all sessions of an app.
+
+    Sessions are indexed by id and by an expiry heap of (activity time, id)
+    entries with one entry per session. Activity updates do not touch the heap;
+    a popped entry whose session has seen newer activity is pushed back with
+    the new time, so finding expired or least recently used sessions costs
+    O(log n) per session examined instead of a scan of the registry. A second
+    heap of the same shape finds running sessions to hibernate.
+    """
 
     def __init__(
         self,
         session_timeout: float = 60.0,
         cleanup_interval: float = 60.0,
+        max_sessions: int | None = None,
+        overflow_session_timeout: float | None = None,
+        hibernate_after: float | None = None,
+        state_store: SessionStateStore | None = None,
+        state_flush_interval: float = STATE_FLUSH_INTERVAL,
+        directory: SessionDirectory | None = None,
+        worker_id: str = "",
+        accept_session_id: Callable[[str], bool] | None = None,
     ) -> None:
-        """Initialize the global session manager."""
-        self._sessions: dict[SessionId, SessionManager] = {}
-        self._session_timeout = session_timeout
-        self._cleanup_interval = cleanup_interval
+        """
+        Initialize the global session manager.
+
+        Args:
+            session_timeout: Seconds of inactivity before a session expires
+            cleanup_interval: Seconds between expiry sweeps
+            max_sessions: Sessions above this count are evicted, least recently
+                active first (no limit when None)
+            overflow_session_timeout: Shorter inactivity timeout used while the
+                registry holds more than `max_sessions` sessions
+            hibernate_after: Seconds of inactivity before the app instance of a
+                session is stopped until the session is used again (never when
+                None)
+            state_store: Persists widget state so sessions can be restored
+                after a restart
+            state_flush_interval: Seconds between writes to `state_store`
+            directory: Shared directory the sessions are published in, so other
+                workers can relay clients to this one
+            worker_id: Id of this worker in `directory`
+            accept_session_id: Predicate new session ids must satisfy, such as
+                hashing to this worker when a router assigns sessions by id
+
+        """
+        self.sessions: dict[SessionId, SessionInfo] = {}
+        self._expiry_heap: list[tuple[float, SessionId]] = []
+        # Running sessions that may hibernate; hibernated sessions are re-queued
+        # when they respawn
+        self._hibernation_heap: list[tuple[float, SessionId]] = []
+        self.hibernate_after = hibernate_after
+        self.directory = directory
+        self.worker_id = worker_id
+        self.accept_session_id = accept_session_id
+        self.state_writer = (
+            SessionStateWriter(state_store, state_flush_interval)
+            if state_store is not None
+            else None
+        )
+        self.session_timeout = session_timeout
+        self.cleanup_interval = cleanup_interval
+        self.max_sessions = max_sessions
+        self.overflow_session_timeout = overflow_session_timeout
         self._cleanup_task: asyncio.Task[None] | None = None
         self._lock = asyncio.Lock()
         self._shutdown_event = asyncio.Event()
 
+    def new_session_id(self) -> SessionId:
+        """Return a fresh session id accepted by `accept_session_id`."""
+        while True:
+            session_id = str(uuid.uuid4())
+            if self.accept_session_id is None or self.accept_session_id(session_id):
+                return SessionId(session_id)
+
     def create_session(
         self,
         session_id: SessionId,
         execution_manager: ExecutionManager,
+        respawn: Callable[[], ExecutionManager] | None = None,
     ) -> SessionManager:
-        """Create a new session."""
-        if session_id in self._sessions:
+        """
+        Create a new session.
+
+        Args:
+            session_id: Id of the new session
+            execution_manager: Running app instance behind the session
+            respawn: Starts a new app instance for the session, needed for the
+                session to hibernate
+
+        """
+        session = self._register(session_id, execution_manager, respawn)
+        asyncio.create_task(session.start())  # noqa: RUF006
+        return session
+
+    async def load_saved_state(
+        self, session_id: SessionId
+    ) -> dict[str, dict[str, Any]] | None:
+        """Return the widget state persisted for a session that is not running."""
+        if self.state_writer is None or session_id in self.sessions:
+            return None
+        return await self.state_writer.load(session_id)
+
+    async def restore_session(
+        self,
+        session_id: SessionId,
+        execution_manager: ExecutionManager,
+        widget_states: dict[str, dict[str, Any]],
+        respawn: Callable[[], ExecutionManager] | None = None,
+    ) -> SessionManager:
+        """
+        Recreate a session from persisted widget state, keeping its id.
+
+        Returns once the app instance has started and the state is replayed.
+        """
+        session = self._register(session_id, execution_manager, respawn)
+        try:
+            await session.restore(widget_states)
+        except Exception:
+            await self._teardown([session_id], forget=False)
+            raise
+        return session
+
+    def _register(
+        self,
+        session_id: SessionId,
+        execution_manager: ExecutionManager,
+        respawn: Callable[[], ExecutionManager] | None,
+    ) -> SessionManager:
+        """Add a session to the registry without starting it."""
+        if session_id in self.sessions:
             raise ValueError(f"Session {session_id} already exists")
 
         session = SessionManager(
             session_id=session_id,
             execution_manager=execution_manager,
+            respawn=(
+                partial(self._respawn, session_id, respawn, asyncio.get_running_loop())
+                if respawn is not None
+                else None
+            ),
+            state_writer=self.state_writer,
         )
-        # Use the session's last_activity_time directly for timeout checks
-        # instead of setting a non-existent _session_timeout attribute
-        self._sessions[session_id] = session
-        asyncio.create_task(session.start())  # noqa: RUF006
+        info = SessionInfo(data=session)
+        self.sessions[session_id] = info
+        heapq.heappush(self._expiry_heap, (info.activity_time(), session_id))
+        if respawn is not None and self.hibernate_after is not None:
+            heapq.heappush(self._hibernation_heap, (info.activity_time(), session_id))
+        if self.directory is not None:
+            asyncio.create_task(  # noqa: RUF006
+                self.directory.register(session_id, self.worker_id)
+            )
         return session
 
+    def _respawn(
+        self,
+        session_id: SessionId,
+        respawn: Callable[[], ExecutionManager],
+        loop: asyncio.AbstractEventLoop,
+    ) -> ExecutionManager:
+        """Start a new app instance for a session and queue it for hibernation."""
+        execution_manager = respawn()
+        # Called from a thread; the heap belongs to the event loop
+        loop.call_soon_threadsafe(
+            heapq.heappush, self._hibernation_heap, (time.time(), session_id)
+        )
+        return execution_manager
+
     def get_session(self, session_id: SessionId) -> SessionManager:
         """Get existing session."""
-        if session_id not in self._sessions:
+        if session_id not in self.sessions:
             raise ValueError(f"Session {session_id} not found")
-        return self._sessions[session_id]
+        return self.sessions[session_id].data
 
-    async def remove_session(self, session_id: SessionId) -> None:
-        """Remove a session."""
-        async with self._lock:
-            if session_id in self._sessions:
-                logger.debug(f"Stopping session {session_id}")
-                try:
-                    session = self._sessions[session_id]
-                    await session.stop()
-                    del self._sessions[session_id]
-                    logger.debug(f"Successfully removed session {session_id}")
-                except Exception as e:
-                    logger.exception(f"Error stopping session {session_id}", exc_info=e)
-                    # Still remove from sessions dict even if stop fails
-                    self._sessions.pop(session_id, None)
-                    logger.debug(f"Forcibly removed session {session_id} after error")
+    def get_session_info(self, session_id: SessionId) -> SessionInfo | None:
+        """Get the registry entry for a session, if it exists."""
+        return self.sessions.get(session_id)
 
     def has_session(self, session_id: SessionId) -> bool:
         """Check if session exists."""
-        return session_id in self._sessions
+        return session_id in self.sessions
+
+    def touch(self, session_id: SessionId) -> None:
+        """Record client activity on a session."""
+        info = self.sessions.get(session_id)
+        if info is not None:
+            info.last_active = time.time()
+
+    async def remove_session(self, session_id: SessionId) -> None:
+        """Remove a session and shut down its app instance."""
+        await self._teardown([session_id])
+
+    def expired_sessions(self, now: float | None = None) -> list[SessionId]:
+        """
+        Return sessions past their timeout plus any needed to get under the cap.
+
+        Entries are popped from the expiry heap and revalidated; sessions that
+        are kept stay in the heap.
+        """
+        now = time.time() if now is None else now
+        timeout = self.session_timeout
+        excess = 0
+        if self.max_sessions is not None and len(self.sessions) > self.max_sessions:
+            excess = len(self.sessions) - self.max_sessions
+            if self.overflow_session_timeout is not None:
+                timeout = min(timeout, self.overflow_session_timeout)
+
+        return self._pop_idle(self._expiry_heap, now, timeout, excess)
+
+    def hibernation_candidates(self, now: float | None = None) -> list[SessionId]:
+        """
+        Return running sessions idle for longer than `hibernate_after`.
+
+        Candidates are removed from the hibernation heap; they are queued again
+        when they respawn.
+        """
+        if self.hibernate_after is None:
+            return []
+        now = time.time() if now is None else now
+        return self._pop_idle(self._hibernation_heap, now, self.hibernate_after)
+
+    def hibernated_count(self) -> int:
+        """Return the number of sessions whose app instance is stopped."""
+        return sum(1 for info in self.sessions.values() if info.data.hibernated)
+
+    def _pop_idle(
+        self,
+        heap: list[tuple[float, SessionId]],
+        now: float,
+        timeout: float,
+        excess: int = 0,
+    ) -> list[SessionId]:
+        """Pop sessions idle for longer than `timeout`, and at least `excess` more."""
+        idle: list[SessionId] = []
+        while heap:
+            queued_time, session_id = heap[0]
+            info = self.sessions.get(session_id)
+            if info is None:
+                heapq.heappop(heap)
+                continue
+            activity_time = info.activity_time()
+            if activity_time > queued_time:
+                heapq.heapreplace(heap, (activity_time, session_id))
+                continue
+            if now - activity_time <= timeout and len(idle) >= excess:
+                break
+            heapq.heappop(heap)
+            idle.append(session_id)
+        return idle
+
+    async def hibernate_idle_sessions(self, now: float | None = None) -> int:
+        """Hibernate idle sessions and return how many were hibernated."""
+        sessions = [
+            info.data
+            for session_id in self.hibernation_candidates(now)
+            if (info := self.sessions.get(session_id)) is not None
+        ]
+        busy = [session for session in sessions if not session.can_hibernate()]
+        for session in busy:
+            # Try again once a full idle period has passed
+            heapq.heappush(self._hibernation_heap, (time.time(), session.session_id))
+
+        results = await asyncio.gather(
+            *(session.hibernate() for session in sessions if session not in busy)
+        )
+        return sum(results)
 
     async def start_cleanup_task(self) -> None:
-        """Start the session cleanup task."""
+        """Start the session cleanup task and persisting of session state."""
+        if self.state_writer is not None:
+            # Saved sessions that would have expired while the server was down
+            purged = await self.state_writer.purge(time.time() - self.session_timeout)
+            if purged:
+                logger.info(f"Purged saved state of {purged} expired sessions")
+            self.state_writer.start()
         if self._cleanup_task is None:
             self._shutdown_event.clear()
             self._cleanup_task = asyncio.create_task(self._cleanup_inactive_sessions())
@@ -403,99 +899,81 @@ class GlobalSessionManager:
     async def shutdown(self) -> None:
         """Shutdown the manager and all sessions."""
         logger.debug("Starting global manager shutdown")
-        try:
-            # Signal shutdown
-            self._shutdown_event.set()
-
-            # Stop cleanup task first
-            if self._cleanup_task is not None:
-                logger.debug("Cancelling cleanup task")
-                self._cleanup_task.cancel()
-                try:
-                    await asyncio.wait_for(self._cleanup_task, timeout=0.5)
-                except (TimeoutError, asyncio.CancelledError):
-                    pass
-                finally:
-                    self._cleanup_task = None
-                    logger.debug("Cleanup task stopped")
-
-            # Stop all sessions with timeout
-            async with self._lock:
-                for session_id in list(self._sessions.keys()):
-                    try:
-                        logger.debug(f"Stopping session {session_id} during shutdown")
-                        await asyncio.wait_for(
-                            self.remove_session(session_id), timeout=0.5
-                        )
-                    except (TimeoutError, Exception):
-                        logger.exception(f"Error stopping session {session_id}")
-                        # Force remove
-                        self._sessions.pop(session_id, None)
-
-        finally:
-            # Force clear sessions dict
-            self._sessions.clear()
-            logger.debug("Global manager shutdown complete")
+        self._shutdown_event.set()
+
+        if self._cleanup_task is not None:
+            logger.debug("Cancelling cleanup task")
+            self._cleanup_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._cleanup_task
+            self._cleanup_task = None
+
+        # Saved state outlives the shutdown so sessions survive a restart
+        await self._teardown(list(self.sessions), forget=False)
+        self._expiry_heap.clear()
+        self._hibernation_heap.clear()
+        if self.state_writer is not None:
+            await self.state_writer.close()
+        logger.debug("Global manager shutdown complete")
+
+    async def _teardown(
+        self, session_ids: Sequence[SessionId], forget: bool = True
+    ) -> None:
+        """Unregister sessions, then stop them all concurrently."""
+        async with self._lock:
+            infos = [
+                info
+                for session_id in session_ids
+                if (info := self.sessions.pop(session_id, None)) is not None
+            ]
+        if forget and self.state_writer is not None:
+            for info in infos:
+                self.state_writer.forget(info.data.session_id)
+        if infos and self.directory is not None:
+            try:
+                await self.directory.unregister(
+                    [info.data.session_id for info in infos], self.worker_id
+                )
+            except Exception:
+                logger.exception("Error removing sessions from the directory")
+        if infos:
+            await asyncio.gather(*(self._stop_session(info) for info in infos))
+
+    async def _stop_session(self, info: SessionInfo) -> None:
+        """Close a session's websockets, stop it and its app instance."""
+        session_id = info.data.session_id
+        logger.debug(f"Stopping session {session_id}")
+
+        for websocket in list(info.connections.values()):
+            with suppress(RuntimeError, ConnectionError):
+                await websocket.close()
+        info.connections.clear()
 
-    async def _cleanup_inactive_sessions(self) -> None:  # noqa: C901
-        """Periodically clean up inactive sessions."""
         try:
-            while not self._shutdown_event.is_set():
-                try:
-                    current_time = time.time()
-                    logger.debug("Starting cleanup cycle")
-
-                    # Create a list of sessions to remove
-                    to_remove = []
-                    async with self._lock:
-                        for session_id, session in self._sessions.items():
-                            inactive_time = current_time - session.last_activity_time
-                            logger.debug(
-                                f"Session {session_id}: \
-                                    inactive for {inactive_time:.1f}s "
-                                f"(timeout: {self._session_timeout}s)"
-                            )
-                            if inactive_time > self._session_timeout:
-                                to_remove.append(session_id)
+            await info.data.stop()
+        except (RuntimeError, asyncio.CancelledError, ConnectionError):
+            logger.exception(f"Error stopping session {session_id}")
 
-                    # Remove sessions outside the lock to prevent deadlocks
-                    for session_id in to_remove:
-                        if to_remove:
-                            logger.info(f"Removing inactive session {session_id}")
-                        try:
-                            await self.remove_session(session_id)
-                        except Exception as e:
-                            logger.exception(
-                                f"Failed to remove session {session_id}", exc_info=e
-                            )
-                            # Force remove from sessions dict
-                            async with self._lock:
-                                self._sessions.pop(session_id, None)
-                                logger.debug(
-                                    f"Forcibly removed session {session_id} after error"
-                                )
-
-                    # Wait for next cleanup interval or shutdown
-                    try:
-                        logger.debug(
-                            f"Waiting {self._cleanup_interval}s for next cleanup cycle"
-                        )
-                        await asyncio.wait_for(
-                            self._shutdown_event.wait(), timeout=self._cleanup_interval
-                        )
-                        if self._shutdown_event.is_set():
-                            logger.debug("Shutdown event detected, stopping cleanup")
-                            break
-                    except TimeoutError:
-                        continue  # Continue cleanup if no shutdown
-
-                except Exception as e:
-                    logger.exception("Error in cleanup loop", exc_info=e)
-                    if self._shutdown_event.is_set():
-                        break
-                    await asyncio.sleep(0.1)  # Brief pause before retry
-
-        except asyncio.CancelledError:
-            logger.debug("Cleanup task cancelled")
-        finally:
-            logger.debug("Cleanup task stopped")
+        try:
+            info.data.request_stop()
+        except Exception:
+            logger.exception(f"Error stopping app instance for session {session_id}")
+
+    async def _cleanup_inactive_sessions(self) -> None:
+        """Periodically remove expired sessions until shutdown."""
+        while not self._shutdown_event.is_set():
+            try:
+                expired = self.expired_sessions()
+                if expired:
+                    logger.info(f"Removing {len(expired)} inactive sessions")
+                    await self._teardown(expired)
+                hibernated = await self.hibernate_idle_sessions()
+                if hibernated:
+                    logger.info(f"Hibernated {hibernated} idle sessions")
+            except Exception:
+                logger.exception("Error in session cleanup")
+
+            with suppress(TimeoutError):
+                await asyncio.wait_for(
+                    self._shutdown_event.wait(), timeout=self.cleanup_interval
+                )
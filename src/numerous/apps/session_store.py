@@ -0,0 +1,282 @@
+"""Durable widget state of sessions, for restoring them after a restart."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between writes of buffered widget state to the store
+STATE_FLUSH_INTERVAL = 1.0
+
+
+class StateUpdate(NamedTuple):
+    """Latest value of one widget property of a session."""
+
+    session_id: str
+    widget_id: str
+    property_name: str
+    value: Any
+    updated_at: float
+
+
+class SessionStateStore(ABC):
+    """
+    Storage backend for the widget state of sessions.
+
+    Methods are blocking and are called from a worker thread, one at a time.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> dict[str, dict[str, Any]] | None:
+        """Return the saved widget state of a session, or None if there is none."""
+
+    @abstractmethod
+    def save(self, updates: Sequence[StateUpdate]) -> None:
+        """Insert or replace the given property values."""
+
+    @abstractmethod
+    def delete(self, session_ids: Sequence[str]) -> None:
+        """Remove all saved state of the given sessions."""
+
+    @abstractmethod
+    def purge(self, older_than: float) -> int:
+        """Remove sessions not updated since `older_than`, returning their count."""
+
+    def close(self) -> None:  # noqa: B027
+        """Release resources held by the store."""
+
+
+class SqliteSessionStateStore(SessionStateStore):
+    """Store widget state in a SQLite database file, one row per property."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Open (and create if needed) the database at `path`."""
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS widget_state (
+                    session_id TEXT NOT NULL,
+                    widget_id TEXT NOT NULL,
+                    property TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, widget_id, property)
+                )
+                """
+            )
+
+    def load(self, session_id: str) -> dict[str, dict[str, Any]] | None:
+        """Return the saved widget state of a session, or None if there is none."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT widget_id, property, value FROM widget_state "
+                "WHERE session_id = ?",
+                (session_id,),
+            ).fetchall()
+        if not rows:
+            return None
+        state: dict[str, dict[str, Any]] = {}
+        for widget_id, property_name, value in rows:
+            state.setdefault(widget_id, {})[property_name] = json.loads(value)
+        return state
+
+    def save(self, updates: Sequence[StateUpdate]) -> None:
+        """Insert or replace the given property values in one transaction."""
+        rows = []
+        for update in updates:
+            try:
+                value = json.dumps(update.value)
+            except (TypeError, ValueError):
+                logger.warning(
+                    f"Not saving {update.widget_id}.{update.property_name}: "
+                    "value is not JSON serializable"
+                )
+                continue
+            rows.append(
+                (
+                    update.session_id,
+                    update.widget_id,
+                    update.property_name,
+                    value,
+                    update.updated_at,
+                )
+            )
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO widget_state "
+                "(session_id, widget_id, property, value, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete(self, session_ids: Sequence[str]) -> None:
+        """Remove all saved state of the given sessions."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM widget_state WHERE session_id = ?",
+                [(session_id,) for session_id in session_ids],
+            )
+
+    def purge(self, older_than: float) -> int:
+        """Remove sessions not updated since `older_than`, returning their count."""
+        with self._lock, self._connection:
+            stale = [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT session_id FROM widget_state GROUP BY session_id "
+                    "HAVING MAX(updated_at) < ?",
+                    (older_than,),
+                )
+            ]
+            self._connection.executemany(
+                "DELETE FROM widget_state WHERE session_id = ?",
+                [(session_id,) for session_id in stale],
+            )
+        return len(stale)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+class SessionStateWriter:
+    """
+    Buffer widget state changes and write them to a store in batches.
+
+    Changes are recorded in memory and flushed every `flush_interval` seconds
+    from a worker thread. Repeated changes to the same property between
+    flushes are coalesced into one row, so a slider dragged through hundreds
+    of values costs one write.
+    """
+
+    def __init__(
+        self, store: SessionStateStore, flush_interval: float = STATE_FLUSH_INTERVAL
+    ) -> None:
+        """Initialize the writer for `store`."""
+        self.store = store
+        self.flush_interval = flush_interval
+        self._pending: dict[tuple[str, str, str], StateUpdate] = {}
+        self._forgotten: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+        self._closed = False
+        self._updates_recorded = 0
+        self._rows_written = 0
+        self._flushes = 0
+
+    def record(
+        self,
+        session_id: str,
+        widget_id: str,
+        property_name: str,
+        value: Any,  # noqa: ANN401
+    ) -> None:
+        """Record the latest value of a widget property."""
+        self._updates_recorded += 1
+        self._pending[(session_id, widget_id, property_name)] = StateUpdate(
+            session_id, widget_id, property_name, value, time.time()
+        )
+
+    def forget(self, session_id: str) -> None:
+        """Drop buffered changes of a session and delete its saved state."""
+        self._pending = {
+            key: update for key, update in self._pending.items() if key[0] != session_id
+        }
+        self._forgotten.add(session_id)
+
+    async def load(self, session_id: str) -> dict[str, dict[str, Any]] | None:
+        """Return the saved widget state of a session, including buffered changes."""
+        await self.flush()
+        return await asyncio.to_thread(self.store.load, session_id)
+
+    async def purge(self, older_than: float) -> int:
+        """Remove sessions not updated since `older_than` from the store."""
+        async with self._flush_lock:
+            return await asyncio.to_thread(self.store.purge, older_than)
+
+    async def flush(self) -> None:
+        """Write buffered changes to the store."""
+        async with self._flush_lock:
+            if not self._pending and not self._forgotten:
+                return
+            updates = list(self._pending.values())
+            forgotten = list(self._forgotten)
+            self._pending = {}
+            self._forgotten = set()
+            try:
+                if forgotten:
+                    await asyncio.to_thread(self.store.delete, forgotten)
+                if updates:
+                    await asyncio.to_thread(self.store.save, updates)
+            except Exception:
+                # Keep the changes for the next flush unless superseded meanwhile
+                self._forgotten.update(forgotten)
+                for update in updates:
+                    key = (update.session_id, update.widget_id, update.property_name)
+                    self._pending.setdefault(key, update)
+                raise
+            self._rows_written += len(updates)
+            self._flushes += 1
+
+    def start(self) -> None:
+        """Start flushing buffered changes periodically."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self) -> None:
+        """Stop periodic flushing, write remaining changes and close the store."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        try:
+            await self.flush()
+        finally:
+            await asyncio.to_thread(self.store.close)
+
+    def metrics(self) -> dict[str, Any]:
+        """Return write counts, including rows written per recorded change."""
+        return {
+            "updates_recorded": self._updates_recorded,
+            "rows_written": self._rows_written,
+            "flushes": self._flushes,
+            "pending": len(self._pending),
+            "write_amplification": (
+                self._rows_written / self._updates_recorded
+                if self._updates_recorded
+                else 0.0
+            ),
+        }
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Error writing session state")
@@ -0,0 +1,216 @@
+/**
+ * Tests for the off-main-thread WebSocket decoding in numerous-worker.js and
+ * the WorkerSocket facade in numerous.js
+ */
+
+global.LOG_LEVELS = {
+  DEBUG: 0,
+  INFO: 1,
+  WARN: 2,
+  ERROR: 3,
+  NONE: 4
+};
+global.log = jest.fn();
+const BASE_PATH = '';
+
+// The global WebSocket mock has no static readyState constants
+Object.assign(global.WebSocket, { CONNECTING: 0, OPEN: 1, CLOSING: 2, CLOSED: 3 });
+
+// Simplified copies of the worker decoding helpers
+const TYPED_ARRAY_MIN_LENGTH = 1024;
+
+function isNumericArray(value) {
+  if (value.length < TYPED_ARRAY_MIN_LENGTH) return false;
+  for (let i = 0; i < value.length; i++) {
+    if (typeof value[i] !== 'number') return false;
+  }
+  return true;
+}
+
+function toTypedArrays(value, transfer) {
+  if (Array.isArray(value)) {
+    if (isNumericArray(value)) {
+      const typed = Float64Array.from(value);
+      transfer.push(typed.buffer);
+      return typed;
+    }
+    for (let i = 0; i < value.length; i++) {
+      value[i] = toTypedArrays(value[i], transfer);
+    }
+    return value;
+  }
+  if (value !== null && typeof value === 'object') {
+    for (const key of Object.keys(value)) {
+      value[key] = toTypedArrays(value[key], transfer);
+    }
+  }
+  return value;
+}
+
+function encodeMessage(message) {
+  return JSON.stringify(message, (key, value) => ArrayBuffer.isView(value) ? Array.from(value) : value);
+}
+
+// Mock Worker that records posted commands
+class MockWorker {
+  constructor(url) {
+    this.url = url;
+    this.posted = [];
+    this.terminated = false;
+  }
+
+  postMessage(data) {
+    this.posted.push(data);
+  }
+
+  terminate() {
+    this.terminated = true;
+  }
+
+  // Helper to simulate an event coming from the worker
+  emit(data) {
+    this.onmessage({ data });
+  }
+}
+
+// Simplified copy of the WorkerSocket facade
+class WorkerSocket {
+  constructor(url, options = {}) {
+    this.readyState = WebSocket.CONNECTING;
+    this.onopen = null;
+    this.onmessage = null;
+    this.onclose = null;
+    this.onerror = null;
+
+    this.worker = new MockWorker(`${BASE_PATH}/numerous-worker.js`);
+    this.worker.onmessage = (event) => this._handleWorkerEvent(event.data);
+    this.worker.postMessage({
+      command: 'connect',
+      url: url,
+      typedArrays: !!options.typedArrays
+    });
+  }
+
+  _handleWorkerEvent(data) {
+    switch (data.event) {
+      case 'open':
+        this.readyState = WebSocket.OPEN;
+        this.onopen && this.onopen();
+        break;
+      case 'message':
+        this.onmessage && this.onmessage({ data: data.message, decoded: true });
+        break;
+      case 'decode-error':
+        log(LOG_LEVELS.ERROR, `[WorkerSocket] Failed to decode message:`, data.error, "Raw data:", data.raw);
+        break;
+      case 'error':
+        this.onerror && this.onerror(data);
+        break;
+      case 'close':
+        this.readyState = WebSocket.CLOSED;
+        this.worker.terminate();
+        this.onclose && this.onclose({ code: data.code, reason: data.reason });
+        break;
+    }
+  }
+
+  send(data) {
+    this.worker.postMessage({ command: 'send', data: data });
+  }
+
+  close() {
+    this.readyState = WebSocket.CLOSING;
+    this.worker.postMessage({ command: 'close' });
+  }
+}
+
+describe('Worker message decoding', () => {
+  it('should leave short arrays untouched', () => {
+    const transfer = [];
+    const message = { type: 'widget-update', value: [1, 2, 3] };
+
+    const result = toTypedArrays(message, transfer);
+
+    expect(Array.isArray(result.value)).toBe(true);
+    expect(transfer).toHaveLength(0);
+  });
+
+  it('should convert long numeric arrays to transferable typed arrays', () => {
+    const transfer = [];
+    const data = Array.from({ length: 2000 }, (_, i) => i * 0.5);
+    const message = { type: 'widget-update', value: { x: data, label: 'series' } };
+
+    const result = toTypedArrays(message, transfer);
+
+    expect(result.value.x).toBeInstanceOf(Float64Array);
+    expect(result.value.x[10]).toBe(5);
+    expect(result.value.label).toBe('series');
+    expect(transfer).toEqual([result.value.x.buffer]);
+  });
+
+  it('should not convert long arrays with non-numeric entries', () => {
+    const transfer = [];
+    const data = Array.from({ length: 2000 }, (_, i) => (i === 5 ? 'x' : i));
+
+    const result = toTypedArrays({ value: data }, transfer);
+
+    expect(Array.isArray(result.value)).toBe(true);
+    expect(transfer).toHaveLength(0);
+  });
+
+  it('should encode typed arrays back to plain JSON arrays', () => {
+    const message = { type: 'widget-update', value: new Float64Array([1.5, 2.5]) };
+
+    expect(encodeMessage(message)).toBe('{"type":"widget-update","value":[1.5,2.5]}');
+  });
+});
+
+describe('WorkerSocket', () => {
+  let socket;
+
+  beforeEach(() => {
+    socket = new WorkerSocket('ws://localhost/ws/client/session', { typedArrays: true });
+  });
+
+  it('should ask the worker to connect', () => {
+    expect(socket.readyState).toBe(WebSocket.CONNECTING);
+    expect(socket.worker.posted[0]).toEqual({
+      command: 'connect',
+      url: 'ws://localhost/ws/client/session',
+      typedArrays: true
+    });
+  });
+
+  it('should open and deliver decoded messages', () => {
+    const onopen = jest.fn();
+    const onmessage = jest.fn();
+    socket.onopen = onopen;
+    socket.onmessage = onmessage;
+
+    socket.worker.emit({ event: 'open' });
+    socket.worker.emit({ event: 'message', message: { type: 'init-config' } });
+
+    expect(onopen).toHaveBeenCalled();
+    expect(socket.readyState).toBe(WebSocket.OPEN);
+    expect(onmessage).toHaveBeenCalledWith({ data: { type: 'init-config' }, decoded: true });
+  });
+
+  it('should forward sends to the worker', () => {
+    socket.send('{"type":"get-widget-states"}');
+
+    expect(socket.worker.posted[1]).toEqual({ command: 'send', data: '{"type":"get-widget-states"}' });
+  });
+
+  it('should terminate the worker when the socket closes', () => {
+    const onclose = jest.fn();
+    socket.onclose = onclose;
+
+    socket.close();
+    socket.worker.emit({ event: 'close', code: 1000, reason: '' });
+
+    expect(socket.worker.posted[1]).toEqual({ command: 'close' });
+    expect(socket.readyState).toBe(WebSocket.CLOSED);
+    expect(socket.worker.terminated).toBe(true);
+    expect(onclose).toHaveBeenCalledWith({ code: 1000, reason: '' });
+  });
+});
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from numerous.apps.admission import SpawnRejectedError, SpawnScheduler
+
+
+async def test_spawns_beyond_limit_wait_for_a_slot():
+    """Test that at most max_concurrent spawns run at once and the rest queue."""
+    scheduler = SpawnScheduler(max_concurrent=2, max_per_client=None)
+    running = 0
+    peak = 0
+
+    async def spawn(i):
+        nonlocal running, peak
+        async with scheduler.admit(f"client-{i}"):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(spawn(i) for i in range(6)))
+
+    metrics = scheduler.metrics()
+    assert peak == 2
+    assert metrics["admitted"] == 6
+    assert metrics["running"] == 0
+    assert metrics["queued"] == 0
+    assert metrics["wait_seconds"]["max"] > 0
+
+
+async def test_full_queue_is_rejected():
+    """Test that spawns are shed with a retry delay once the queue is full."""
+    scheduler = SpawnScheduler(max_concurrent=1, max_queue=1, max_per_client=None)
+    release = asyncio.Event()
+
+    async def spawn():
+        async with scheduler.admit("a"):
+            await release.wait()
+
+    tasks = [asyncio.create_task(spawn()) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert not scheduler.has_capacity()
+
+    with pytest.raises(SpawnRejectedError) as exc_info:
+        async with scheduler.admit("b"):
+            pass
+    assert exc_info.value.reason == "queue-full"
+    assert exc_info.value.retry_after >= scheduler.retry_after
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.has_capacity()
+    assert scheduler.metrics()["rejected"] == {"queue-full": 1}
+
+
+async def test_client_quota():
+    """Test that one client cannot hold more than max_per_client spawns."""
+    scheduler = SpawnScheduler(max_concurrent=4, max_per_client=1)
+
+    async with scheduler.admit("a"):
+        with pytest.raises(SpawnRejectedError) as exc_info:
+            async with scheduler.admit("a"):
+                pass
+        assert exc_info.value.reason == "client-quota"
+
+        async with scheduler.admit("b"):
+            pass
+
+    async with scheduler.admit("a"):
+        pass
+
+
+async def test_admit_without_waiting():
+    """Test that a spawn that may not wait is rejected while no slot is free."""
+    scheduler = SpawnScheduler(max_concurrent=1)
+
+    async with scheduler.admit("a", wait=False):
+        with pytest.raises(SpawnRejectedError) as exc_info:
+            async with scheduler.admit("b", wait=False):
+                pass
+        assert exc_info.value.reason == "no-slot"
+
+    async with scheduler.admit("b", wait=False):
+        pass
+    assert scheduler.metrics()["rejected"] == {}
+
+
+async def test_queue_timeout():
+    """Test that a spawn waiting longer than max_wait is rejected."""
+    scheduler = SpawnScheduler(max_concurrent=1, max_per_client=None, max_wait=0.01)
+
+    async with scheduler.admit("a"):
+        with pytest.raises(SpawnRejectedError) as exc_info:
+            async with scheduler.admit("b"):
+                pass
+
+    assert exc_info.value.reason == "queue-timeout"
+    assert scheduler.metrics()["queued"] == 0
+    assert scheduler.has_capacity()
@@ -1,3 +1,5 @@
+import asyncio
+import json
 import logging
 import os
 import multiprocessing
@@ -9,7 +11,15 @@ from traitlets import Unicode
 from unittest.mock import patch
 from anywidget import AnyWidget
 
-from numerous.apps import create_app
+from fastapi import HTTPException, WebSocketDisconnect
+
+from numerous.apps import action, create_app
+from numerous.apps.app_factory import (
+    _WidgetWorkers,
+    _action_options,
+    _handle_widget_action,
+    _stream_action,
+)
 from numerous.apps.communication import MultiProcessExecutionManager
 from numerous.apps.models import (
     TraitValue,
@@ -402,3 +412,735 @@ def _test_invalid_widget_action(client):
         json={"args": [], "kwargs": {}}
     )
     assert response.status_code == 404
+
+
+def test_ws_worker_disabled_by_default(client):
+    """Test that the WebSocket worker is opt-in."""
+    response = client.get("/")
+    assert "NUMEROUS_WS_WORKER" not in response.text
+    assert client.get("/numerous-worker.js").status_code == 404
+
+
+def test_ws_worker_enabled(test_dirs):
+    """Test that enabling the worker serves its script and configures the page."""
+    with open(test_dirs / "templates" / "with_head.html.j2", "w") as f:
+        f.write(
+            """
+        <!DOCTYPE html>
+        <html><head><title>Test</title></head><body>{{ test_widget }}</body></html>
+        """
+        )
+
+    app = create_app(
+        template="with_head.html.j2",
+        dev=True,
+        app_generator=app_generator,
+        allow_threaded=True,
+        base_dir=test_dirs,
+        ws_worker=True,
+        ws_worker_typed_arrays=True,
+    )
+    local_client = TestClient(app)
+
+    response = local_client.get("/")
+    assert 'window.NUMEROUS_WS_WORKER = {"typedArrays": true};' in response.text
+
+    worker_response = local_client.get("/numerous-worker.js")
+    assert worker_response.status_code == 200
+    assert worker_response.headers["content-type"] == "application/javascript"
+    assert "postMessage" in worker_response.text
+
+
+@pytest.fixture
+def speculative_app(test_dirs):
+    with open(test_dirs / "templates" / "with_head.html.j2", "w") as f:
+        f.write(
+            """
+        <!DOCTYPE html>
+        <html><head><title>Test</title></head><body>{{ test_widget }}</body></html>
+        """
+        )
+
+    return create_app(
+        template="with_head.html.j2",
+        dev=True,
+        app_generator=app_generator,
+        allow_threaded=True,
+        base_dir=test_dirs,
+        speculative_sessions=True,
+    )
+
+
+def _speculative_session_id(html):
+    marker = 'window.NUMEROUS_SESSION_ID = "'
+    start = html.index(marker) + len(marker)
+    return html[start : html.index('"', start)]
+
+
+def test_speculative_session_claimed(speculative_app):
+    """Test that serving the home page starts a session the client then claims."""
+    config = speculative_app.state.config
+    with TestClient(speculative_app) as local_client:
+        speculative_id = _speculative_session_id(local_client.get("/").text)
+        assert config.session_manager.has_session(SessionId(speculative_id))
+        assert speculative_id in config.pending_speculative_sessions
+
+        response = local_client.get(
+            "/api/widgets",
+            params={"session_id": "undefined", "speculative_session_id": speculative_id},
+        )
+        assert response.status_code == 200
+        assert response.json()["session_id"] == speculative_id
+        assert speculative_id not in config.pending_speculative_sessions
+
+
+def test_speculative_session_released_for_existing_session(speculative_app):
+    """Test that a client with a live session keeps it and frees the speculative one."""
+    config = speculative_app.state.config
+    with TestClient(speculative_app) as local_client:
+        existing_id = local_client.get(
+            "/api/widgets", params={"session_id": "undefined"}
+        ).json()["session_id"]
+        speculative_id = _speculative_session_id(local_client.get("/").text)
+
+        response = local_client.get(
+            "/api/widgets",
+            params={"session_id": existing_id, "speculative_session_id": speculative_id},
+        )
+        assert response.json()["session_id"] == existing_id
+
+        deadline = time.time() + 5
+        while config.session_manager.has_session(SessionId(speculative_id)):
+            assert time.time() < deadline
+            time.sleep(0.05)
+        assert speculative_id not in config.pending_speculative_sessions
+
+
+def test_speculative_session_reclaimed_after_timeout(speculative_app):
+    """Test that an unclaimed speculative session is shut down after the timeout."""
+    config = speculative_app.state.config
+    config.speculative_session_timeout = 0.1
+    with TestClient(speculative_app) as local_client:
+        speculative_id = _speculative_session_id(local_client.get("/").text)
+
+        deadline = time.time() + 5
+        while config.session_manager.has_session(SessionId(speculative_id)):
+            assert time.time() < deadline
+            time.sleep(0.05)
+        assert not config.pending_speculative_sessions
+
+
+def test_speculative_sessions_within_client_quota(speculative_app):
+    """Test that home page reloads from one client start at most its quota."""
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Event
+    from types import SimpleNamespace
+
+    config = speculative_app.state.config
+    config.spawn_scheduler.max_per_client = 2
+    started = []
+    release = Event()
+
+    async def get_app_session(*_args, **_kwargs):
+        started.append(1)
+        await asyncio.to_thread(release.wait, 5)
+        return SimpleNamespace(session_id=f"speculative-{len(started)}")
+
+    with patch(
+        "numerous.apps.app_factory._get_app_session", get_app_session
+    ), TestClient(speculative_app) as local_client, ThreadPoolExecutor(4) as pool:
+        pages = [pool.submit(local_client.get, "/") for _ in range(4)]
+        # Reloads over the quota are served at once, without a session
+        deadline = time.time() + 5
+        while sum(page.done() for page in pages) < 2:
+            assert time.time() < deadline
+            time.sleep(0.01)
+        assert len(started) == 2
+        release.set()
+        texts = [page.result().text for page in pages]
+        assert sum("NUMEROUS_SESSION_ID" in text for text in texts) == 2
+        for handle in config.pending_speculative_sessions.values():
+            handle.cancel()
+        config.pending_speculative_sessions.clear()
+
+
+def test_session_limits_configure_registry(test_dirs):
+    """Test that session limits passed to create_app reach the session registry."""
+    app = create_app(
+        template="base.html.j2",
+        app_generator=app_generator,
+        allow_threaded=True,
+        base_dir=test_dirs,
+        max_sessions=5,
+        session_timeout=120.0,
+        overflow_session_timeout=30.0,
+        session_cleanup_interval=1.0,
+    )
+    session_manager = app.state.config.session_manager
+
+    assert app.state.config.sessions is session_manager.sessions
+    assert session_manager.max_sessions == 5
+    assert session_manager.session_timeout == 120.0
+    assert session_manager.overflow_session_timeout == 30.0
+    assert session_manager.cleanup_interval == 1.0
+
+
+def test_spawn_rejected_with_retry_after(app):
+    """Test that new sessions over the spawn quota get 503 while existing ones load."""
+    with TestClient(app) as local_client:
+        session_id = local_client.get("/api/widgets").json()["session_id"]
+        app.state.config.spawn_scheduler.max_per_client = 0
+
+        response = local_client.get("/api/widgets")
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+
+        response = local_client.get("/api/widgets", params={"session_id": session_id})
+        assert response.status_code == 200
+        assert response.json()["session_id"] == session_id
+
+        metrics = local_client.get("/api/metrics").json()
+        assert metrics["spawn"]["admitted"] == 1
+        assert metrics["spawn"]["rejected"] == {"client-quota": 1}
+
+
+def test_hibernated_session_restores_widget_state(test_dirs):
+    """Test that a hibernated session comes back with the widget values it had."""
+    app = create_app(
+        template="base.html.j2",
+        app_generator=app_generator,
+        allow_threaded=True,
+        base_dir=test_dirs,
+        hibernate_after=600.0,
+    )
+    session_manager = app.state.config.session_manager
+    with TestClient(app) as local_client:
+        session_id = local_client.get("/api/widgets").json()["session_id"]
+        response = local_client.put(
+            f"/api/widgets/test_widget/traits/value?session_id={session_id}",
+            json={"value": "kept"},
+        )
+        assert response.status_code == 200
+
+        session = session_manager.get_session(SessionId(session_id))
+        deadline = time.time() + 5
+        while not session.get_widget_state("test_widget"):
+            assert time.time() < deadline
+            time.sleep(0.05)
+        assert local_client.portal.call(session.hibernate)
+        assert local_client.get("/api/metrics").json()["hibernated_sessions"] == 1
+
+        data = local_client.get(
+            "/api/widgets", params={"session_id": session_id}
+        ).json()
+        assert data["session_id"] == session_id
+        assert data["widgets"]["test_widget"]["defaults"]["value"] == "kept"
+        assert not session.hibernated
+
+
+def test_session_restored_after_restart(test_dirs, tmp_path):
+    """Test that a client's session id and widget values survive a server restart."""
+    from numerous.apps.session_store import SqliteSessionStateStore
+
+    def make_app():
+        return create_app(
+            template="base.html.j2",
+            app_generator=app_generator,
+            allow_threaded=True,
+            base_dir=test_dirs,
+            session_store=SqliteSessionStateStore(tmp_path / "sessions.db"),
+        )
+
+    with TestClient(make_app()) as local_client:
+        session_id = local_client.get("/api/widgets").json()["session_id"]
+        response = local_client.put(
+            f"/api/widgets/test_widget/traits/value?session_id={session_id}",
+            json={"value": "survives"},
+        )
+        assert response.status_code == 200
+        deadline = time.time() + 5
+        while not local_client.get("/api/metrics").json()["state_store"][
+            "updates_recorded"
+        ]:
+            assert time.time() < deadline
+            time.sleep(0.05)
+
+    with TestClient(make_app()) as local_client:
+        data = local_client.get(
+            "/api/widgets", params={"session_id": session_id}
+        ).json()
+        assert data["session_id"] == session_id
+        assert data["widgets"]["test_widget"]["defaults"]["value"] == "survives"
+
+
+def test_session_relayed_between_workers(test_dirs):
+    """Test that a worker relays clients to the session hosted by another worker."""
+    from numerous.apps.backplane import LocalBackplane, LocalSessionDirectory
+
+    directory = LocalSessionDirectory()
+    backplane = LocalBackplane()
+
+    def make_app(worker_id):
+        return create_app(
+            template="base.html.j2",
+            app_generator=app_generator,
+            allow_threaded=True,
+            base_dir=test_dirs,
+            session_directory=directory,
+            backplane=backplane,
+            worker_id=worker_id,
+        )
+
+    app_a, app_b = make_app("a"), make_app("b")
+    with TestClient(app_a) as client_a, TestClient(app_b) as client_b:
+        session_id = client_a.get("/api/widgets").json()["session_id"]
+
+        data = client_b.get("/api/widgets", params={"session_id": session_id}).json()
+        assert data["session_id"] == session_id
+        assert "test_widget" in data["widgets"]
+        assert not app_b.state.config.sessions
+
+        with client_b.websocket_connect(f"/ws/client-b/{session_id}") as websocket:
+            websocket.send_json(
+                {
+                    "type": "widget-update",
+                    "widget_id": "test_widget",
+                    "property": "value",
+                    "value": "relayed",
+                    "request_id": "r1",
+                }
+            )
+            message = websocket.receive_json()
+            while message.get("request_id") != "r1":
+                message = websocket.receive_json()
+            assert message["value"] == "relayed"
+
+        session = app_a.state.config.session_manager.get_session(SessionId(session_id))
+        deadline = time.time() + 5
+        while session.get_widget_state("test_widget").get("value") != "relayed":
+            assert time.time() < deadline
+            time.sleep(0.05)
+
+
+def test_broadcast_session_hosted_by_one_worker(test_dirs):
+    """Test that a broadcast session runs once and viewers cannot write through relays."""
+    from numerous.apps.backplane import LocalBackplane, LocalSessionDirectory
+    from numerous.apps.broadcast import BroadcastSession
+
+    directory = LocalSessionDirectory()
+    backplane = LocalBackplane()
+
+    def make_app(worker_id):
+        return create_app(
+            template="base.html.j2",
+            app_generator=app_generator,
+            allow_threaded=True,
+            base_dir=test_dirs,
+            session_directory=directory,
+            backplane=backplane,
+            worker_id=worker_id,
+            broadcast_sessions=[BroadcastSession("lecture", write_key="secret")],
+        )
+
+    app_a, app_b = make_app("a"), make_app("b")
+    with TestClient(app_a) as client_a, TestClient(app_b) as client_b:
+        viewer = client_a.get("/api/widgets?broadcast=lecture").json()
+        writer = client_b.get("/api/widgets?broadcast=lecture&key=secret").json()
+        assert viewer["session_id"] == writer["session_id"] == "broadcast-lecture"
+        assert writer["broadcast"] == {"name": "lecture", "writable": True}
+        assert not app_b.state.config.sessions
+
+        session = app_a.state.config.session_manager.get_session(
+            SessionId("broadcast-lecture")
+        )
+
+        def update(value):
+            return {
+                "type": "widget-update",
+                "widget_id": "test_widget",
+                "property": "value",
+                "value": value,
+            }
+
+        with client_b.websocket_connect("/ws/viewer/broadcast-lecture") as websocket:
+            websocket.send_json(update("viewer"))
+            # The viewer's widget is put back to the shared state instead
+            message = websocket.receive_json()
+            while message.get("widget_id") != "test_widget":
+                message = websocket.receive_json()
+            assert message["value"] != "viewer"
+        assert session.get_widget_state("test_widget").get("value") != "viewer"
+
+        with client_b.websocket_connect(
+            f"/ws/writer/broadcast-lecture?write_token={writer['write_token']}"
+        ) as websocket:
+            websocket.send_json(update("shared"))
+            deadline = time.time() + 5
+            while session.get_widget_state("test_widget").get("value") != "shared":
+                assert time.time() < deadline
+                time.sleep(0.05)
+
+
+def test_sessions_run_on_remote_worker(test_dirs, tmp_path):
+    """Test that sessions are started on a worker daemon when one is configured."""
+    from numerous.apps.remote import RemoteWorkerPool, WorkerDaemon
+
+    daemon = WorkerDaemon(str(tmp_path / "worker.sock"), b"key", allow_threaded=True)
+    daemon.start()
+    try:
+        app = create_app(
+            template="base.html.j2",
+            app_generator=app_generator,
+            base_dir=test_dirs,
+            remote_workers=RemoteWorkerPool([daemon.address], b"key"),
+        )
+        with TestClient(app) as local_client:
+            data = local_client.get("/api/widgets").json()
+            assert "test_widget" in data["widgets"]
+            assert daemon.load()["sessions"] == 1
+
+            session_id = data["session_id"]
+            response = local_client.put(
+                f"/api/widgets/test_widget/traits/value?session_id={session_id}",
+                json={"value": "remote"},
+            )
+            assert response.status_code == 200
+            session = app.state.config.session_manager.get_session(
+                SessionId(session_id)
+            )
+            deadline = time.time() + 5
+            while session.get_widget_state("test_widget").get("value") != "remote":
+                assert time.time() < deadline
+                time.sleep(0.05)
+
+        deadline = time.time() + 5
+        while daemon.load()["sessions"]:
+            assert time.time() < deadline
+            time.sleep(0.05)
+    finally:
+        daemon.close()
+
+
+def test_broadcast_session_shared_by_viewers(test_dirs):
+    """Test that clients joining a broadcast session share one app instance."""
+    from numerous.apps.broadcast import BroadcastSession
+
+    app = create_app(
+        template="base.html.j2",
+        app_generator=app_generator,
+        allow_threaded=True,
+        base_dir=test_dirs,
+        broadcast_sessions=[BroadcastSession("lecture", write_key="secret")],
+    )
+    config = app.state.config
+    with TestClient(app) as local_client:
+        assert local_client.get("/api/widgets?broadcast=unknown").status_code == 404
+
+        writer = local_client.get("/api/widgets?broadcast=lecture&key=secret").json()
+        viewer = local_client.get("/api/widgets?broadcast=lecture").json()
+        assert writer["session_id"] == viewer["session_id"] == "broadcast-lecture"
+        assert len(config.sessions) == 1
+        assert writer["broadcast"] == {"name": "lecture", "writable": True}
+        assert viewer["broadcast"] == {"name": "lecture", "writable": False}
+        assert "write_token" not in viewer
+
+        url = "/api/widgets/test_widget/traits/value?session_id=broadcast-lecture"
+        assert local_client.put(url, json={"value": "viewer"}).status_code == 403
+        response = local_client.put(
+            f"{url}&write_token={writer['write_token']}", json={"value": "shared"}
+        )
+        assert response.status_code == 200
+
+        session = config.session_manager.get_session(SessionId("broadcast-lecture"))
+        deadline = time.time() + 5
+        while session.get_widget_state("test_widget").get("value") != "shared":
+            assert time.time() < deadline
+            time.sleep(0.05)
+
+        with local_client.websocket_connect("/ws/viewer/broadcast-lecture") as ws:
+            ws.send_json(
+                {
+                    "type": "widget-update",
+                    "widget_id": "test_widget",
+                    "property": "value",
+                    "value": "hijacked",
+                    "request_id": "r1",
+                }
+            )
+            message = ws.receive_json()
+            while message.get("property") != "value":
+                message = ws.receive_json()
+            assert message["value"] == "shared"
+        assert session.get_widget_state("test_widget")["value"] == "shared"
+
+
+def test_shared_widgets_run_once_for_all_sessions(test_dirs):
+    """Test that shared widgets run in one app instance and reach every client."""
+    created = []
+
+    def shared_app_generator():
+        created.append(TestWidgetWithTrait())
+        return {"ticker": created[-1]}
+
+    app = create_app(
+        template="base.html.j2",
+        app_generator=app_generator,
+        allow_threaded=True,
+        base_dir=test_dirs,
+        shared_app_generator=shared_app_generator,
+    )
+    with TestClient(app) as local_client:
+        shared_session = app.state.config.shared_session
+        shared_send = shared_session.send
+        shared_sent = []
+
+        async def send(message, *args, **kwargs):
+            shared_sent.append(message["type"])
+            return await shared_send(message, *args, **kwargs)
+
+        shared_session.send = send
+        first = local_client.get("/api/widgets").json()
+        second = local_client.get("/api/widgets").json()
+        assert "get-state" not in shared_sent
+        assert first["session_id"] != second["session_id"]
+        assert "ticker" in first["widgets"] and "ticker" in second["widgets"]
+        assert "test_widget" in first["widgets"]
+        assert len(created) == 1
+
+        ticker = created[0]
+        with local_client.websocket_connect(
+            f"/ws/client-1/{first['session_id']}"
+        ) as ws1, local_client.websocket_connect(
+            f"/ws/client-2/{second['session_id']}"
+        ) as ws2:
+            # Wait until both clients are registered for the shared updates
+            deadline = time.time() + 5
+            while len(app.state.config.shared_connections) < 2:
+                assert time.time() < deadline
+                time.sleep(0.05)
+
+            ticker.value = "tick"
+            for ws in (ws1, ws2):
+                message = ws.receive_json()
+                while message.get("widget_id") != "ticker":
+                    message = ws.receive_json()
+                assert message["value"] == "tick"
+
+        response = local_client.put(
+            f"/api/widgets/ticker/traits/value?session_id={first['session_id']}",
+            json={"value": "set"},
+        )
+        assert response.status_code == 200
+        deadline = time.time() + 5
+        while ticker.value != "set":
+            assert time.time() < deadline
+            time.sleep(0.05)
+        # Page loads serve the shared widgets from a snapshot of their updates
+        while True:
+            data = local_client.get(
+                "/api/widgets", params={"session_id": second["session_id"]}
+            ).json()
+            if data["widgets"]["ticker"]["defaults"]["value"] == "set":
+                break
+            assert time.time() < deadline
+            time.sleep(0.05)
+        assert len(created) == 1
+
+
+class _NeverAnsweringSession:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, message, wait_for_response=False, **kwargs):
+        self.messages.append(message)
+        if wait_for_response:
+            await asyncio.Event().wait()
+
+
+class _DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+async def test_action_call_cancelled_when_caller_disconnects(app):
+    """Test that the app is asked to cancel actions nobody waits for anymore"""
+    session = _NeverAnsweringSession()
+    with (
+        patch(
+            "numerous.apps.app_factory._get_app_session",
+            return_value=session,
+        ),
+        pytest.raises(HTTPException) as error,
+    ):
+        await _handle_widget_action(
+            app, "test_widget", "test_action", "session", [], {},
+            _DisconnectedRequest(),
+        )
+
+    assert error.value.status_code == 499
+    request, cancel = session.messages
+    assert cancel == {"type": "action-cancel", "request_id": request["request_id"]}
+
+
+class _StreamingSession:
+    """Session stub whose app answers an action with fixed replies."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.messages = []
+        self.callback = None
+
+    def register_callback(self, callback, message_types=None, filter_func=None):
+        self.callback = (callback, filter_func)
+        return "handle"
+
+    def deregister_callback(self, handle):
+        self.callback = None
+
+    async def send(self, message, wait_for_response=False, **kwargs):
+        self.messages.append(message)
+        if message["type"] != "action-request":
+            return
+        callback, accept = self.callback
+        for reply in self.replies:
+            reply = {**reply, "request_id": message["request_id"]}
+            if accept(reply):
+                await callback(reply)
+
+
+class StreamingWidget(AnyWidget):
+    @action(timeout=60)
+    def progress(self, steps):
+        yield from range(steps)
+
+    @action
+    def total(self, steps):
+        return steps
+
+
+def _progress_request():
+    return ActionRequestMessage(
+        widget_id="w", action_name="progress", request_id="req", args=(2,)
+    )
+
+
+def test_action_options():
+    """Test that generator actions stream and actions keep their timeout"""
+    widget = StreamingWidget()
+    assert _action_options(widget, "progress") == (True, 60)
+    assert _action_options(widget, "total") == (False, 10.0)
+
+
+async def test_stream_action_yields_lines():
+    """Test that chunks and the final response become lines of JSON"""
+    chunk = {"type": "action-chunk", "widget_id": "w", "action_name": "progress"}
+    session = _StreamingSession(
+        [
+            {**chunk, "chunk": 0},
+            {**chunk, "chunk": 1},
+            {"type": "action-response", "widget_id": "w", "action_name": "progress"},
+        ]
+    )
+
+    lines = [line async for line in _stream_action(session, _progress_request(), 5)]
+
+    messages = [json.loads(line) for line in lines]
+    assert [m["type"] for m in messages] == ["action-chunk"] * 2 + ["action-response"]
+    assert [m["chunk"] for m in messages[:2]] == [0, 1]
+    assert session.callback is None
+    assert len(session.messages) == 1
+
+
+async def test_stream_action_times_out_between_chunks():
+    """Test that a stalled stream ends with an error and cancels the action"""
+    session = _StreamingSession([])
+
+    lines = [line async for line in _stream_action(session, _progress_request(), 0.05)]
+
+    assert json.loads(lines[-1])["error"] == "Timeout waiting for action response"
+    assert session.messages[-1] == {"type": "action-cancel", "request_id": "req"}
+
+
+async def test_client_messages_ordered_per_widget():
+    """Test that a slow widget's messages do not hold up other widgets"""
+    handled = []
+    release = asyncio.Event()
+
+    async def handle(message):
+        if message["widget_id"] == "slow" and message["value"] == 0:
+            await release.wait()
+        handled.append((message["widget_id"], message["value"]))
+
+    workers = _WidgetWorkers(handle)
+    for value in range(3):
+        await workers.submit({"widget_id": "slow", "value": value})
+        await workers.submit({"widget_id": "fast", "value": value})
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert handled == [("fast", 0), ("fast", 1), ("fast", 2)]
+
+    release.set()
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert handled[3:] == [("slow", 0), ("slow", 1), ("slow", 2)]
+
+
+async def test_client_messages_push_back_when_pending():
+    """Test that reading waits while too many messages are being handled"""
+    release = asyncio.Event()
+
+    async def handle(_message):
+        await release.wait()
+
+    workers = _WidgetWorkers(handle, max_pending=2)
+    await workers.submit({"widget_id": "a"})
+    await workers.submit({"widget_id": "b"})
+    blocked = asyncio.create_task(workers.submit({"widget_id": "c"}))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    release.set()
+    await asyncio.wait_for(blocked, 1)
+    workers.cancel()
+
+
+async def test_client_messages_without_widget_wait_for_all_widgets():
+    """Test that a request for all states waits for earlier widget updates"""
+    handled = []
+    release = asyncio.Event()
+
+    async def handle(message):
+        if message.get("value") == 0:
+            await release.wait()
+        handled.append(message.get("widget_id", message["type"]))
+
+    workers = _WidgetWorkers(handle)
+    await workers.submit({"type": "widget-update", "widget_id": "a", "value": 0})
+    await workers.submit({"type": "get-widget-states"})
+    await workers.submit({"type": "widget-update", "widget_id": "b", "value": 1})
+    await asyncio.sleep(0.01)
+    assert handled == []
+
+    release.set()
+    await asyncio.wait_for(workers.wait(), 1)
+    assert handled == ["a", "get-widget-states", "b"]
+
+
+async def test_client_messages_release_slots_on_disconnect():
+    """Test that messages dropped after a disconnect give back their slots"""
+    release = asyncio.Event()
+
+    async def handle(message):
+        await release.wait()
+        if message["value"] == 0:
+            raise WebSocketDisconnect
+
+    workers = _WidgetWorkers(handle, max_pending=2)
+    await workers.submit({"widget_id": "a", "value": 0})
+    await workers.submit({"widget_id": "a", "value": 1})
+    release.set()
+    await asyncio.wait_for(workers.wait(), 1)
+    release.clear()
+    await asyncio.wait_for(workers.submit({"widget_id": "a", "value": 2}), 1)
+    await asyncio.wait_for(workers.submit({"widget_id": "b", "value": 3}), 1)
+    workers.cancel()
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from numerous.apps.backplane import (
+    BackplaneError,
+    LocalBackplane,
+    SqliteSessionDirectory,
+    UnixSocketBackplane,
+)
+
+
+async def test_sqlite_directory_is_shared_between_instances(tmp_path):
+    """Test that workers opening the same file see each other's sessions."""
+    first = SqliteSessionDirectory(tmp_path / "directory.db")
+    second = SqliteSessionDirectory(tmp_path / "directory.db")
+
+    await first.register("s1", "worker-a")
+    assert await second.lookup("s1") == "worker-a"
+
+    await second.unregister(["s1"])
+    assert await first.lookup("s1") is None
+
+
+async def test_sqlite_directory_claims_keep_first_owner(tmp_path):
+    """Test that a session is claimed once and only its owner removes it."""
+    first = SqliteSessionDirectory(tmp_path / "directory.db")
+    second = SqliteSessionDirectory(tmp_path / "directory.db")
+
+    assert await first.claim("s1", "worker-a") == "worker-a"
+    assert await second.claim("s1", "worker-b") == "worker-a"
+
+    await second.unregister(["s1"], "worker-b")
+    assert await first.lookup("s1") == "worker-a"
+    await first.unregister(["s1"], "worker-a")
+    assert await second.lookup("s1") is None
+
+
+async def _check_backplane(worker_a, worker_b):
+    received = []
+    delivered = asyncio.Event()
+
+    async def handle_a(message):
+        received.append(message)
+        delivered.set()
+        return None
+
+    async def handle_b(message):
+        return {"echo": message["value"]}
+
+    await worker_a.start("a", handle_a)
+    await worker_b.start("b", handle_b)
+    try:
+        responses = await asyncio.gather(
+            *(worker_a.request("b", {"value": i}) for i in range(20))
+        )
+        assert responses == [{"echo": i} for i in range(20)]
+
+        await worker_b.send("a", {"value": "hi"})
+        async with asyncio.timeout(1.0):
+            await delivered.wait()
+        assert received == [{"value": "hi"}]
+
+        with pytest.raises(BackplaneError):
+            await worker_a.request("missing", {})
+    finally:
+        await worker_a.close()
+        await worker_b.close()
+
+
+async def test_local_backplane():
+    """Test requests and one-way messages between workers in one process."""
+    backplane = LocalBackplane()
+    await _check_backplane(backplane, backplane)
+
+
+async def test_unix_socket_backplane(tmp_path):
+    """Test requests and one-way messages between workers over Unix sockets."""
+    await _check_backplane(
+        UnixSocketBackplane(tmp_path), UnixSocketBackplane(tmp_path)
+    )
+    assert not list(tmp_path.glob("*.sock"))
+
+
+async def test_unix_socket_backplane_large_and_ordered_frames(tmp_path):
+    """Test that large frames pass and one-way messages keep their order."""
+    worker_a, worker_b = UnixSocketBackplane(tmp_path), UnixSocketBackplane(tmp_path)
+    received = []
+
+    async def handle_a(message):
+        # Yield so that concurrently handled messages would interleave
+        await asyncio.sleep(0.001 * (message["value"] % 3))
+        received.append(message["value"])
+        return None
+
+    async def handle_b(message):
+        return {"size": len(message["data"])}
+
+    await worker_a.start("a", handle_a)
+    await worker_b.start("b", handle_b)
+    try:
+        data = "x" * 500_000
+        assert await worker_a.request("b", {"data": data}) == {"size": 500_000}
+        assert await worker_a.request("b", {"data": "small"}) == {"size": 5}
+
+        for value in range(20):
+            await worker_b.send("a", {"value": value})
+        async with asyncio.timeout(2.0):
+            while len(received) < 20:
+                await asyncio.sleep(0.01)
+        assert received == list(range(20))
+    finally:
+        await worker_a.close()
+        await worker_b.close()
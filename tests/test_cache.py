@@ -0,0 +1,199 @@
+import asyncio
+import multiprocessing
+import shutil
+import threading
+import time
+
+import numpy as np
+import pytest
+from anywidget import AnyWidget
+from traitlets import Int
+
+from numerous.apps import action
+from numerous.apps import cache as cache_module
+from numerous.apps.cache import ResultCache, cached
+from numerous.apps.datasets import DatasetRegistry
+
+
+CALLS = []
+
+
+def _square(x):
+    CALLS.append(x)
+    return x * x
+
+
+def _compute_in_child(path, queue):
+    square = cached(_square, cache=ResultCache(path))
+    queue.put((square(12), len(CALLS)))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResultCache(tmp_path / "results.db")
+    yield cache
+    cache.close()
+
+
+def test_results_are_reused(cache):
+    """Test that equal calls run once and are counted as hits."""
+    calls = []
+
+    @cached(cache=cache)
+    def total(values, scale=1):
+        calls.append(values)
+        return sum(values) * scale
+
+    assert total([1, 2, 3]) == 6
+    assert total([1, 2, 3]) == 6
+    assert total([1, 2, 3], scale=2) == 12
+    assert len(calls) == 2
+
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["entries"]) == (1, 2, 2)
+
+
+def test_results_shared_between_processes(cache):
+    """Test that a result computed in another process is found here."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_compute_in_child, args=(cache.path, queue))
+    process.start()
+    assert queue.get(timeout=30) == (144, 1)
+    process.join()
+
+    CALLS.clear()
+    assert cached(_square, cache=cache)(12) == 144
+    assert CALLS == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Test that the cache stays below its size cap by dropping old entries."""
+    cache = ResultCache(tmp_path / "results.db", max_bytes=2500)
+    cache.store("a", b"x" * 1000)
+    cache.store("b", b"x" * 1000)
+    assert cache.lookup("a")[0]
+    cache.store("c", b"x" * 1000)
+
+    assert cache.lookup("a")[0]
+    assert not cache.lookup("b")[0]
+    assert cache.metrics()["evictions"] == 1
+    assert cache.metrics()["bytes"] <= 2500
+
+    cache.store("huge", b"x" * 5000)
+    assert not cache.lookup("huge")[0]
+
+
+def test_entries_expire(cache):
+    """Test that entries are not returned after their time to live."""
+    cache.store("key", "value", ttl=0.05)
+    assert cache.lookup("key") == (True, "value")
+    time.sleep(0.1)
+    assert cache.lookup("key") == (False, None)
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_unpicklable_calls_run_uncached(cache):
+    """Test that arguments that cannot be pickled bypass the cache."""
+    calls = []
+
+    @cached(cache=cache)
+    def describe(lock):
+        calls.append(lock)
+        return "lock"
+
+    lock = threading.Lock()
+    assert describe(lock) == describe(lock) == "lock"
+    assert len(calls) == 2
+    assert cache.metrics() == {}
+
+
+def test_cache_failures_run_uncached(tmp_path):
+    """Test that a cache that cannot be opened does not break the function."""
+    square = cached(_square, cache=ResultCache(tmp_path / "missing" / "results.db"))
+    CALLS.clear()
+    assert square(3) == square(3) == 9
+    assert CALLS == [3, 3]
+
+
+def test_default_cache_survives_removed_directory(tmp_path, monkeypatch):
+    """Test that the default cache moves on when its directory is removed."""
+    monkeypatch.setattr(cache_module, "datasets", DatasetRegistry(tmp_path / "a"))
+    cache = ResultCache()
+    square = cached(_square, cache=cache)
+    assert square(4) == 16
+    cache.close()
+
+    shutil.rmtree(tmp_path / "a")
+    CALLS.clear()
+    assert square(4) == square(4) == 16
+    assert CALLS == [4]
+    cache.close()
+
+
+class Model(AnyWidget):
+    degree = Int(1).tag(sync=True)
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    @action(memoize=True, max_entries=2, invalidate_on=["degree"])
+    def fit(self, data, scale=1.0):
+        self.calls.append(data)
+        return float(np.sum(data)) * scale * self.degree
+
+    @action(memoize=True, ttl=0.05)
+    async def summary(self, name):
+        self.calls.append(name)
+        return name.upper()
+
+
+def test_memoized_action_reuses_results():
+    """Test that equal calls, also with equal arrays, run the action once."""
+    model = Model()
+    assert model.fit(np.arange(3)) == 3.0
+    assert model.fit(data=np.arange(3), scale=1.0) == 3.0
+    assert model.fit(np.arange(3), 2.0) == 6.0
+    assert len(model.calls) == 2
+
+    # Every widget, and so every session, has its own results
+    other = Model()
+    other.fit(np.arange(3))
+    assert len(other.calls) == 1
+
+
+def test_memoized_action_is_bounded_and_invalidated():
+    """Test that old results are dropped and trait changes clear the rest."""
+    model = Model()
+    for values in ([1], [2], [3]):
+        model.fit(values)
+    model.fit([1])
+    assert model.calls == [[1], [2], [3], [1]]
+
+    model.fit([3])
+    assert len(model.calls) == 4
+    model.degree = 2
+    assert model.fit([3]) == 6.0
+    assert len(model.calls) == 5
+
+
+def test_memoized_async_action_expires():
+    """Test that memoized results of async actions expire after their ttl."""
+    model = Model()
+    assert asyncio.run(model.summary("a")) == "A"
+    assert asyncio.run(model.summary("a")) == "A"
+    assert model.calls == ["a"]
+
+    time.sleep(0.1)
+    asyncio.run(model.summary("a"))
+    assert model.calls == ["a", "a"]
+
+
+def test_streaming_actions_cannot_be_memoized():
+    """Test that memoizing a generator action is rejected."""
+    with pytest.raises(TypeError):
+
+        @action(memoize=True)
+        def stream(self):
+            yield 1
@@ -152,6 +152,39 @@ def test_queue_communication_channel():
     assert channel.receive_nowait() is None
 
 
+def test_control_messages_overtake_updates():
+    """Test that messages in higher priority lanes are received first."""
+    manager = QueueCommunicationManager(Event(), Queue(), Queue())
+    for value in range(50):
+        manager.to_app_instance.send({"type": "widget-update", "value": value})
+    manager.to_app_instance.send({"type": "action-request", "request_id": "1"})
+    manager.to_app_instance.send({"type": "get-state"})
+    time.sleep(0.1)
+
+    received = [manager.to_app_instance.receive(timeout=1) for _ in range(52)]
+    assert received[0]["type"] == "get-state"
+    # Actions keep their place behind the updates the user made before them
+    assert [message.get("value") for message in received[1:]] == [
+        *range(50),
+        None,
+    ]
+    assert manager.to_app_instance.empty()
+    assert manager.to_app_instance.receive_nowait() is None
+
+
+def test_app_updates_are_bulk():
+    """Test that replies from an app overtake its own widget updates."""
+    manager = QueueCommunicationManager(Event(), Queue(), Queue())
+    manager.from_app_instance.send({"type": "widget-update", "value": 1})
+    manager.from_app_instance.send({"type": "action-response", "request_id": "1"})
+    manager.from_app_instance.send({"type": "init-config"})
+    time.sleep(0.1)
+
+    assert not manager.from_app_instance.empty()
+    received = [manager.from_app_instance.receive(timeout=1)["type"] for _ in range(3)]
+    assert received == ["init-config", "action-response", "widget-update"]
+
+
 # Test QueueCommunicationManager
 def test_queue_communication_manager():
     manager = QueueCommunicationManager(Queue(), Queue(), Event())
@@ -0,0 +1,87 @@
+import importlib.util
+import os
+import time
+
+import pytest
+
+from numerous.apps import compute
+from numerous.apps.compute import (
+    COMPUTE_ADDRESS_ENV,
+    ComputeClient,
+    ComputeService,
+    current_session,
+    submit,
+)
+
+
+def _slow_tag(tag, seconds=0.2):
+    time.sleep(seconds)
+    return tag
+
+
+def _pid(_):
+    return os.getpid()
+
+
+def _fail():
+    raise ValueError("bad input")
+
+
+@pytest.fixture
+def service():
+    service = ComputeService(processes=1)
+    service.start()
+    yield service
+    service.close()
+
+
+def test_jobs_run_in_the_pool(service):
+    """Test that submitted jobs run in a pool process and return their results."""
+    pids = [submit(_pid, i).result(timeout=60) for i in range(3)]
+    assert len(set(pids)) == 1
+    assert pids[0] != os.getpid()
+
+    with pytest.raises(ValueError, match="bad input"):
+        submit(_fail).result(timeout=30)
+    metrics = service.metrics()
+    assert (metrics["completed"], metrics["failed"]) == (3, 1)
+
+
+def test_sessions_take_turns(service):
+    """Test that a session's single job does not wait for another's backlog."""
+    client = ComputeClient(service.address, service.authkey)
+    # Warm up the pool process so job timing is not skewed by its start
+    client.submit(_slow_tag, "warm", "warm", 0).result(timeout=60)
+
+    finished = []
+    futures = [client.submit(_slow_tag, "a", f"a{i}") for i in range(5)]
+    futures.append(client.submit(_slow_tag, "b", "b0"))
+    for future in futures:
+        future.add_done_callback(lambda f: finished.append(f.result()))
+    for future in futures:
+        future.result(timeout=30)
+
+    assert finished.index("b0") < finished.index("a3")
+    client.close()
+
+
+def test_functions_from_app_modules(service, tmp_path):
+    """Test that functions of modules loaded from a file run in the pool."""
+    path = tmp_path / "app.py"
+    path.write_text("def double(x):\n    return 2 * x\n")
+    spec = importlib.util.spec_from_file_location("compute_test_app", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    token = current_session.set("session-1")
+    try:
+        assert submit(module.double, 21).result(timeout=60) == 42
+    finally:
+        current_session.reset(token)
+
+
+def test_jobs_run_in_a_thread_without_service(monkeypatch):
+    """Test that jobs still run off the caller's thread without a service."""
+    monkeypatch.delenv(COMPUTE_ADDRESS_ENV, raising=False)
+    monkeypatch.setattr(compute, "_client", None)
+    assert submit(_slow_tag, "done", 0).result(timeout=5) == "done"
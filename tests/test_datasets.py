@@ -0,0 +1,136 @@
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from numerous.apps.datasets import DATASET_DIR_ENV, DatasetRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.delenv(DATASET_DIR_ENV, raising=False)
+    registry = DatasetRegistry()
+    yield registry
+    registry.close()
+
+
+def _fail_to_load():
+    raise AssertionError("dataset loaded again instead of attached")
+
+
+def _attach_in_child(queue):
+    registry = DatasetRegistry()
+    registry.register("prices", _fail_to_load)
+    prices = registry.get("prices")
+    queue.put((float(prices.sum()), isinstance(prices, np.memmap)))
+
+
+def _count_load():
+    with (Path(os.environ[DATASET_DIR_ENV]) / "loads").open("a") as file:
+        file.write("x")
+    time.sleep(0.2)
+    return np.ones(100)
+
+
+def _get_in_child(queue):
+    registry = DatasetRegistry()
+    registry.register("prices", _count_load)
+    queue.put(float(registry.get("prices").sum()))
+
+
+def test_array_dataset_is_materialized_once(registry):
+    """Test that an array is written once and mapped read-only."""
+    loads = []
+
+    def load():
+        loads.append(1)
+        return np.arange(1000, dtype=np.float64)
+
+    registry.register("prices", load)
+    first = registry.get("prices")
+    second = registry.get("prices")
+
+    assert isinstance(first, np.memmap)
+    assert first is second
+    assert not first.flags.writeable
+    assert first.sum() == np.arange(1000).sum()
+    assert loads == [1]
+    assert registry.references("prices") == 2
+    assert registry.metrics()["prices"]["bytes"] > 8000
+
+    # Another process with the same directory attaches to the written file
+    other = DatasetRegistry()
+    other.register("prices", _fail_to_load)
+    assert not other.owner
+    assert other.get("prices")[10] == 10.0
+
+
+def test_session_process_attaches_to_dataset(registry):
+    """Test that a spawned process finds the dataset in the inherited directory."""
+    registry.register("prices", lambda: np.ones(100))
+    registry.get("prices")
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_attach_in_child, args=(queue,))
+    process.start()
+    assert queue.get(timeout=30) == (100.0, True)
+    process.join()
+
+
+def test_concurrent_processes_materialize_once(registry):
+    """Test that processes using a dataset at once load it only once."""
+    directory = registry.directory
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=_get_in_child, args=(queue,)) for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    assert [queue.get(timeout=30) for _ in processes] == [100.0] * 3
+    for process in processes:
+        process.join()
+    assert (directory / "loads").read_text() == "x"
+
+
+def test_release_and_close(registry):
+    """Test that datasets unmap without references and the owner removes files."""
+    registry.register("blob", lambda: b"raw bytes", format="raw")
+    blob = registry.get("blob")
+    assert bytes(blob[:3]) == b"raw"
+
+    registry.release("blob")
+    assert registry.references("blob") == 0
+    assert blob.closed
+
+    directory = registry.directory
+    assert registry.owner
+    registry.close()
+    assert not directory.exists()
+
+    # The registry starts over with a new directory when used again
+    assert bytes(registry.get("blob")) == b"raw bytes"
+    assert registry.directory != directory
+
+
+def test_arrow_dataset(registry):
+    """Test that a table is mapped from an Arrow IPC file."""
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"price": [1.0, 2.0, 3.0]})
+    registry.register("table", lambda: table, format="arrow")
+    assert registry.get("table").equals(table)
+
+
+def test_unknown_dataset(registry):
+    """Test that unregistered names and unknown formats are rejected."""
+    with pytest.raises(KeyError):
+        registry.get("missing")
+    with pytest.raises(ValueError):
+        registry.register("data", lambda: b"", format="csv")
+    for name in ("", "../prices", "a/b", "a\\b"):
+        with pytest.raises(ValueError):
+            registry.register(name, lambda: b"", format="raw")
@@ -0,0 +1,117 @@
+import asyncio
+
+import numpy as np
+from traitlets import Any, HasTraits, Int
+
+from numerous.apps.derived import derived
+
+
+class Inputs(HasTraits):
+    a = Int(1)
+    b = Int(2)
+
+
+class Output(HasTraits):
+    value = Any()
+
+
+def _counting(calls, name, func):
+    def compute():
+        calls.append(name)
+        return func()
+
+    return compute
+
+
+def test_values_are_computed_lazily():
+    """Test that values without a target are only computed when read."""
+    inputs, calls = Inputs(), []
+    total = derived(
+        _counting(calls, "total", lambda: inputs.a + inputs.b),
+        (inputs, "a"),
+        (inputs, "b"),
+    )
+    assert calls == []
+
+    inputs.a = 10
+    assert calls == []
+    assert total.value == 12
+    assert total.value == 12
+    assert calls == ["total"]
+
+
+def test_target_is_set_once_per_batch():
+    """Test that changes handled together recompute a target value once."""
+    inputs, output, calls = Inputs(), Output(), []
+    total = derived(lambda: inputs.a + inputs.b, (inputs, "a"), (inputs, "b"))
+    left = derived(_counting(calls, "left", lambda: total.value * 2), total)
+    right = derived(_counting(calls, "right", lambda: total.value * 3), total)
+    derived(
+        _counting(calls, "sum", lambda: left.value + right.value),
+        left,
+        right,
+        target=(output, "value"),
+    )
+    assert output.value == 15
+    calls.clear()
+
+    async def change_both():
+        inputs.a = 2
+        inputs.b = 3
+        assert output.value == 15
+        await asyncio.sleep(0)
+
+    asyncio.run(change_both())
+    assert output.value == 25
+    assert sorted(calls) == ["left", "right", "sum"]
+
+
+def test_unchanged_values_are_not_pushed():
+    """Test that a target trait is only set when its value changes."""
+    inputs, output, changes = Inputs(), Output(), []
+    output.observe(changes.append, names=["value"])
+    derived(
+        lambda: np.full(3, inputs.a % 2),
+        (inputs, "a"),
+        target=(output, "value"),
+    )
+    assert len(changes) == 1
+
+    inputs.a = 3
+    assert len(changes) == 1
+    inputs.a = 4
+    assert len(changes) == 2
+    assert output.value.tolist() == [0, 0, 0]
+
+
+def test_trait_producers_are_computed_first():
+    """Test that a value reading another's target trait sees its new value."""
+    inputs, middle, output, seen = Inputs(), Output(), Output(), []
+
+    def describe():
+        seen.append(middle.value)
+        return f"{middle.value}!"
+
+    derived(describe, (middle, "value"), target=(output, "value"))
+    derived(lambda: inputs.a * 10, (inputs, "a"), target=(middle, "value"))
+    assert output.value == "10!"
+    seen.clear()
+
+    async def change():
+        inputs.a = 5
+        await asyncio.sleep(0)
+
+    asyncio.run(change())
+    assert output.value == "50!"
+    assert seen == [50]
+
+
+def test_cycles_are_rejected(caplog):
+    """Test that values feeding each other through traits are not looped."""
+    first, second = Output(value=0), Output(value=0)
+    derived(lambda: second.value + 1, (second, "value"), target=(first, "value"))
+    derived(lambda: first.value + 1, (first, "value"), target=(second, "value"))
+
+    # Each value was computed once in the batch, then the loop was cut
+    assert "cycle" in caplog.text
+    assert (first.value, second.value) == (3, 2)
@@ -1,5 +1,8 @@
+import asyncio
+import threading
+import time
 from unittest.mock import Mock, call
-from queue import Empty
+from queue import Empty, Queue
 
 import numpy as np
 import pytest
@@ -16,8 +19,9 @@ from numerous.apps.execution import (
     _get_widget_actions,
     MessageHandler
 )
+from numerous.apps.communication import QueueCommunicationManager
 from numerous.apps.models import WidgetUpdateMessage
-from numerous.apps import action
+from numerous.apps import action, restartable
 
 class MockWidget(AnyWidget):
     test_trait = Unicode("test_value")
@@ -49,13 +53,16 @@ class CommunicationMock:
             {"type": "get_state"},
             Empty()
         ]
+        self.to_app_instance.receive_with_lane.side_effect = (
+            lambda timeout=None: (None, self.to_app_instance.receive(timeout))
+        )
 
 
 class MockCommunicationChannel:
     def __init__(self):
         self.sent_messages = []
 
-    def send(self, message):
+    def send(self, message, lane=None):
         self.sent_messages.append(message)
 
 
@@ -113,10 +120,31 @@ def test_execute_sends_initial_config():
         "widgets": ["widget1"],
         "widget_configs": _transform_widgets(widgets),
         "template": template,
+        "request_id": None,
     }
     comm_manager.from_app_instance.send.assert_any_call(expected_config)
 
 
+def test_execute_echoes_get_state_request_id():
+    """Test that the init-config reply carries the request_id of the get-state"""
+    comm_manager = CommunicationMock()
+    widgets = {"widget1": MockWidget(esm="test")}
+    comm_manager.stop_event.is_set.side_effect = [False, False, True]
+    comm_manager.to_app_instance.receive.side_effect = [
+        {"type": "get-state", "request_id": "req-1"},
+        Empty(),
+    ]
+
+    _execute(comm_manager, widgets, "")
+
+    replies = [
+        call_args[0][0]
+        for call_args in comm_manager.from_app_instance.send.call_args_list
+        if call_args[0][0].get("type") == "init-config"
+    ]
+    assert [reply["request_id"] for reply in replies] == [None, "req-1"]
+
+
 def test_execute_sets_up_observers():
     """Test that _execute sets up observers for widget traits"""
     # Arrange
@@ -170,6 +198,7 @@ def test_execute_handles_get_state_message():
         "widgets": ["widget1"],
         "widget_configs": _transform_widgets(widgets),
         "template": template,
+        "request_id": None,
     }
     
     # Both calls should be the same config message
@@ -645,3 +674,287 @@ def test_action_request_raises_exception():
     assert len(response.messages) == 1
     assert response.messages[0].error == "Test error"
     assert response.messages[0].result is None
+
+
+class AsyncWidget(MockWidget):
+    active = 0
+    most_active = 0
+
+    @action
+    async def slow_action(self, value):
+        AsyncWidget.active += 1
+        AsyncWidget.most_active = max(AsyncWidget.most_active, AsyncWidget.active)
+        await asyncio.sleep(0.2)
+        AsyncWidget.active -= 1
+        return value * 2
+
+
+def _run_app(widgets, messages, until, **kwargs):
+    """Run _execute in a thread, feed it messages and collect its output."""
+    manager = QueueCommunicationManager(threading.Event(), Queue(), Queue())
+    thread = threading.Thread(
+        target=_execute, args=(manager, widgets, ""), kwargs=kwargs
+    )
+    thread.start()
+    for message in messages:
+        manager.to_app_instance.send(message)
+    sent = []
+    try:
+        while not until(sent):
+            sent.append(manager.from_app_instance.receive(timeout=5))
+    finally:
+        manager.stop_event.set()
+        thread.join(timeout=5)
+    return sent
+
+
+def _action_request(request_id, value):
+    return {
+        "type": "action-request",
+        "widget_id": "widget1",
+        "action_name": "slow_action",
+        "args": [value],
+        "kwargs": {},
+        "client_id": "client",
+        "request_id": request_id,
+    }
+
+
+def _responses(sent):
+    return [m for m in sent if m["type"] == "action-response"]
+
+
+def test_async_action_without_loop():
+    """Test that an async action called outside the app loop still returns"""
+    handler = MessageHandler({"widget1": AsyncWidget(esm="test")}, "", {})
+
+    response = handler.handle(_action_request("req", 21))
+
+    assert response.messages[0].result == 42
+
+
+def test_async_action_does_not_block_messages():
+    """Test that messages are handled while an async action runs"""
+    sent = _run_app(
+        {"widget1": AsyncWidget(esm="test")},
+        [_action_request("req", 21), {"type": "get-state", "request_id": "state"}],
+        until=lambda sent: _responses(sent),
+    )
+
+    kinds = [(m["type"], m.get("request_id")) for m in sent]
+    assert kinds.index(("init-config", "state")) < kinds.index(
+        ("action-response", "req")
+    )
+    assert _responses(sent)[0]["result"] == 42
+
+
+def test_async_actions_limited_per_session():
+    """Test that async actions beyond the limit wait for a free slot"""
+    AsyncWidget.most_active = 0
+    sent = _run_app(
+        {"widget1": AsyncWidget(esm="test")},
+        [_action_request(f"req{i}", i) for i in range(3)],
+        until=lambda sent: len(_responses(sent)) == 3,
+        max_concurrent_actions=2,
+    )
+
+    assert sorted(m["result"] for m in _responses(sent)) == [0, 2, 4]
+    assert AsyncWidget.most_active == 2
+
+
+def test_async_observer_runs_on_app_loop():
+    """Test that observers defined with async def run as tasks"""
+    widget = MockWidget(esm="test")
+
+    async def on_change(change):
+        await asyncio.sleep(0)
+        widget.number_trait = len(change.new)
+
+    widget.observe(on_change, names=["test_trait"])
+    sent = _run_app(
+        {"widget1": widget},
+        [
+            {
+                "type": "widget-update",
+                "widget_id": "widget1",
+                "property": "test_trait",
+                "value": "four",
+            }
+        ],
+        until=lambda sent: any(m.get("property") == "number_trait" for m in sent),
+    )
+
+    assert widget.number_trait == 4
+    assert sent[-1]["value"] == 4
+
+    # The wrapped observer is still found by unobserve
+    widget.unobserve(on_change, names=["test_trait"])
+    assert on_change not in widget._trait_notifiers["test_trait"]["change"]
+    assert len(widget._trait_notifiers["test_trait"]["change"]) == 1
+
+
+def test_app_loop_handles_control_messages_first():
+    """Test that a state request overtakes updates waiting behind a slow one"""
+    widget = MockWidget(esm="test")
+    busy = threading.Event()
+    changes = []
+
+    def on_change(change):
+        busy.set()
+        time.sleep(0.05)
+        changes.append(change.new)
+
+    widget.observe(on_change, names=["number_trait"])
+    manager = QueueCommunicationManager(threading.Event(), Queue(), Queue())
+    thread = threading.Thread(target=_execute, args=(manager, {"widget1": widget}, ""))
+    thread.start()
+    try:
+        assert manager.from_app_instance.receive(timeout=5)["type"] == "init-config"
+        for value in range(1, 41):
+            manager.to_app_instance.send(
+                {
+                    "type": "widget-update",
+                    "widget_id": "widget1",
+                    "property": "number_trait",
+                    "value": value,
+                }
+            )
+            # Each update reaches the app thread before the next is sent
+            if value == 1:
+                assert busy.wait(timeout=5)
+            time.sleep(0.001)
+        manager.to_app_instance.send({"type": "get-state", "request_id": "state"})
+        message = manager.from_app_instance.receive(timeout=5)
+        while message.get("request_id") != "state":
+            message = manager.from_app_instance.receive(timeout=5)
+        assert len(changes) < 5
+    finally:
+        manager.stop_event.set()
+        thread.join(timeout=10)
+
+
+class RestartableWidget(MockWidget):
+    @action
+    @restartable
+    async def search(self, query):
+        await asyncio.sleep(0.2)
+        return query.upper()
+
+
+def _search_request(request_id, query):
+    return {
+        "type": "action-request",
+        "widget_id": "widget1",
+        "action_name": "search",
+        "args": [query],
+        "kwargs": {},
+        "client_id": "client",
+        "request_id": request_id,
+    }
+
+
+def test_restartable_action_cancels_superseded_calls():
+    """Test that a new call of a restartable action cancels the running one"""
+    sent = _run_app(
+        {"widget1": RestartableWidget(esm="test")},
+        [_search_request(f"req{i}", query) for i, query in enumerate("abc")],
+        until=lambda sent: len(_responses(sent)) == 3,
+    )
+
+    responses = {m["request_id"]: m for m in _responses(sent)}
+    assert responses["req0"]["error"] == "Action cancelled"
+    assert responses["req1"]["error"] == "Action cancelled"
+    assert responses["req2"]["result"] == "C"
+
+
+def test_action_cancel_message():
+    """Test that an action-cancel message stops the running action"""
+    sent = _run_app(
+        {"widget1": AsyncWidget(esm="test")},
+        [
+            _action_request("req", 1),
+            {"type": "action-cancel", "request_id": "req"},
+        ],
+        until=lambda sent: _responses(sent),
+    )
+
+    assert _responses(sent)[0]["error"] == "Action cancelled"
+
+
+def test_restartable_observer_only_finishes_latest_change():
+    """Test that superseded runs of a restartable observer are cancelled"""
+    widget = MockWidget(esm="test")
+    finished = []
+
+    @restartable
+    async def on_change(change):
+        await asyncio.sleep(0.2)
+        finished.append(change.new)
+        widget.number_trait = len(finished)
+
+    widget.observe(on_change, names=["test_trait"])
+    updates = [
+        {
+            "type": "widget-update",
+            "widget_id": "widget1",
+            "property": "test_trait",
+            "value": value,
+        }
+        for value in ("a", "ab", "abc")
+    ]
+    _run_app(
+        {"widget1": widget},
+        updates,
+        until=lambda sent: any(m.get("property") == "number_trait" for m in sent),
+    )
+
+    assert finished == ["abc"]
+
+
+class StreamingWidget(MockWidget):
+    @action
+    def count(self, n):
+        for i in range(n):
+            yield i
+
+    @action
+    async def count_async(self, n):
+        for i in range(n):
+            await asyncio.sleep(0)
+            yield i
+
+
+def _stream_request(action_name, n):
+    return {
+        "type": "action-request",
+        "widget_id": "widget1",
+        "action_name": action_name,
+        "args": [n],
+        "kwargs": {},
+        "client_id": "client",
+        "request_id": action_name,
+    }
+
+
+@pytest.mark.parametrize("action_name", ["count", "count_async"])
+def test_streaming_action_sends_chunks(action_name):
+    """Test that each chunk a generator action yields is sent as it comes"""
+    sent = _run_app(
+        {"widget1": StreamingWidget(esm="test")},
+        [_stream_request(action_name, 3)],
+        until=lambda sent: _responses(sent),
+    )
+
+    chunks = [m["chunk"] for m in sent if m["type"] == "action-chunk"]
+    assert chunks == [0, 1, 2]
+    assert sent[-1]["type"] == "action-response"
+    assert sent[-1]["error"] is None
+
+
+def test_streaming_action_without_loop():
+    """Test that the chunks are collected when no loop streams them"""
+    handler = MessageHandler({"widget1": StreamingWidget(esm="test")}, "", {})
+
+    response = handler.handle(_stream_request("count_async", 3))
+
+    assert response.messages[0].result == [0, 1, 2]
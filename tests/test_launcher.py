@@ -0,0 +1,128 @@
+import asyncio
+from collections import Counter
+
+from numerous.apps.launcher import (
+    SessionRouter,
+    rendezvous_worker,
+    session_id_from_target,
+)
+from numerous.apps.session_management import GlobalSessionManager
+
+
+def test_rendezvous_hashing_spreads_and_keeps_keys():
+    """Test that keys spread over workers and only move off a removed worker."""
+    keys = [f"session-{i}" for i in range(2000)]
+    four = {key: rendezvous_worker(key, 4) for key in keys}
+    three = {key: rendezvous_worker(key, 3) for key in keys}
+
+    counts = Counter(four.values())
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > 350
+
+    moved = [key for key in keys if four[key] != three[key]]
+    assert all(four[key] == 3 for key in moved)
+
+
+def test_session_id_from_target():
+    """Test extracting session ids from query strings and WebSocket paths."""
+    assert session_id_from_target("/api/widgets?session_id=abc") == "abc"
+    assert (
+        session_id_from_target(
+            "/api/widgets?session_id=undefined&speculative_session_id=spec"
+        )
+        == "spec"
+    )
+    assert session_id_from_target("/app1/ws/client-1/abc") == "abc"
+    assert session_id_from_target("/ws/client-1/abc?token=x") == "abc"
+    assert session_id_from_target("/api/widgets?session_id=null") is None
+    assert session_id_from_target("/?broadcast=lecture") == "broadcast-lecture"
+    assert session_id_from_target("/static/numerous.js") is None
+
+
+def test_new_session_ids_satisfy_filter():
+    """Test that minted session ids hash to the worker that created them."""
+    manager = GlobalSessionManager(
+        accept_session_id=lambda session_id: rendezvous_worker(session_id, 4) == 2
+    )
+    for _ in range(20):
+        assert rendezvous_worker(manager.new_session_id(), 4) == 2
+
+
+async def _start_worker(name, path, heads):
+    async def handle(reader, writer):
+        head = await reader.readuntil(b"\r\n\r\n")
+        heads.append((name, head))
+        body = name.encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+        )
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_unix_server(handle, path=str(path))
+
+
+async def _get(port, target, headers=b""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET " + target.encode() + b" HTTP/1.1\r\nHost: x\r\n" + headers)
+    writer.write(b"\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response.rsplit(b"\r\n\r\n", 1)[1].decode()
+
+
+async def test_router_forwards_sessions_to_their_worker(tmp_path):
+    """Test that requests of a session reach the worker its id hashes to."""
+    sockets = [tmp_path / f"w{i}.sock" for i in range(3)]
+    heads = []
+    workers = [
+        await _start_worker(f"w{i}", path, heads) for i, path in enumerate(sockets)
+    ]
+    router = SessionRouter(sockets)
+    server = await asyncio.start_server(router.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        for session_id in ("alpha", "beta", "gamma", "delta"):
+            expected = f"w{rendezvous_worker(session_id, 3)}"
+            assert await _get(port, f"/api/widgets?session_id={session_id}") == (
+                expected
+            )
+            assert await _get(port, f"/ws/client/{session_id}") == expected
+
+        # Plain requests are closed after one response, upgrades are left alone
+        await _get(port, "/", b"Connection: keep-alive\r\n")
+        await _get(
+            port, "/ws/c/alpha", b"Connection: Upgrade\r\nUpgrade: websocket\r\n"
+        )
+        assert b"Connection: close" in heads[-2][1]
+        assert b"keep-alive" not in heads[-2][1]
+        assert b"Connection: Upgrade" in heads[-1][1]
+
+        # Workers learn the client's address, not one the client made up
+        await _get(port, "/", b"X-Forwarded-For: 10.0.0.1\r\n")
+        assert b"X-Forwarded-For: 127.0.0.1" in heads[-1][1]
+        assert b"10.0.0.1" not in heads[-1][1]
+
+        # Requests without a session are spread over all workers
+        served = {await _get(port, "/") for _ in range(3)}
+        assert served == {"w0", "w1", "w2"}
+    finally:
+        server.close()
+        for worker in workers:
+            worker.close()
+
+
+async def test_router_reports_unreachable_worker(tmp_path):
+    """Test that the router answers 502 when a worker socket is missing."""
+    router = SessionRouter([tmp_path / "missing.sock"])
+    server = await asyncio.start_server(router.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET / HTTP/1.1\r\nHost: x\r\n\r\n")
+        await writer.drain()
+        assert (await reader.read()).startswith(b"HTTP/1.1 502")
+        writer.close()
+    finally:
+        server.close()
@@ -0,0 +1,186 @@
+import socket
+import time
+from queue import Empty
+
+import pytest
+
+from numerous.apps.communication import Lane
+from numerous.apps.remote import (
+    LocalWorkerPool,
+    RemoteExecutionManager,
+    RemoteWorkerPool,
+    WorkerDaemon,
+    _connect,
+)
+
+
+AUTHKEY = b"test-key"
+
+
+def _echo_app(session_id, base_dir, module_path, template, app_id, communication):
+    communication.from_app_instance.send({"type": "init-config", "app_id": app_id})
+    while not communication.stop_event.is_set():
+        try:
+            message = communication.to_app_instance.receive(timeout=0.05)
+        except Empty:
+            continue
+        communication.from_app_instance.send({"echo": message, "session": session_id})
+
+
+
+def _lane_app(session_id, base_dir, module_path, template, app_id, communication):
+    while not communication.stop_event.is_set():
+        try:
+            lane, message = communication.to_app_instance.receive_with_lane(0.05)
+        except Empty:
+            continue
+        communication.from_app_instance.send({"lane": lane, "echo": message})
+
+
+@pytest.fixture
+def daemons(tmp_path):
+    started = []
+
+    def start(name, max_sessions=None, target=_echo_app):
+        daemon = WorkerDaemon(
+            str(tmp_path / f"{name}.sock"),
+            AUTHKEY,
+            max_sessions=max_sessions,
+            allow_threaded=True,
+            target=target,
+        )
+        daemon.start()
+        started.append(daemon)
+        return daemon
+
+    yield start
+    for daemon in started:
+        daemon.close()
+
+
+def _start_session(pool, session_id):
+    manager = RemoteExecutionManager(pool, session_id)
+    manager.start("base", "module.py", "index.html", "app")
+    return manager
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.02)
+
+
+def test_remote_session_relays_messages(daemons):
+    """Test that a session on a worker receives and answers messages."""
+    daemon = daemons("worker")
+    manager = _start_session(RemoteWorkerPool([daemon.address], AUTHKEY), "s1")
+    channel = manager.communication_manager.from_app_instance
+
+    assert channel.receive(timeout=5) == {"type": "init-config", "app_id": "app"}
+    manager.communication_manager.to_app_instance.send({"value": 1})
+    assert channel.receive(timeout=5) == {"echo": {"value": 1}, "session": "s1"}
+    assert manager.is_connected()
+
+    manager.request_stop()
+    _wait_for(lambda: not manager.is_connected())
+    _wait_for(lambda: daemon.load()["sessions"] == 0)
+
+
+def test_remote_session_keeps_message_lanes(daemons):
+    """Test that a lane chosen by the sender reaches the app on the worker."""
+    daemon = daemons("worker", target=_lane_app)
+    manager = _start_session(RemoteWorkerPool([daemon.address], AUTHKEY), "s1")
+    communication = manager.communication_manager
+
+    communication.to_app_instance.send({"type": "widget-update"}, lane=Lane.CONTROL)
+    communication.to_app_instance.send({"type": "widget-update"})
+    lanes = [communication.from_app_instance.receive(timeout=5)["lane"] for _ in "ab"]
+    assert lanes == [Lane.CONTROL, Lane.INTERACTIVE]
+
+    manager.request_stop()
+    _wait_for(lambda: not manager.is_connected())
+
+
+def test_pool_starts_sessions_on_least_loaded_worker(daemons):
+    """Test that sessions are spread over workers by their load."""
+    first, second = daemons("first"), daemons("second")
+    pool = RemoteWorkerPool([first.address, second.address], AUTHKEY)
+
+    managers = [_start_session(pool, f"s{i}") for i in range(4)]
+    assert first.load()["sessions"] == 2
+    assert second.load()["sessions"] == 2
+
+    for manager in managers[:2]:
+        manager.request_stop()
+    _wait_for(lambda: first.load()["sessions"] + second.load()["sessions"] == 2)
+    managers.append(_start_session(pool, "s4"))
+    assert first.load()["sessions"] + second.load()["sessions"] == 3
+    assert abs(first.load()["sessions"] - second.load()["sessions"]) <= 1
+
+    for manager in managers[2:]:
+        manager.request_stop()
+
+
+def test_pool_skips_unreachable_and_full_workers(daemons, tmp_path):
+    """Test that sessions start on a worker with room, or fail when none has."""
+    daemon = daemons("small", max_sessions=1)
+    pool = RemoteWorkerPool([str(tmp_path / "missing.sock"), daemon.address], AUTHKEY)
+
+    assert pool.load()[0][1] is None
+    manager = _start_session(pool, "s1")
+    assert daemon.load()["sessions"] == 1
+
+    with pytest.raises(RuntimeError):
+        _start_session(pool, "s2")
+
+    manager.request_stop()
+    _wait_for(lambda: daemon.load()["sessions"] == 0)
+
+
+def test_pool_does_not_wait_on_silent_workers(daemons, tmp_path):
+    """Test that a worker accepting but never answering costs only a timeout."""
+    daemon = daemons("answering")
+    silent = socket.socket(socket.AF_UNIX)
+    silent.bind(str(tmp_path / "silent.sock"))
+    silent.listen()
+    try:
+        pool = RemoteWorkerPool([str(tmp_path / "silent.sock"), daemon.address], AUTHKEY)
+        started = time.monotonic()
+        with pytest.raises(OSError):
+            _connect(str(tmp_path / "silent.sock"), AUTHKEY, timeout=0.2)
+        assert time.monotonic() - started < 2
+
+        manager = _start_session(pool, "s1")
+        assert daemon.load()["sessions"] == 1
+        manager.request_stop()
+    finally:
+        silent.close()
+
+
+def _pid_app(session_id, base_dir, module_path, template, app_id, communication):
+    import os
+
+    communication.from_app_instance.send({"pid": os.getpid()})
+    communication.stop_event.wait()
+
+
+def test_local_pool_hosts_many_sessions_per_process():
+    """Test that sessions share a few host processes, spread by load."""
+    pool = LocalWorkerPool(processes=2, target=_pid_app)
+    pool.start()
+    try:
+        managers = [_start_session(pool, f"s{i}") for i in range(6)]
+        pids = [
+            manager.communication_manager.from_app_instance.receive(timeout=10)["pid"]
+            for manager in managers
+        ]
+        assert len(set(pids)) == 2
+        assert sorted(load["sessions"] for _, load in pool.load()) == [3, 3]
+
+        for manager in managers:
+            manager.request_stop()
+        _wait_for(lambda: all(load["sessions"] == 0 for _, load in pool.load()))
+    finally:
+        pool.close()
+    assert pool.addresses == []
@@ -0,0 +1,142 @@
+import asyncio
+
+from anywidget import AnyWidget
+from fastapi.testclient import TestClient
+
+from numerous.apps import create_app
+from numerous.apps.resource_hints import (
+    EARLY_HINT_EXTENSION,
+    EarlyHintsMiddleware,
+    ResourceHint,
+    collect_widget_assets,
+    format_link_header,
+    widget_asset_hash,
+)
+
+
+WIDGET_ESM = "export default { render({ el }) { el.textContent = 'hi'; } };"
+
+
+class InlineWidget(AnyWidget):
+    _esm = WIDGET_ESM
+
+
+class RemoteWidget(AnyWidget):
+    _esm = "https://cdn.example.com/widget.js"
+
+
+def test_resource_hint_formatting():
+    """Test that hints render as Link header values and HTML tags."""
+    style = ResourceHint("/numerous-static/css/numerous-base.css", as_="style")
+    module = ResourceHint("/numerous-assets/abc.js", rel="modulepreload")
+
+    assert style.to_html() == (
+        '<link rel="preload" href="/numerous-static/css/numerous-base.css" as="style">'
+    )
+    assert format_link_header([style, module]) == (
+        "</numerous-static/css/numerous-base.css>; rel=preload; as=style, "
+        "</numerous-assets/abc.js>; rel=modulepreload"
+    )
+
+
+def test_collect_widget_assets_skips_urls():
+    """Test that only inline widget modules are addressed by content hash."""
+    assets = collect_widget_assets({"inline": InlineWidget(), "remote": RemoteWidget()})
+
+    assert assets == {widget_asset_hash(WIDGET_ESM): WIDGET_ESM}
+
+
+def _run_middleware(extensions, path="/"):
+    sent = []
+
+    async def inner_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = EarlyHintsMiddleware(
+        inner_app, hints=lambda: [ResourceHint("/numerous.js", as_="script")]
+    )
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "root_path": "",
+        "extensions": extensions,
+    }
+    asyncio.run(middleware(scope, None, send))
+    return sent
+
+
+def test_early_hints_sent_when_supported():
+    """Test that a 103 response precedes the page when the server supports it."""
+    sent = _run_middleware({EARLY_HINT_EXTENSION: {}})
+
+    assert sent[0] == {
+        "type": EARLY_HINT_EXTENSION,
+        "links": [b"</numerous.js>; rel=preload; as=script"],
+    }
+    assert sent[1]["type"] == "http.response.start"
+
+
+def test_early_hints_skipped_when_unsupported():
+    """Test that requests pass through when the extension is not advertised."""
+    assert [m["type"] for m in _run_middleware({})] == ["http.response.start"]
+    sent = _run_middleware({EARLY_HINT_EXTENSION: {}}, path="/api/widgets")
+    assert [m["type"] for m in sent] == ["http.response.start"]
+
+
+def app_generator():
+    return {"inline": InlineWidget()}
+
+
+def test_home_page_preloads_assets(tmp_path):
+    """Test that the home page hints its assets and serves widget modules."""
+    (tmp_path / "index.html.j2").write_text(
+        "<html><head></head><body>{{ inline }}</body></html>"
+    )
+    app = create_app(
+        template="index.html.j2",
+        app_generator=app_generator,
+        allow_threaded=True,
+        base_dir=tmp_path,
+    )
+    client = TestClient(app)
+    asset_url = f"/numerous-assets/{widget_asset_hash(WIDGET_ESM)}.js"
+
+    response = client.get("/")
+    assert "</numerous.js>; rel=preload; as=script" in response.headers["link"]
+    assert f"<{asset_url}>; rel=modulepreload" in response.headers["link"]
+    assert f'<link rel="modulepreload" href="{asset_url}">' in response.text
+
+    asset = client.get(asset_url)
+    assert asset.status_code == 200
+    assert asset.text == WIDGET_ESM
+    assert "immutable" in asset.headers["cache-control"]
+    assert client.get("/numerous-assets/unknown.js").status_code == 404
+
+    widgets = client.get("/api/widgets", params={"session_id": "undefined"}).json()
+    assert widgets["widgets"]["inline"]["moduleUrl"] == asset_url
+
+
+def test_resource_hints_disabled(tmp_path):
+    """Test that hints and module URL rewriting can be turned off."""
+    (tmp_path / "index.html.j2").write_text(
+        "<html><head></head><body>{{ inline }}</body></html>"
+    )
+    app = create_app(
+        template="index.html.j2",
+        app_generator=app_generator,
+        allow_threaded=True,
+        base_dir=tmp_path,
+        resource_hints=False,
+    )
+    client = TestClient(app)
+
+    response = client.get("/")
+    assert "link" not in response.headers
+    assert "modulepreload" not in response.text
+
+    widgets = client.get("/api/widgets", params={"session_id": "undefined"}).json()
+    assert widgets["widgets"]["inline"]["moduleUrl"] == WIDGET_ESM
@@ -41,7 +41,7 @@ class MockCommunicationChannel:
             raise Empty()
         return self._queue.pop(0)
 
-    def send(self, message: dict[str, Any]) -> None:
+    def send(self, message: dict[str, Any], lane=None) -> None:
         """Send implementation."""
         self.sent_messages.append(message)
 
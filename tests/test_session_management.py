@@ -1,6 +1,7 @@
 """Tests for session management module."""
 
 import asyncio
+import heapq
 import time
 from typing import Any, AsyncGenerator
 from unittest.mock import AsyncMock, Mock, patch
@@ -42,7 +43,7 @@ class MockCommunicationChannel:
             raise asyncio.QueueEmpty()
         return self._queue.pop(0)
 
-    def send(self, message: dict[str, Any]) -> None:
+    def send(self, message: dict[str, Any], lane=None) -> None:
         """Send implementation."""
         self.sent_messages.append(message)
 
@@ -67,6 +68,11 @@ class MockExecutionManager:
             stop_event=asyncio.Event()
         )
         self.started = False
+        self.stop_requested = False
+
+    def request_stop(self) -> None:
+        """Record that the app instance was asked to stop."""
+        self.stop_requested = True
 
     def start(self, *args: Any, **kwargs: Any) -> None:
         """Start the mock execution manager."""
@@ -188,4 +194,305 @@ async def test_global_manager_session_lifecycle(global_manager: GlobalSessionMan
     except asyncio.TimeoutError:
         logger.warning("Timeout while removing session")
     
-    assert not global_manager.has_session(session_id) 
\ No newline at end of file
+    assert not global_manager.has_session(session_id) 
+
+@pytest.mark.asyncio
+async def test_callbacks_dispatched_by_message_type(session_manager: SessionManager) -> None:
+    """Test that callbacks only receive their message types, wildcards receive all."""
+    typed: list[dict[str, Any]] = []
+    wildcard: list[dict[str, Any]] = []
+    done = asyncio.Event()
+
+    async def typed_callback(message: dict[str, Any]) -> None:
+        typed.append(message)
+
+    async def wildcard_callback(message: dict[str, Any]) -> None:
+        wildcard.append(message)
+        if len(wildcard) == 2:
+            done.set()
+
+    typed_handle = session_manager.register_callback(
+        typed_callback, message_types=[MessageType.ACTION_RESPONSE]
+    )
+    session_manager.register_callback(wildcard_callback)
+
+    channel = session_manager._execution_manager.from_app_instance
+    channel.put_message({"type": "init-config"})
+    channel.put_message({"type": "action-response"})
+    async with asyncio.timeout(1.0):
+        await done.wait()
+
+    assert [m["type"] for m in typed] == ["action-response"]
+    assert [m["type"] for m in wildcard] == ["init-config", "action-response"]
+
+    session_manager.deregister_callback(typed_handle)
+    assert MessageType.ACTION_RESPONSE.value not in session_manager._callback_index
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_resolved_by_request_id(
+    session_manager: SessionManager,
+) -> None:
+    """Test that replies resolve their own request even when they arrive out of order."""
+    first = asyncio.create_task(
+        session_manager.send(
+            {"type": "action-request", "request_id": "first"},
+            wait_for_response=True,
+            timeout_seconds=1.0,
+            message_types=[MessageType.ACTION_RESPONSE],
+        )
+    )
+    second = asyncio.create_task(
+        session_manager.send(
+            {"type": "action-request", "request_id": "second"},
+            wait_for_response=True,
+            timeout_seconds=1.0,
+            message_types=[MessageType.ACTION_RESPONSE],
+        )
+    )
+    await asyncio.sleep(0)
+
+    channel = session_manager._execution_manager.from_app_instance
+    channel.put_message({"type": "action-response", "request_id": "unrelated"})
+    channel.put_message({"type": "action-response", "request_id": "second"})
+    channel.put_message({"type": "action-response", "request_id": "first"})
+
+    assert (await first)["request_id"] == "first"
+    assert (await second)["request_id"] == "second"
+    assert not session_manager._pending_requests
+
+
+@pytest.mark.asyncio
+async def test_uncorrelated_reply_resolves_oldest_request(
+    session_manager: SessionManager,
+) -> None:
+    """Test that a reply without request_id resolves the oldest matching request."""
+    request = asyncio.create_task(
+        session_manager.send(
+            {"type": "get-state"},
+            wait_for_response=True,
+            timeout_seconds=1.0,
+            message_types=[MessageType.INIT_CONFIG, MessageType.ERROR],
+        )
+    )
+    await asyncio.sleep(0)
+
+    sent = session_manager._execution_manager.to_app_instance.sent_messages
+    assert sent[-1]["request_id"]
+
+    session_manager._execution_manager.from_app_instance.put_message(
+        {"type": "init-config", "widgets": []}
+    )
+    assert (await request)["type"] == "init-config"
+
+
+@pytest.mark.asyncio
+async def test_request_timeout_clears_pending(session_manager: SessionManager) -> None:
+    """Test that a timed out request does not linger in the pending map."""
+    with pytest.raises(TimeoutError):
+        await session_manager.send(
+            {"type": "get-state"},
+            wait_for_response=True,
+            timeout_seconds=0.05,
+            message_types=[MessageType.INIT_CONFIG],
+        )
+    assert not session_manager._pending_requests
+    assert not session_manager._pending_index
+
+
+@pytest.mark.asyncio
+async def test_send_timeouts_do_not_spawn_tasks(session_manager: SessionManager) -> None:
+    """Test that 10,000 requests with timeouts leave no tasks or timers behind."""
+    tasks_before = len(asyncio.all_tasks())
+
+    async def callback(message: dict[str, Any]) -> None:
+        pass
+
+    for _ in range(10_000):
+        await session_manager.send(
+            {"type": "get-state"}, callback=callback, timeout_seconds=60
+        )
+    assert len(asyncio.all_tasks()) == tasks_before
+
+    # Deregistering a callback cancels its deadline timer
+    for handle in list(session_manager._callback_deadlines):
+        session_manager.deregister_callback(handle)
+    assert not session_manager._callback_deadlines
+    assert not session_manager._callbacks
+
+    async def respond() -> None:
+        to_app = session_manager._execution_manager.to_app_instance
+        from_app = session_manager._execution_manager.from_app_instance
+        while len(to_app.sent_messages) < 20_000:
+            await asyncio.sleep(0)
+        for request in to_app.sent_messages[10_000:]:
+            from_app.put_message({**request, "type": "action-response"})
+
+    responder = asyncio.create_task(respond())
+    responses = await asyncio.gather(
+        *(
+            session_manager.send(
+                {"type": "action-request", "request_id": str(i)},
+                wait_for_response=True,
+                timeout_seconds=60,
+                message_types=[MessageType.ACTION_RESPONSE],
+            )
+            for i in range(10_000)
+        )
+    )
+    await responder
+
+    assert [r["request_id"] for r in responses] == [str(i) for i in range(10_000)]
+    assert not session_manager._pending_requests
+    assert len(asyncio.all_tasks()) == tasks_before
+
+
+@pytest.mark.asyncio
+async def test_global_manager_expiry_uses_latest_activity() -> None:
+    """Test that expiry skips sessions with newer activity and keeps them indexed."""
+    manager = GlobalSessionManager(session_timeout=10.0)
+    now = time.time()
+    for name in ("idle", "touched", "busy"):
+        manager.create_session(SessionId(name), MockExecutionManager())
+        manager.sessions[SessionId(name)].last_active = now - 60
+        manager.get_session(SessionId(name)).last_activity_time = now - 60
+    manager._expiry_heap = [(now - 60, sid) for sid in sorted(manager.sessions)]
+
+    manager.touch(SessionId("touched"))
+    manager.get_session(SessionId("busy")).last_activity_time = now
+
+    assert manager.expired_sessions(now) == [SessionId("idle")]
+    # Kept sessions are re-queued with their new activity time
+    assert sorted(sid for _, sid in manager._expiry_heap) == ["busy", "touched"]
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_global_manager_evicts_least_recently_active_over_limit() -> None:
+    """Test that sessions above max_sessions are evicted oldest activity first."""
+    manager = GlobalSessionManager(
+        session_timeout=3600.0, max_sessions=2, overflow_session_timeout=600.0
+    )
+    now = time.time()
+    for age, name in ((30, "old"), (20, "middle"), (10, "new")):
+        manager.create_session(SessionId(name), MockExecutionManager())
+        manager.sessions[SessionId(name)].last_active = now - age
+        manager.get_session(SessionId(name)).last_activity_time = now - age
+    manager._expiry_heap = [
+        (info.activity_time(), sid) for sid, info in manager.sessions.items()
+    ]
+    heapq.heapify(manager._expiry_heap)
+
+    assert manager.expired_sessions(now) == [SessionId("old")]
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_global_manager_teardown_stops_app_instances() -> None:
+    """Test that removing sessions stops them and their app instances."""
+    manager = GlobalSessionManager()
+    execution_managers = [MockExecutionManager() for _ in range(3)]
+    for i, execution_manager in enumerate(execution_managers):
+        manager.create_session(SessionId(f"s{i}"), execution_manager)
+    await asyncio.sleep(0)
+
+    await manager.remove_session(SessionId("s0"))
+    assert not manager.has_session(SessionId("s0"))
+    assert execution_managers[0].stop_requested
+
+    async with asyncio.timeout(1.0):
+        await manager.shutdown()
+    assert not manager.sessions
+    assert all(em.stop_requested for em in execution_managers)
+
+
+def _booted_execution_manager() -> MockExecutionManager:
+    """Return a mock app instance that has sent its initial config."""
+    execution_manager = MockExecutionManager()
+    execution_manager.from_app_instance.put_message(
+        {"type": MessageType.INIT_CONFIG.value, "widgets": []}
+    )
+    return execution_manager
+
+
+@pytest.mark.asyncio
+async def test_session_hibernates_and_rehydrates_widget_state(
+    session_id: SessionId,
+) -> None:
+    """Test that a woken session replays its widget state into a new app instance."""
+    first = MockExecutionManager()
+    respawned: list[MockExecutionManager] = []
+
+    def respawn() -> MockExecutionManager:
+        respawned.append(_booted_execution_manager())
+        return respawned[-1]
+
+    session = SessionManager(session_id, first, respawn=respawn)  # type: ignore[arg-type]
+    await session.start()
+    received: list[dict[str, Any]] = []
+
+    async def callback(message: dict[str, Any]) -> None:
+        received.append(message)
+
+    session.register_callback(callback, [MessageType.WIDGET_UPDATE])
+    session._update_widget_state(WidgetId("slider"), PropertyName("value"), 7)
+
+    assert await session.hibernate()
+    assert session.hibernated
+    assert session.is_active()
+    assert first.stop_requested
+    assert not await session.hibernate()
+
+    async with asyncio.timeout(2.0):
+        await session.send({"type": "action-request", "widget_id": "slider"})
+
+    assert not session.hibernated
+    assert len(respawned) == 1
+    sent = respawned[0].to_app_instance.sent_messages
+    assert [(m["widget_id"], m["property"], m["value"]) for m in sent[:-1]] == [
+        ("slider", "value", 7)
+    ]
+    assert sent[-1]["type"] == "action-request"
+
+    # Client callbacks survive hibernation
+    update = {
+        "type": MessageType.WIDGET_UPDATE.value,
+        "widget_id": "slider",
+        "property": "value",
+        "value": 8,
+    }
+    respawned[0].from_app_instance.put_message(update)
+    async with asyncio.timeout(1.0):
+        while not received:
+            await asyncio.sleep(0.01)
+    assert received == [update]
+    await session.stop()
+
+
+@pytest.mark.asyncio
+async def test_global_manager_hibernates_idle_sessions() -> None:
+    """Test that only idle, respawnable sessions hibernate and re-queue on wake."""
+    manager = GlobalSessionManager(hibernate_after=60.0)
+    manager.create_session(
+        SessionId("idle"), MockExecutionManager(), respawn=_booted_execution_manager
+    )
+    manager.create_session(
+        SessionId("recent"), MockExecutionManager(), respawn=_booted_execution_manager
+    )
+    manager.create_session(SessionId("fixed"), MockExecutionManager())
+    await asyncio.sleep(0)
+    later = time.time() + 30
+    manager.touch(SessionId("recent"))
+    manager.get_session(SessionId("recent")).last_activity_time = later
+
+    assert len(manager._hibernation_heap) == 2
+    assert await manager.hibernate_idle_sessions(later + 45) == 1
+    assert manager.get_session(SessionId("idle")).hibernated
+    assert manager.hibernated_count() == 1
+    assert [sid for _, sid in manager._hibernation_heap] == ["recent"]
+
+    async with asyncio.timeout(2.0):
+        await manager.get_session(SessionId("idle")).wake()
+    assert manager.hibernated_count() == 0
+    assert sorted(sid for _, sid in manager._hibernation_heap) == ["idle", "recent"]
+    await manager.shutdown()
@@ -0,0 +1,89 @@
+import pytest
+
+from numerous.apps.session_store import (
+    SessionStateWriter,
+    SqliteSessionStateStore,
+    StateUpdate,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteSessionStateStore(tmp_path / "sessions.db")
+    yield store
+    store.close()
+
+
+def test_sqlite_store_round_trip(store):
+    """Test that saved values are loaded per widget and later saves replace them."""
+    store.save(
+        [
+            StateUpdate("s1", "slider", "value", 3, 1.0),
+            StateUpdate("s1", "table", "rows", [{"a": 1}], 1.0),
+            StateUpdate("s2", "slider", "value", 9, 1.0),
+        ]
+    )
+    store.save([StateUpdate("s1", "slider", "value", 4, 2.0)])
+
+    assert store.load("s1") == {"slider": {"value": 4}, "table": {"rows": [{"a": 1}]}}
+    assert store.load("missing") is None
+
+    store.delete(["s1"])
+    assert store.load("s1") is None
+    assert store.load("s2") == {"slider": {"value": 9}}
+
+
+def test_sqlite_store_skips_unserializable_values(store):
+    """Test that a value that cannot be stored does not block the others."""
+    store.save(
+        [
+            StateUpdate("s1", "w", "bad", object(), 1.0),
+            StateUpdate("s1", "w", "good", "ok", 1.0),
+        ]
+    )
+
+    assert store.load("s1") == {"w": {"good": "ok"}}
+
+
+def test_sqlite_store_purges_by_latest_update(store):
+    """Test that only sessions without recent updates are purged."""
+    store.save(
+        [
+            StateUpdate("old", "w", "a", 1, 10.0),
+            StateUpdate("mixed", "w", "a", 1, 10.0),
+            StateUpdate("mixed", "w", "b", 1, 100.0),
+        ]
+    )
+
+    assert store.purge(older_than=50.0) == 1
+    assert store.load("old") is None
+    assert store.load("mixed") is not None
+
+
+async def test_writer_coalesces_updates(store):
+    """Test that repeated updates between flushes become one row each."""
+    writer = SessionStateWriter(store, flush_interval=60.0)
+    for value in range(100):
+        writer.record("s1", "slider", "value", value)
+    writer.record("s1", "label", "text", "hi")
+    await writer.flush()
+
+    assert store.load("s1") == {"slider": {"value": 99}, "label": {"text": "hi"}}
+    metrics = writer.metrics()
+    assert metrics["updates_recorded"] == 101
+    assert metrics["rows_written"] == 2
+    assert metrics["flushes"] == 1
+
+
+async def test_writer_forget_drops_buffered_and_saved_state(store):
+    """Test that forgetting a session deletes it and discards unflushed changes."""
+    writer = SessionStateWriter(store, flush_interval=60.0)
+    writer.record("s1", "w", "a", 1)
+    writer.record("s2", "w", "a", 2)
+    await writer.flush()
+
+    writer.record("s1", "w", "a", 3)
+    writer.forget("s1")
+
+    assert await writer.load("s1") is None
+    assert await writer.load("s2") == {"w": {"a": 2}}
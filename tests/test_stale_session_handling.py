@@ -12,7 +12,7 @@ from starlette.websockets import WebSocketDisconnect
 from types import SimpleNamespace
 
 from numerous.apps.communication import ExecutionManager, MultiProcessExecutionManager
-from numerous.apps.session_management import SessionId, SessionManager
+from numerous.apps.session_management import GlobalSessionManager, SessionId, SessionManager
 from numerous.apps.app_factory import SessionInfo, _cleanup_session
 
 # Mock execution manager for testing
@@ -40,7 +40,8 @@ class MockExecutionManager(ExecutionManager):
 async def app_state():
     """Setup app state for testing."""
     config = MagicMock()
-    config.sessions = {}
+    config.session_manager = GlobalSessionManager()
+    config.sessions = config.session_manager.sessions
     config.allow_threaded = True
     config.base_dir = "/test/dir"
     config.module_path = "test_module.py"